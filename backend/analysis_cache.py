@@ -0,0 +1,204 @@
+# analysis_cache.py - İçerik adresli (content-addressed) analiz ve embedding cache'i
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_text(text: str) -> str:
+    """Cache anahtarı için metni normalize eder (Unicode NFC + boşluk sadeleştirme)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text: str, version: str) -> str:
+    """Normalize edilmiş metin + model sürümünden sha256 anahtarı üretir"""
+    payload = f"{version}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class ContentCache:
+    """
+    İki katmanlı cache: sınırlı boyutlu bellek içi LRU + yeniden başlatmalarda
+    korunan SQLite disk katmanı.
+
+    Aynı anahtar için eşzamanlı istekler birleştirilir (request coalescing):
+    claim() ile anahtarı ilk alan çağıran hesaplamayı yapar, diğerleri aynı
+    Future'ı bekler.
+
+    Args:
+        table: Disk katmanındaki tablo adı
+        encode / decode: Değeri bytes'a (ve geri) çeviren fonksiyonlar
+        max_entries: Bellek katmanındaki en fazla kayıt
+        db_path: SQLite dosyası (None veya "" ise disk katmanı kapalı)
+        max_disk_entries: Disk katmanındaki en fazla kayıt (en eskiler silinir)
+    """
+
+    def __init__(self, table, encode, decode, max_entries=2048, db_path=None, max_disk_entries=100_000):
+        self.table = table
+        self.encode = encode
+        self.decode = decode
+        self.max_entries = max_entries
+        self.db_path = db_path or None
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_errors = 0
+
+    # --- DİSK KATMANI ---
+    def _connection(self):
+        """SQLite bağlantısını açar; fork sonrası child process kendi bağlantısını kurar"""
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _disk_get(self, key):
+        if not self.db_path:
+            return None
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+            return self.decode(row[0]) if row else None
+        except Exception as e:
+            self.disk_errors += 1
+            print(f"⚠️ Cache disk okuma hatası: {e}")
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, self.encode(value), time.time())
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 1000:
+                    self._writes_since_prune = 0
+                    db.execute(
+                        f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                        "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,)
+                    )
+                db.commit()
+        except Exception as e:
+            self.disk_errors += 1
+            print(f"⚠️ Cache disk yazma hatası: {e}")
+
+    # --- BELLEK KATMANI ---
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Önce bellekte, sonra diskte arar; bulunamazsa None döner"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return self._memory[key]
+
+        value = self._disk_get(key)
+        if value is not None:
+            self.hits_disk += 1
+            self._remember(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        self._disk_put(key, value)
+
+    # --- İSTEK BİRLEŞTİRME ---
+    def claim(self, key):
+        """
+        Anahtarın hesaplanmasını üstlenmeye çalışır.
+
+        Returns:
+            (future, owner): owner True ise hesaplamayı çağıran yapmalı ve sonunda
+            resolve() / fail() çağırmalı; False ise başka bir istek hesaplıyordur,
+            future.result() ile sonucu beklenir.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def resolve(self, key, value):
+        """Hesaplanan değeri cache'e yazar ve bekleyen istekleri uyandırır"""
+        self.put(key, value)
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(value)
+
+    def fail(self, key, error):
+        """Hesaplama başarısız oldu; bekleyen isteklere hatayı iletir (hata cache'lenmez)"""
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_exception(error)
+
+    def get_or_compute(self, key, compute):
+        """Tek anahtar için cache'ten okur; yoksa (birleştirilmiş şekilde) hesaplar"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        future, owner = self.claim(key)
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except Exception as e:
+            self.fail(key, e)
+            raise
+        self.resolve(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_enabled": bool(self.db_path),
+            "disk_errors": self.disk_errors,
+        }
@@ -0,0 +1,194 @@
+# auth.py - Supabase JWT'lerinin yerel doğrulaması ve kısa ömürlü kullanıcı cache'i
+#
+# Supabase access token'ları projenin anahtarıyla imzalanmış JWT'lerdir:
+#   - SUPABASE_JWT_SECRET : HS256 (proje JWT secret'ı)
+#   - SUPABASE_JWKS_URL   : ES256/RS256 (asimetrik anahtarlar, ör. <SUPABASE_URL>/auth/v1/.well-known/jwks.json)
+# İmza, süre (exp) ve audience yerelde kontrol edilir. HS256'da ağ çağrısı yapılmaz;
+# JWKS anahtarları açılışta (prefetch) ve saatte bir / bilinmeyen kid'de PyJWKClient ile
+# HTTP'den çekilir; bu yüzden main.py asimetrik token'ları event loop dışında doğrular.
+# İmza anahtarı bilinmeyen (kid eşleşmeyen, algoritması desteklenmeyen) token'lar
+# için main.py Supabase'e (auth.get_user) sorar.
+# AUTH_STRICT_REMOTE=1 ile her istek eskisi gibi Supabase'de doğrulanır
+# (oturumu kapatılmış token'lar exp dolmadan da reddedilir).
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+class InvalidToken(Exception):
+    """Token imzası, süresi veya içeriği geçersiz"""
+
+
+class UnverifiableToken(Exception):
+    """Token yerelde doğrulanamıyor (anahtar yok / algoritma desteklenmiyor)"""
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """Route'ların kullandığı kullanıcı bilgisi (Supabase User nesnesinin id/email alanlarıyla uyumlu)"""
+    id: str
+    email: str = None
+    role: str = None
+    expires_at: float = None
+    claims: dict = field(default_factory=dict, compare=False, repr=False)
+
+
+class TokenCache:
+    """
+    Token -> kullanıcı TTL'li LRU (token'ın kendisi değil SHA-256'sı saklanır). Kayıt en geç token'ın exp anında düşer.
+
+    Args:
+        ttl: Bir kaydın en uzun ömrü (saniye)
+        max_entries: En fazla kayıt
+    """
+
+    def __init__(self, ttl=60.0, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1] <= now:
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, token: str, user, expires_at: float = None):
+        expires = time.time() + self.ttl
+        if expires_at is not None:
+            expires = min(expires, expires_at)
+        with self._lock:
+            self._entries[self._key(token)] = (user, expires)
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TokenVerifier:
+    """
+    Args:
+        secret: HS256 JWT secret'ı
+        jwks_url: Asimetrik imza anahtarlarının JWKS adresi
+        audience: Beklenen 'aud' claim'i (Supabase: "authenticated")
+        leeway: exp/iat kontrolünde saat kayması toleransı (saniye)
+    """
+
+    def __init__(self, secret=None, jwks_url=None, audience="authenticated", leeway=10):
+        import jwt
+
+        self._jwt = jwt
+        self.secret = secret
+        self.audience = audience
+        self.leeway = leeway
+        self._jwks = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=3600) if jwks_url else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret or self._jwks)
+
+    def may_fetch(self, token: str) -> bool:
+        """Doğrulama JWKS'i HTTP ile çekebilir mi (bloklayan çağrı; event loop'ta yapılmamalı)"""
+        if self._jwks is None:
+            return False
+        try:
+            return self._jwt.get_unverified_header(token).get("alg") != "HS256"
+        except self._jwt.InvalidTokenError:
+            return False
+
+    def prefetch(self):
+        """JWKS'i önceden çeker (açılışta), ilk isteklerin anahtar beklemesini önler"""
+        if self._jwks is None:
+            return
+        try:
+            keys = self._jwks.get_signing_keys()
+            print(f"✓ JWKS yüklendi ({len(keys)} anahtar)")
+        except self._jwt.PyJWKClientError as e:
+            print(f"⚠️ JWKS yüklenemedi, ilk asimetrik token'da tekrar denenecek: {e}")
+
+    def _signing_key(self, token: str, algorithm: str):
+        if algorithm == "HS256":
+            if not self.secret:
+                raise UnverifiableToken("HS256 token için SUPABASE_JWT_SECRET tanımlı değil")
+            return self.secret
+        if algorithm in ("ES256", "RS256") and self._jwks is not None:
+            try:
+                return self._jwks.get_signing_key_from_jwt(token).key
+            except self._jwt.PyJWKClientError as e:
+                raise UnverifiableToken(str(e)) from e
+        raise UnverifiableToken(f"'{algorithm}' imzalı token yerelde doğrulanamıyor")
+
+    def verify(self, token: str) -> AuthUser:
+        jwt = self._jwt
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+        except jwt.InvalidTokenError as e:
+            raise InvalidToken(str(e)) from e
+        key = self._signing_key(token, algorithm)
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.InvalidTokenError as e:
+            raise InvalidToken(str(e)) from e
+        return AuthUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            expires_at=float(claims["exp"]),
+            claims=claims,
+        )
+
+
+def token_expiry(token: str):
+    """İmzayı doğrulamadan 'exp' claim'ini okur (yalnızca uzaktan doğrulanmış token'ların cache süresi için)"""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def build_verifier(secret=None, jwks_url=None, audience="authenticated"):
+    """Ayar yoksa veya PyJWT kurulu değilse None (main.py uzak doğrulamaya düşer)"""
+    if not (secret or jwks_url):
+        return None
+    try:
+        return TokenVerifier(secret=secret, jwks_url=jwks_url, audience=audience)
+    except ImportError:
+        print("⚠️ UYARI: PyJWT kurulu değil, token'lar Supabase üzerinden doğrulanacak (pip install pyjwt[crypto]).")
+        return None
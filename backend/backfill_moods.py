@@ -0,0 +1,70 @@
+# backfill_moods.py - Girişlerdeki mood tahminlerini güncel Mood Regressor ile yeniden hesaplar
+#
+# mood_regressor.pkl / scaler.pkl değişince (MOOD_MODEL_VERSION farklılaşır) eski tahminler
+# zaten ilk okumada yenilenir; bu betik hepsini toplu olarak önceden günceller.
+# Tüm kullanıcıların satırlarına erişmek için SUPABASE_KEY olarak service role anahtarı gerekir.
+#
+# Kullanım:
+#   python backfill_moods.py                  # eksik / eski tahminleri yaz
+#   python backfill_moods.py --dry-run        # yalnızca say
+#   python backfill_moods.py --user-id <uuid> # tek kullanıcı
+
+import os
+
+os.environ.setdefault("NLP_WARMUP_ON_STARTUP", "0")
+
+import argparse
+import time
+
+from supabase import create_client
+
+import main
+
+
+def stale_rows(db, version: str, after_id: int, batch_size: int, user_id=None) -> list:
+    query = db.table("gunluk_girisler")\
+        .select("id, analiz_sonucu, created_at")\
+        .or_(f"mood_model_version.is.null,mood_model_version.neq.{version}")\
+        .gt("id", after_id)\
+        .order("id")\
+        .limit(batch_size)
+    if user_id:
+        query = query.eq("user_id", user_id)
+    return query.execute().data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mood tahminlerini güncel modelle yeniden hesaplar")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--user-id")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if not main.MOOD_MODEL:
+        print("❌ Mood Regressor yüklenemedi (.pkl dosyaları eksik).")
+        raise SystemExit(1)
+    if not (main.SUPABASE_URL and main.SUPABASE_KEY):
+        print("❌ SUPABASE_URL / SUPABASE_KEY eksik.")
+        raise SystemExit(1)
+
+    db = create_client(main.SUPABASE_URL, main.SUPABASE_KEY)
+    print(f"🔁 Hedef model sürümü: {main.MOOD_MODEL_VERSION}")
+
+    start = time.perf_counter()
+    last_id = 0
+    total = 0
+    while True:
+        rows = stale_rows(db, main.MOOD_MODEL_VERSION, last_id, args.batch_size, args.user_id)
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        rows = [row for row in rows if row.get("analiz_sonucu") and row.get("created_at")]
+        total += len(rows)
+        if args.dry_run or not rows:
+            continue
+        for row, prediction in zip(rows, main.predict_entry_moods(rows)):
+            db.table("gunluk_girisler").update(main.mood_columns(prediction)).eq("id", row["id"]).execute()
+        print(f"✓ {total} giriş güncellendi (son id: {last_id})")
+
+    action = "güncellenecek" if args.dry_run else "güncellendi"
+    print(f"✅ {total} giriş {action} ({time.perf_counter() - start:.1f} sn)")
@@ -0,0 +1,212 @@
+# batch_scheduler.py - NLP modelleri önünde mikro-batch zamanlayıcı
+#
+# Eşzamanlı istekler metinlerini kuyruğa bırakır; arka plan thread'i kuyruğu
+# max_batch_size dolunca veya ilk metin max_wait_ms beklediğinde boşaltır,
+# grubu tek seferde analiz eder ve her çağırana kendi sonucunu Future ile verir.
+#
+# BoundedExecutor: diğer CPU-yoğun çıkarım işleri (embedding, mood tahmini) için
+# ayrı boyutlandırılmış thread havuzu. İkisinin de kuyruğu sınırlıdır; dolunca
+# QueueFullError fırlatılır (main.py bunu 503'e çevirir) ve ucuz endpoint'ler
+# ağır işlerin arkasında beklemez.
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+
+class QueueFullError(RuntimeError):
+    """Çıkarım kuyruğu dolu; istek reddedildi"""
+
+
+class MicroBatchScheduler:
+    """
+    Args:
+        process: Metin listesi alıp aynı sırada sonuç listesi döndüren fonksiyon
+                 (ör. nlp_pipeline.analyze_texts)
+        max_batch_size: Bir grupta en fazla metin sayısı
+        max_wait_ms: İlk metin geldikten sonra grubun dolmasını bekleme süresi
+        max_queue_size: Kuyrukta bekleyebilecek en fazla metin (None: sınırsız)
+    """
+
+    def __init__(self, process, max_batch_size=16, max_wait_ms=5.0, max_queue_size=None):
+        self.process = process
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_queue_size = max_queue_size
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self._wait_total = 0.0
+
+    def _ensure_worker(self):
+        """Worker thread'i ilk istekte başlatır; fork sonrası child kendi thread'ini kurar"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Parent'tan kopyalanan kuyruğun kilidi ve içeriği child'da kullanılamaz
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="nlp-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, text) -> Future:
+        """Metni kuyruğa ekler; sonuç hazır olunca tamamlanan Future döner"""
+        self._ensure_worker()
+        if self.max_queue_size is not None and self._queue.qsize() >= self.max_queue_size:
+            self.rejected += 1
+            raise QueueFullError(f"Analiz kuyruğu dolu ({self.max_queue_size})")
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def analyze(self, text, timeout=None):
+        """submit() + sonucu bekle"""
+        return self.submit(text).result(timeout=timeout)
+
+    async def analyze_async(self, text, timeout=None):
+        """submit() + sonucu event loop'u bloklamadan bekle"""
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(text)), timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _resolve(future, result=None, error=None):
+        """Bekleyen Future'ı tamamlar; bu arada iptal edildiyse sessizce geçer"""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                # Çağıranı vazgeçmiş (istemci koptu / wait_for süresi doldu) metinler analiz edilmez;
+                # RUNNING'e geçen Future artık iptal edilemez
+                batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                started = time.perf_counter()
+                self.batches += 1
+                self.items += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self._wait_total += sum(started - queued_at for _, _, queued_at in batch)
+
+                try:
+                    results = self.process([text for text, _, _ in batch])
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Batch analiz hatası: {e}")
+                    for _, future, _ in batch:
+                        self._resolve(future, error=e)
+                    continue
+
+                for (_, future, _), result in zip(batch, results):
+                    self._resolve(future, result)
+            except Exception as e:
+                # Thread ölürse sonraki tüm istekler sonsuza dek bekler; grup hata ile kapatılır
+                self.errors += 1
+                print(f"❌ Mikro-batch worker hatası: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        self._resolve(future, error=e)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "avg_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "avg_wait_ms": round(1000 * self._wait_total / self.items, 3) if self.items else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
+
+
+class BoundedExecutor:
+    """
+    Sınırlı kuyruklu thread havuzu: aynı anda en fazla max_workers iş çalışır,
+    max_queue iş bekler; fazlası QueueFullError ile hemen reddedilir.
+    """
+
+    def __init__(self, max_workers=2, max_queue=32, name="inference"):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(f"Çıkarım kuyruğu dolu ({self.max_workers} + {self.max_queue})")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += future is not None
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """fn'i havuzda çalıştırır, sonucu event loop'u bloklamadan bekler"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,352 @@
+# benchmark.py - nlp_pipeline için çevrimdışı performans ölçümü
+#
+# Her aşama (tokenizasyon, duygu, NER, embedding, keyword/konu skorlama ve uçtan
+# uca analiz) metin uzunluğu grubu ve batch boyutu başına ayrı ölçülür:
+# çağrı başına p50/p95/p99 gecikme (ms) ve saniyedeki metin sayısı.
+#
+# Modeller yerel HF cache'inden yüklenir (HF_HUB_OFFLINE=1); --tiny ile rastgele
+# ağırlıklı küçük BERT'ler geçici bir klasöre kaydedilip onların yerine kullanılır
+# (indirme gerektirmez, CI'da regresyon takibi için).
+#
+# Kullanım:
+#   python benchmark.py                                  # yerel cache'teki gerçek modeller
+#   python benchmark.py --tiny --batch-sizes 1 8 32
+#   python benchmark.py --compare benchmark_a1b2c3d.json benchmark_e4f5a6b.json
+#
+# NLP_BACKEND, NLP_MODE, NLP_NER_GATE gibi ayarlar ölçümden önce ortam değişkeniyle verilir.
+
+import os
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+# Uçtan uca ölçüm cache'ten okumasın: disk katmanı ve bellek içi LRU kapalı
+os.environ["NLP_CACHE_PATH"] = ""
+os.environ["NLP_CACHE_SIZE"] = "0"
+os.environ["NLP_WARMUP_ON_STARTUP"] = "0"
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+SENTENCES = [
+    "Bugün işte yoğun bir gün geçirdim",
+    "Sabah erkenden kalkıp koşuya çıktım",
+    "Patronumla proje hakkında uzun bir toplantı yaptık",
+    "Akşam ailemle güzel vakit geçirdik",
+    "Annem biraz hastalandı, doktora gittik",
+    "Sınavım beklediğimden kötü geçti ve moralim bozuldu",
+    "Ahmet ile İstanbul'da kahve içtik",
+    "Yeni bir kitap okumaya başladım, çok sürükleyici",
+    "Telefonum bozuldu, bütün gün internetsiz kaldım",
+    "Market alışverişinde bütçeyi biraz aştım",
+    "Hava çok güzeldi, parkta yürüyüş yaptım",
+    "Arkadaşlarımla akşam yemeğinde buluştuk ve çok güldük",
+    "Uykumu alamadım, gün boyunca yorgun hissettim",
+    "Zeynep Ankara'dan döndü, onu havaalanında karşıladım",
+    "Motivasyonum düşük ama hedeflerime odaklanmaya çalışıyorum",
+    "Maaşım yattı, borçlarımın bir kısmını ödedim",
+]
+
+# Grup adı -> cümle sayısı aralığı (uzun grup 512 token'ı aşar, pencereleme devreye girer)
+LENGTH_BUCKETS = {
+    "short": (1, 2),
+    "medium": (6, 10),
+    "long": (50, 70),
+}
+STAGES = ["tokenize", "sentiment", "ner", "embedding", "keywords", "analyze"]
+DISTILLED_STAGES = ["tokenize", "distilled", "keywords", "analyze"]
+
+
+# Bütün ölçümler boyunca artan gün numarası: metinler aşama / grup / batch boyutları arasında da tekrarlanmaz
+_text_ids = itertools.count()
+
+
+def make_texts(bucket: str, count: int, rng: random.Random, offset: int = 0) -> list:
+    """Rastgele günlük metinleri; baştaki gün numarası (offset + i + 1) farklı offset'lerde metinleri benzersiz yapar"""
+    low, high = LENGTH_BUCKETS[bucket]
+    texts = []
+    for i in range(count):
+        sentences = [rng.choice(SENTENCES) for _ in range(rng.randint(low, high))]
+        texts.append(f"{offset + i + 1}. gün. " + ". ".join(sentences) + ".")
+    return texts
+
+
+# --- KÜÇÜK MODELLER ---
+def build_tiny_models(path: str, hidden_size: int = 64, layers: int = 2) -> dict:
+    """
+    Rastgele ağırlıklı küçük duygu/NER/SBERT modellerini path altına kaydeder.
+    Sonuçlar anlamsızdır; yalnızca pipeline'ın kendi maliyetini ve göreli hızı ölçmek içindir.
+    """
+    import torch
+    from transformers import (
+        BertConfig, BertForSequenceClassification, BertForTokenClassification, BertModel, BertTokenizerFast
+    )
+
+    torch.manual_seed(0)
+    words = sorted({w.strip(".,'") for s in SENTENCES for w in s.split()} | {"gün"})
+    chars = sorted(set("".join(SENTENCES)) | set("abcçdefgğhıijklmnoöprsştuüvyzABCÇDEFGĞHIİJKLMNOÖPRSŞTUÜVYZ0123456789.,!?'") - {" "})
+    vocab = list(dict.fromkeys(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words + chars + ["##" + c for c in chars]))
+    os.makedirs(path, exist_ok=True)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    tokenizer = BertTokenizerFast(vocab_file, do_lower_case=False, model_max_length=512)
+
+    config = dict(
+        vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=layers,
+        num_attention_heads=2, intermediate_size=2 * hidden_size, max_position_embeddings=512
+    )
+    ner_labels = ["O", "B-PER", "I-PER", "B-ORG", "I-ORG", "B-LOC", "I-LOC"]
+    models = {
+        "sentiment": BertForSequenceClassification(BertConfig(
+            **config, id2label={0: "negative", 1: "positive"}, label2id={"negative": 0, "positive": 1}
+        )),
+        "ner": BertForTokenClassification(BertConfig(
+            **config, id2label=dict(enumerate(ner_labels)), label2id={l: i for i, l in enumerate(ner_labels)}
+        )),
+        "sbert": BertModel(BertConfig(**config)),
+    }
+    paths = {}
+    for name, model in models.items():
+        paths[name] = os.path.join(path, name)
+        model.save_pretrained(paths[name])
+        tokenizer.save_pretrained(paths[name])
+    return paths
+
+
+# --- ÖLÇÜM ---
+def stage_runners(nlp) -> dict:
+    """Aşama adı -> fn(texts). Her fonksiyon yalnızca o aşamanın işini yapar."""
+
+    def tokenize(texts):
+        tokenizer = nlp.distilled_tokenizer if nlp.NLP_MODE == "distilled" else nlp.sbert_tokenizer
+        nlp.encode_texts(tokenizer, texts)
+
+    def sentiment(texts):
+        encoded = nlp.encode_texts(nlp.sentiment_pipeline.tokenizer, texts)
+        nlp.combine_sentiment(nlp.forward_windows(nlp.sentiment_pipeline.model, encoded), encoded, len(texts))
+
+    def ner(texts):
+        if nlp.NLP_NER_GATE == "on":
+            nlp.run_gated_ner(texts)
+            return
+        encoded = nlp.encode_texts(nlp.ner_pipeline.tokenizer, texts)
+        nlp.combine_entities(texts, encoded, nlp.forward_windows(nlp.ner_pipeline.model, encoded))
+
+    def embedding(texts):
+        nlp._sbert_embedding(texts)
+
+    def keywords(texts):
+        # Benzerlik satırları sabit; ölçülen yalnızca keyword eşleştirme + konu seçimi
+        similarities = [0.2 + 0.01 * (i % 5) for i in range(len(nlp.KONU_NAMES))]
+        for text in texts:
+            nlp._select_topics(text, similarities, 0.22, 0.18)
+
+    def distilled(texts):
+        nlp.run_distilled_model(texts)
+
+    def analyze(texts):
+        nlp.analyze_texts(texts, batch_size=len(texts))
+
+    return {
+        "tokenize": tokenize, "sentiment": sentiment, "ner": ner, "embedding": embedding,
+        "keywords": keywords, "distilled": distilled, "analyze": analyze,
+    }
+
+
+def cache_hits(nlp) -> int:
+    """Analiz + embedding cache isabetleri (bellek ve disk); ölçüm soğuk ise artmamalı"""
+    stats = nlp.cache_stats()
+    return sum(stats[name]["hits_memory"] + stats[name]["hits_disk"] for name in ("analysis", "embedding"))
+
+
+def measure(fn, bucket, batch_size, iterations, warmup, max_seconds, seed, hits=lambda: 0) -> dict:
+    rng = random.Random(seed)
+
+    def texts():
+        offset = next(_text_ids)
+        for _ in range(batch_size - 1):
+            next(_text_ids)
+        return make_texts(bucket, batch_size, rng, offset)
+
+    for _ in range(warmup):
+        fn(texts())
+
+    hits_before = hits()
+    latencies = []
+    total = 0.0
+    for _ in range(iterations):
+        batch = texts()
+        start = time.perf_counter()
+        fn(batch)
+        elapsed = time.perf_counter() - start
+        latencies.append(1000 * elapsed)
+        total += elapsed
+        if total > max_seconds and len(latencies) >= 3:
+            break
+    hits_during = hits() - hits_before
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "p50_ms_per_text": round(float(p50) / batch_size, 3),
+        "texts_per_sec": round(batch_size * len(latencies) / total, 2) if total else 0.0,
+        "cache_hits": hits_during,
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, timeout=10,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain"))}
+
+
+def run_benchmark(args) -> dict:
+    import torch
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.tiny:
+        paths = build_tiny_models(tempfile.mkdtemp(prefix="nlp_tiny_"))
+        os.environ["NLP_SENTIMENT_MODEL"] = paths["sentiment"]
+        os.environ["NLP_NER_MODEL"] = paths["ner"]
+        os.environ["NLP_SBERT_MODEL"] = paths["sbert"]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import nlp_pipeline as nlp
+        ready = nlp.load_models()
+    if not ready:
+        print(f"❌ Modeller yüklenemedi: {nlp.MODEL_ERRORS} (yerel cache yoksa --tiny kullanın)")
+        raise SystemExit(1)
+
+    runners = stage_runners(nlp)
+    stages = args.stages or (DISTILLED_STAGES if nlp.NLP_MODE == "distilled" else STAGES)
+    results = []
+    for stage in stages:
+        for bucket in args.buckets:
+            for batch_size in args.batch_sizes:
+                # analyze_texts kısa metin/soru uyarılarını print eder; tabloyu bozmasın
+                with contextlib.redirect_stdout(io.StringIO()):
+                    row = measure(
+                        runners[stage], bucket, batch_size, args.iterations, args.warmup,
+                        args.max_seconds, args.seed, hits=lambda: cache_hits(nlp)
+                    )
+                row = {"stage": stage, "bucket": bucket, "batch_size": batch_size, **row}
+                results.append(row)
+                print(
+                    f"  {stage:<10} {bucket:<7} b={batch_size:<3} p50={row['p50_ms']:9.2f} ms  "
+                    f"p95={row['p95_ms']:9.2f} ms  p99={row['p99_ms']:9.2f} ms  {row['texts_per_sec']:9.1f} metin/sn"
+                    + (f"  ⚠️ {row['cache_hits']} cache isabeti" if row["cache_hits"] else "")
+                )
+
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "torch_threads": torch.get_num_threads(),
+            "tiny": args.tiny,
+            "backend": nlp.ACTIVE_BACKEND,
+            "mode": nlp.NLP_MODE,
+            "ner_gate": nlp.NLP_NER_GATE,
+            "sentiment_cascade": nlp.NLP_SENTIMENT_CASCADE,
+            "models": [nlp.SENTIMENT_MODEL_NAME, nlp.NER_MODEL_NAME, nlp.sbert_model_name] if not args.tiny else "tiny",
+            "seed": args.seed,
+            "cache_size": nlp.NLP_CACHE_SIZE,
+        },
+        "results": results,
+    }
+
+
+# --- KARŞILAŞTIRMA ---
+def compare(base_path: str, new_path: str, tolerance: float) -> int:
+    """
+    İki sonuç dosyasını (stage, bucket, batch_size) bazında karşılaştırır.
+    p95 gecikmesi tolerance'tan fazla artan veya verimi aynı oranda düşen satırlar
+    regresyon sayılır; varsa çıkış kodu 1 olur.
+    """
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    for key in ("tiny", "backend", "mode", "torch_threads", "platform"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"⚠️ Ortam farkı: {key} {base['meta'].get(key)} -> {new['meta'].get(key)}")
+
+    base_rows = {(r["stage"], r["bucket"], r["batch_size"]): r for r in base["results"]}
+    print(f"\n{base['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"{'aşama':<10} {'grup':<7} {'batch':>5} | {'p50 ms':>17} | {'p95 ms':>17} | {'metin/sn':>17}")
+    print("-" * 84)
+
+    def change(old, value):
+        return (value - old) / old if old else 0.0
+
+    regressions = 0
+    for row in new["results"]:
+        key = (row["stage"], row["bucket"], row["batch_size"])
+        old = base_rows.get(key)
+        if old is None:
+            continue
+        p50, p95 = change(old["p50_ms"], row["p50_ms"]), change(old["p95_ms"], row["p95_ms"])
+        throughput = change(old["texts_per_sec"], row["texts_per_sec"])
+        regressed = p95 > tolerance or throughput < -tolerance
+        regressions += regressed
+        print(
+            f"{key[0]:<10} {key[1]:<7} {key[2]:>5} | {row['p50_ms']:9.2f} ({p50:+6.1%}) | "
+            f"{row['p95_ms']:9.2f} ({p95:+6.1%}) | {row['texts_per_sec']:9.1f} ({throughput:+6.1%})"
+            + ("  ⚠️" if regressed else "")
+        )
+
+    if regressions:
+        print(f"\n❌ {regressions} satırda %{100 * tolerance:.0f}'dan büyük gerileme var.")
+        return 1
+    print(f"\n✓ %{100 * tolerance:.0f} tolerans içinde gerileme yok.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="nlp_pipeline aşama bazında gecikme ve verim ölçümü")
+    parser.add_argument("--tiny", action="store_true", help="İndirme gerektirmeyen rastgele küçük modellerle ölç")
+    parser.add_argument("--stages", nargs="+", choices=STAGES + ["distilled"], help="Varsayılan: moda göre tüm aşamalar")
+    parser.add_argument("--buckets", nargs="+", choices=list(LENGTH_BUCKETS), default=list(LENGTH_BUCKETS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="Bir ölçüm için süre sınırı (en az 3 tekrar)")
+    parser.add_argument("--threads", type=int, help="torch thread sayısı (varsayılan: torch'un seçimi)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Sonuç JSON dosyası (varsayılan: benchmark_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="İki sonuç dosyasını karşılaştır")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Karşılaştırmada gerileme eşiği (0.10 = %%10)")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.tolerance))
+
+    print("⏱️ NLP benchmark başlıyor...")
+    report = run_benchmark(args)
+    output = args.output or f"benchmark_{report['meta']['commit']}{'-dirty' if report['meta']['dirty'] else ''}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n🏆 Sonuçlar kaydedildi: {output}")
@@ -0,0 +1,207 @@
+# distilled_model.py - Duygu, NER ve konu için tek encoder'lı çok başlıklı (multi-head) öğrenci model
+#
+# Üç ayrı BERT-base yerine, SBERT encoder'ının katmanları seyreltilerek elde
+# edilen küçük tek bir encoder ve üzerinde üç başlık:
+#   - duygu : nihai etiket (negative / neutral / positive) + BERT skoru (regresyon)
+#   - NER   : token başına BIO etiketi (B-PER, I-PER, ...)
+#   - konu  : konu başına çoklu etiket (sigmoid)
+# Eğitim: train_distilled_model.py (öğretmen etiketleri: analiz_sonucu geçmişi)
+# Servis: NLP_MODE=distilled (bkz. nlp_pipeline.run_distilled_model)
+
+import copy
+import json
+import os
+import uuid
+import torch
+import torch.nn.functional as F
+from torch import nn
+
+SENTIMENT_LABELS = ["negative", "neutral", "positive"]
+CONFIG_FILE = "distilled.json"
+WEIGHTS_FILE = "model.pt"
+TOPIC_THRESHOLD = 0.5
+MAX_TOPICS = 3
+
+
+def bio_labels(entity_types) -> list:
+    labels = ["O"]
+    for entity_type in sorted(entity_types):
+        labels += [f"B-{entity_type}", f"I-{entity_type}"]
+    return labels
+
+
+def shrink_encoder(encoder, num_layers: int):
+    """Öğretmen encoder'ından eşit aralıklı num_layers katmanı tutan bir kopya üretir"""
+    student = copy.deepcopy(encoder)
+    layers = student.encoder.layer
+    num_layers = max(1, min(num_layers, len(layers)))
+    step = len(layers) / num_layers
+    picks = [int(round(step * (i + 1))) - 1 for i in range(num_layers)]
+    student.encoder.layer = nn.ModuleList([layers[i] for i in picks])
+    student.config.num_hidden_layers = num_layers
+    return student
+
+
+class DistilledNLPModel(nn.Module):
+    def __init__(self, encoder, ner_labels, topic_labels, sentiment_labels=SENTIMENT_LABELS):
+        super().__init__()
+        hidden = encoder.config.hidden_size
+        self.encoder = encoder
+        self.sentiment_labels = list(sentiment_labels)
+        self.ner_labels = list(ner_labels)
+        self.topic_labels = list(topic_labels)
+
+        self.dropout = nn.Dropout(0.1)
+        self.sentiment_head = nn.Linear(hidden, len(self.sentiment_labels))
+        self.sentiment_score_head = nn.Linear(hidden, 1)
+        self.ner_head = nn.Linear(hidden, len(self.ner_labels))
+        self.topic_head = nn.Linear(hidden, len(self.topic_labels))
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        tokens = self.encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids
+        )[0]
+        mask = attention_mask.unsqueeze(-1).to(tokens.dtype)
+        pooled = self.dropout((tokens * mask).sum(1) / mask.sum(1).clamp(min=1e-9))
+        return {
+            "sentiment": self.sentiment_head(pooled),
+            "sentiment_score": torch.sigmoid(self.sentiment_score_head(pooled)).squeeze(-1),
+            "ner": self.ner_head(self.dropout(tokens)),
+            "topics": self.topic_head(pooled),
+        }
+
+    def save(self, path: str, tokenizer, extra=None):
+        os.makedirs(path, exist_ok=True)
+        self.encoder.config.save_pretrained(path)
+        tokenizer.save_pretrained(path)
+        torch.save(self.state_dict(), os.path.join(path, WEIGHTS_FILE))
+        config = {
+            "version": uuid.uuid4().hex[:12],
+            "sentiment_labels": self.sentiment_labels,
+            "ner_labels": self.ner_labels,
+            "topic_labels": self.topic_labels,
+            **(extra or {}),
+        }
+        with open(os.path.join(path, CONFIG_FILE), "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+
+
+def distilled_version(path: str) -> str:
+    """Eğitilmiş modelin sürüm kimliği (cache sürümü için); model yoksa 'missing'"""
+    try:
+        with open(os.path.join(path, CONFIG_FILE), encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return "missing"
+
+
+def load_distilled(path: str):
+    """Kaydedilmiş öğrenci modeli ve tokenizer'ını yükler (eval modunda)"""
+    from transformers import AutoConfig, AutoModel, AutoTokenizer
+
+    with open(os.path.join(path, CONFIG_FILE), encoding="utf-8") as f:
+        config = json.load(f)
+    encoder = AutoModel.from_config(AutoConfig.from_pretrained(path))
+    model = DistilledNLPModel(encoder, config["ner_labels"], config["topic_labels"], config["sentiment_labels"])
+    model.load_state_dict(torch.load(os.path.join(path, WEIGHTS_FILE), map_location="cpu", weights_only=True))
+    model.eval()
+    return model, AutoTokenizer.from_pretrained(path)
+
+
+# --- ÖĞRETMEN ETİKETLERİ ---
+def entity_tag_ids(text: str, entities: list, offsets, special_mask, ner_labels: list) -> list:
+    """
+    Kayıtlı varlıkları (varlik, metin) token BIO etiketlerine çevirir. Varlık metni
+    cümlede geçtiği her yerde işaretlenir; özel token'lar kayıpta yok sayılır (-100).
+    """
+    label_ids = {label: i for i, label in enumerate(ner_labels)}
+    char_tags = [None] * len(text)
+    for entity in entities:
+        word, entity_type = entity.get("metin"), entity.get("varlik")
+        if not word or f"B-{entity_type}" not in label_ids:
+            continue
+        start = text.find(word)
+        while start != -1:
+            for c in range(start, start + len(word)):
+                char_tags[c] = (entity_type, start)
+            start = text.find(word, start + len(word))
+
+    tags = []
+    previous = None
+    for (start, end), special in zip(offsets, special_mask):
+        if special:
+            tags.append(-100)
+            previous = None
+            continue
+        tag = char_tags[start] if start < len(char_tags) else None
+        if tag is None:
+            tags.append(label_ids["O"])
+        else:
+            prefix = "I" if previous == tag else "B"
+            tags.append(label_ids[f"{prefix}-{tag[0]}"])
+        previous = tag
+    return tags
+
+
+# --- ÇIKTI ÇÖZÜMLEME ---
+def decode_entities(text: str, offsets, special_mask, probs, ner_labels: list) -> list:
+    """
+    Token BIO olasılıklarını pipeline'ın 'simple' aggregation çıktısıyla aynı biçimdeki
+    varlıklara çevirir: {"entity_group", "word", "score", "start", "end"}
+    """
+    entities = []
+    current = None
+    scores, tags = probs.max(dim=-1)
+    for (start, end), special, score, tag in zip(offsets.tolist(), special_mask.tolist(), scores.tolist(), tags.tolist()):
+        label = ner_labels[tag]
+        if special or label == "O":
+            current = None
+            continue
+        prefix, entity_type = label.split("-", 1)
+        if current is not None and current["entity_group"] == entity_type and (prefix == "I" or start == current["end"]):
+            current["end"] = end
+            current["scores"].append(score)
+            continue
+        current = {"entity_group": entity_type, "start": start, "end": end, "scores": [score]}
+        entities.append(current)
+
+    return [
+        {
+            "entity_group": e["entity_group"],
+            "word": text[e["start"]:e["end"]],
+            "score": sum(e["scores"]) / len(e["scores"]),
+            "start": e["start"],
+            "end": e["end"],
+        }
+        for e in entities
+    ]
+
+
+def decode_topics(probs, topic_labels: list) -> list:
+    ranked = sorted(zip(topic_labels, probs.tolist()), key=lambda item: item[1], reverse=True)
+    return [label for label, p in ranked if p >= TOPIC_THRESHOLD][:MAX_TOPICS]
+
+
+def sentiment_from_outputs(probs, score, sentiment_labels: list) -> dict:
+    return {"label": sentiment_labels[int(probs.argmax())], "score": float(score)}
+
+
+def head_probabilities(outputs: dict) -> dict:
+    return {
+        "sentiment": F.softmax(outputs["sentiment"], dim=-1),
+        "sentiment_score": outputs["sentiment_score"],
+        "ner": F.softmax(outputs["ner"], dim=-1),
+        "topics": torch.sigmoid(outputs["topics"]),
+    }
+
+
+def merge_overlapping(entities: list) -> list:
+    """Örtüşen pencerelerden gelen aynı/örtüşen varlıklardan en uzun (eşitse en yüksek skorlu) olanı tutar"""
+    kept = []
+    for entity in sorted(entities, key=lambda e: (e["start"], -(e["end"] - e["start"]), -e["score"])):
+        if kept and entity["start"] < kept[-1]["end"]:
+            continue
+        kept.append(entity)
+    return kept
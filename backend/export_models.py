@@ -0,0 +1,191 @@
+# export_models.py - NLP modellerini ONNX'e export eder, int8'e çevirir ve backend doğruluk kontrolü yapar
+#
+# Kullanım:
+#   python export_models.py                      # ONNX export + int8 dönüşümü + doğruluk kontrolü
+#   python export_models.py --check-only         # Sadece mevcut backend'leri fp32'ye karşı kontrol et
+#   python export_models.py --report rapor.json  # Kontrol sonucunu JSON olarak da kaydet
+#
+# Kontrol tablosunda tolerans içinde kalan en hızlı backend önerilir; NLP_BACKEND ile seçilir.
+
+import os
+
+# Referans çıktılar her zaman eager fp32 modellerden alınır
+os.environ["NLP_BACKEND"] = "torch"
+os.environ["NLP_MODE"] = "full"
+
+import argparse
+import json
+import statistics
+import time
+import torch
+import torch.nn.functional as F
+import nlp_pipeline
+from inference_backends import BACKENDS, MODEL_KINDS, build_backend, export_onnx, onnx_path, quantize_onnx
+
+# Sabit Türkçe örnek seti (kısa/uzun, varlık içeren/içermeyen, olumlu/olumsuz)
+ACCURACY_SAMPLES = [
+    "Bugün hastaneye gidip kan değerlerimi incelettirdim. Doktor vitamin almam gerektiğini söyledi.",
+    "Patronumla başarılı bir toplantı geçirdik.",
+    "Okuldaki sınavım çok iyiydi, arkadaşlarımla kutladık.",
+    "Annem hastalandı, hastaneye gittik.",
+    "Harika bir gün geçirdim, her şey yolunda gitti.",
+    "Bütün gün yağmur yağdı ve kendimi çok yorgun hissettim.",
+    "Ahmet ile İstanbul'da buluştuk, Galata Kulesi'ne çıktık.",
+    "Maaşım yine gecikti, kira ve faturaları nasıl ödeyeceğimi bilmiyorum.",
+    "Yeni telefonum geldi ama uygulamaların yarısı çalışmıyor.",
+    "Bu ay üç kitap bitirdim, hedeflerime yaklaştığımı hissediyorum.",
+    "Ayşe Hanım'ın doğum gününde Ankara'daki bütün aile bir araya geldi.",
+    "Sabah kahvemi içip yürüyüşe çıktım, akşam da erkenden uyudum.",
+]
+
+# Bir backend'in kabul edilmesi için fp32'ye göre sınırlar
+TOLERANCES = {
+    "sentiment_label_agreement": 0.95,  # en az
+    "sentiment_max_prob_diff": 0.05,    # en fazla
+    "ner_token_agreement": 0.97,        # en az
+    "sbert_min_cosine": 0.98,           # en az
+    "topic_agreement": 0.90,            # en az
+}
+
+
+def fp32_models():
+    return {
+        "sentiment": nlp_pipeline.sentiment_pipeline.model,
+        "ner": nlp_pipeline.ner_pipeline.model,
+        "sbert": nlp_pipeline.sbert_model,
+    }
+
+
+def model_tokenizers():
+    return {
+        "sentiment": nlp_pipeline.sentiment_pipeline.tokenizer,
+        "ner": nlp_pipeline.ner_pipeline.tokenizer,
+        "sbert": nlp_pipeline.sbert_tokenizer,
+    }
+
+
+def convert(onnx_dir: str):
+    """Üç modeli fp32 ONNX'e export eder ve ONNX Runtime ile int8'e çevirir"""
+    print(f"📦 ONNX export: {onnx_dir}")
+    tokenizers = model_tokenizers()
+    for kind, model in fp32_models().items():
+        start = time.perf_counter()
+        path = export_onnx(model, tokenizers[kind], onnx_path(onnx_dir, kind))
+        quantized = quantize_onnx(path, onnx_path(onnx_dir, kind, quantized=True))
+        print(f"  ✓ {kind}: {path}, {quantized} ({time.perf_counter() - start:.1f} sn)")
+
+
+def run_models(runnables: dict, encodings: dict) -> dict:
+    with torch.no_grad():
+        return {
+            kind: runnables[kind](**nlp_pipeline.model_inputs(encodings[kind]))[0].float()
+            for kind in MODEL_KINDS
+        }
+
+
+def compare_outputs(reference: dict, outputs: dict, encodings: dict) -> dict:
+    """Bir backend'in çıktılarını fp32 referansıyla karşılaştırır"""
+    ref_probs = F.softmax(reference["sentiment"], dim=-1)
+    probs = F.softmax(outputs["sentiment"], dim=-1)
+
+    ner_mask = encodings["ner"]["attention_mask"].bool() & ~encodings["ner"]["special_tokens_mask"].bool()
+    ner_equal = reference["ner"].argmax(-1) == outputs["ner"].argmax(-1)
+
+    attention_mask = encodings["sbert"]["attention_mask"]
+    ref_embeddings = nlp_pipeline.mean_pooling((reference["sbert"],), attention_mask)
+    embeddings = nlp_pipeline.mean_pooling((outputs["sbert"],), attention_mask)
+
+    ref_topics = nlp_pipeline.classify_topics_batch(ACCURACY_SAMPLES, embeddings=ref_embeddings)
+    topics = nlp_pipeline.classify_topics_batch(ACCURACY_SAMPLES, embeddings=embeddings)
+
+    return {
+        "sentiment_label_agreement": (ref_probs.argmax(-1) == probs.argmax(-1)).float().mean().item(),
+        "sentiment_max_prob_diff": (ref_probs - probs).abs().max().item(),
+        "ner_token_agreement": ner_equal[ner_mask].float().mean().item(),
+        "sbert_min_cosine": F.cosine_similarity(ref_embeddings, embeddings).min().item(),
+        "topic_agreement": sum(a == b for a, b in zip(ref_topics, topics)) / len(ACCURACY_SAMPLES),
+    }
+
+
+def within_tolerance(metrics: dict) -> bool:
+    for name, limit in TOLERANCES.items():
+        value = metrics[name]
+        if name.endswith("_diff"):
+            if value > limit:
+                return False
+        elif value < limit:
+            return False
+    return True
+
+
+def check_backends(onnx_dir: str, backends=BACKENDS, repeats: int = 5) -> dict:
+    """
+    Her backend'i sabit örnek setinde fp32 çıktılarıyla karşılaştırır ve hızını ölçer.
+
+    Returns:
+        dict: backend -> metrikler, ms_per_text, passed (veya error)
+    """
+    tokenizers = model_tokenizers()
+    encodings = {kind: nlp_pipeline.encode_texts(tokenizers[kind], ACCURACY_SAMPLES) for kind in tokenizers}
+    reference = run_models(fp32_models(), encodings)
+
+    report = {}
+    for backend in backends:
+        try:
+            runnables = build_backend(backend, fp32_models(), onnx_dir)
+        except Exception as e:
+            report[backend] = {"error": str(e)}
+            continue
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = run_models(runnables, encodings)
+            timings.append(time.perf_counter() - start)
+
+        metrics = compare_outputs(reference, outputs, encodings)
+        metrics["ms_per_text"] = 1000 * statistics.median(timings) / len(ACCURACY_SAMPLES)
+        metrics["passed"] = within_tolerance(metrics)
+        report[backend] = metrics
+    return report
+
+
+def print_report(report: dict):
+    print("\nBackend    | Sentiment | Max Δp | NER token | SBERT cos | Konu  | ms/metin | Sonuç")
+    print("-" * 86)
+    for backend, m in report.items():
+        if "error" in m:
+            print(f"{backend:<10} | ❌ {m['error']}")
+            continue
+        print(
+            f"{backend:<10} |   {m['sentiment_label_agreement']:6.1%} | {m['sentiment_max_prob_diff']:.4f} |"
+            f"    {m['ner_token_agreement']:6.1%} |    {m['sbert_min_cosine']:.4f} | {m['topic_agreement']:5.0%} |"
+            f" {m['ms_per_text']:8.2f} | {'✅' if m['passed'] else '❌'}"
+        )
+
+    passed = [(m["ms_per_text"], backend) for backend, m in report.items() if m.get("passed")]
+    if passed:
+        print(f"\n🎯 Önerilen backend: NLP_BACKEND={min(passed)[1]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NLP modelleri için ONNX export ve backend doğruluk kontrolü")
+    parser.add_argument("--onnx-dir", default=nlp_pipeline.NLP_ONNX_DIR)
+    parser.add_argument("--check-only", action="store_true", help="Export etmeden sadece kontrol yap")
+    parser.add_argument("--report", help="Kontrol sonucunun yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if not nlp_pipeline.load_models():
+        print("❌ Modeller yüklenemedi.")
+        raise SystemExit(1)
+
+    if not args.check_only:
+        convert(args.onnx_dir)
+
+    report = check_backends(args.onnx_dir)
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Rapor kaydedildi: {args.report}")
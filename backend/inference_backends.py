@@ -0,0 +1,146 @@
+# inference_backends.py - NLP modelleri için CPU çıkarım backend'leri
+#
+# torch      : eager fp32 PyTorch (varsayılan)
+# int8       : PyTorch dynamic quantization (Linear katmanları int8)
+# onnx       : ONNX Runtime, fp32 export
+# onnx-int8  : ONNX Runtime, dinamik int8 quantize edilmiş export
+#
+# ONNX dosyaları export_models.py ile üretilir.
+
+import inspect
+import os
+import torch
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+MODEL_KINDS = ("sentiment", "ner", "sbert")
+ONNX_INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def onnx_path(onnx_dir: str, kind: str, quantized: bool = False) -> str:
+    return os.path.join(onnx_dir, f"{kind}.int8.onnx" if quantized else f"{kind}.onnx")
+
+
+class OnnxModel:
+    """
+    ONNX Runtime oturumunu HF modeli gibi çağrılabilir yapar: model(**inputs)[0]
+    sınıflandırıcılar için logits, SBERT için token embedding'leri döner.
+    Pipeline postprocess'i id2label için config'e ihtiyaç duyduğundan config saklanır.
+    """
+
+    def __init__(self, path: str, config):
+        self.config = config
+        self.path = path
+        self.reopen()
+
+    def reopen(self):
+        """
+        Oturumu (yeniden) açar. ONNX Runtime oturumları fork-safe değildir;
+        pre-fork modunda her worker kendi oturumunu kendi thread sayısıyla açar.
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, **inputs):
+        feed = {
+            name: tensor.cpu().numpy()
+            for name, tensor in inputs.items()
+            if name in self.input_names
+        }
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+            feed["token_type_ids"] = torch.zeros_like(inputs["input_ids"]).numpy()
+        outputs = self.session.run(None, feed)
+        return (torch.from_numpy(outputs[0]),)
+
+    def eval(self):
+        return self
+
+
+class _ExportWrapper(torch.nn.Module):
+    """HF modelinin ModelOutput'unu ONNX export için tek tensöre indirger"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids
+        )[0]
+
+
+def quantize_int8(model):
+    """Linear katmanlarını dinamik int8'e çevirir (orijinal model değişmez)"""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(model, tokenizer, path: str, opset: int = 17) -> str:
+    """HF modelini dinamik batch/sequence boyutlu ONNX dosyasına export eder"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sample = tokenizer(["Bugün güzel bir gün.", "Ahmet ile İstanbul'a gittik."], padding=True, return_tensors="pt")
+    args = tuple(sample.get(name, torch.zeros_like(sample["input_ids"])) for name in ONNX_INPUT_NAMES)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in ONNX_INPUT_NAMES}
+    dynamic_axes["output"] = {0: "batch", 1: "sequence"}
+
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+
+    # Wrapper da eval modunda olmalı; exporter sonunda wrapper'ın modunu alt modüllere geri yükler
+    wrapper = _ExportWrapper(model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            args,
+            path,
+            input_names=ONNX_INPUT_NAMES,
+            output_names=["output"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **kwargs
+        )
+    return path
+
+
+def quantize_onnx(source: str, target: str) -> str:
+    """ONNX modelinin ağırlıklarını ONNX Runtime ile dinamik int8'e çevirir"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    return target
+
+
+def build_backend(backend: str, models: dict, onnx_dir: str) -> dict:
+    """
+    fp32 torch modellerinden istenen backend'in çağrılabilir modellerini üretir.
+
+    Args:
+        backend: BACKENDS içinden biri
+        models: kind -> fp32 HF modeli ("sentiment", "ner", "sbert")
+        onnx_dir: export_models.py çıktısının bulunduğu klasör
+
+    Returns:
+        dict: kind -> model(**inputs)[0] ile çağrılabilen model
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Bilinmeyen NLP backend'i: {backend} (seçenekler: {', '.join(BACKENDS)})")
+
+    if backend == "torch":
+        return dict(models)
+    if backend == "int8":
+        return {kind: quantize_int8(model) for kind, model in models.items()}
+
+    quantized = backend == "onnx-int8"
+    runnables = {}
+    for kind, model in models.items():
+        path = onnx_path(onnx_dir, kind, quantized)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} bulunamadı. Önce 'python export_models.py' çalıştırın.")
+        runnables[kind] = OnnxModel(path, model.config)
+    return runnables
@@ -7,60 +7,194 @@ Günlük yazma uygulaması için FastAPI backend servisi.
 - Supabase auth ve veritabanı entegrasyonu
 """
 
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import os
 import json
 import pickle
+import hashlib
+import base64
+import asyncio
+import threading
 import pandas as pd
 import numpy as np
-import requests
+import httpx
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
-from supabase import create_client, Client
-from nlp_pipeline import analyze_text
+from supabase import acreate_client, AsyncClient
+
+# Başlangıç süresi raporu (saniye), bileşen bazında
+STARTUP_TIMINGS = {"import_dependencies": round(time.perf_counter() - _IMPORT_START, 3)}
+
+_step_start = time.perf_counter()
+import nlp_pipeline
+from auth import InvalidToken, TokenCache, UnverifiableToken, build_verifier, token_expiry
+from read_cache import UserReadCache
+from batch_scheduler import BoundedExecutor, MicroBatchScheduler, QueueFullError
+from vector_index import VectorIndexStore, decode_embedding, encode_embedding
+from metrics import (
+    ADVICE_FALLBACK_TOTAL, AUTH_TOTAL, CONTENT_TYPE, GROQ_SECONDS, HTTP_REQUEST_SECONDS, INSIGHT_CACHE_TOTAL,
+    MODEL_MISSING_TOTAL, MOOD_SECONDS, REGISTRY, SUPABASE_ERRORS_TOTAL, SUPABASE_SECONDS
+)
+STARTUP_TIMINGS["import_nlp_pipeline"] = round(time.perf_counter() - _step_start, 3)
 
 load_dotenv()
 
+# Açılışta NLP modellerini arka planda yükle (testlerde / lokal geliştirmede kapatılabilir)
+NLP_WARMUP_ON_STARTUP = os.environ.get("NLP_WARMUP_ON_STARTUP", "1") == "1"
+
+# Eşzamanlı /entries isteklerinin metinleri mikro-batch'lerde birlikte analiz edilir
+NLP_BATCH_MAX_SIZE = int(os.environ.get("NLP_BATCH_MAX_SIZE", "16"))
+NLP_BATCH_MAX_WAIT_MS = float(os.environ.get("NLP_BATCH_MAX_WAIT_MS", "5"))
+NLP_BATCH_MAX_QUEUE = int(os.environ.get("NLP_BATCH_MAX_QUEUE", "64"))
+analysis_scheduler = MicroBatchScheduler(
+    nlp_pipeline.analyze_texts,
+    max_batch_size=NLP_BATCH_MAX_SIZE,
+    max_wait_ms=NLP_BATCH_MAX_WAIT_MS,
+    max_queue_size=NLP_BATCH_MAX_QUEUE
+)
+
+# Diğer CPU-yoğun işler (embedding, mood tahmini) Starlette'in ortak threadpool'u yerine
+# ayrı boyutlandırılmış bu havuzda çalışır; kuyruk dolunca istek 503 ile reddedilir
+NLP_INFERENCE_WORKERS = int(os.environ.get("NLP_INFERENCE_WORKERS", "2"))
+NLP_INFERENCE_QUEUE = int(os.environ.get("NLP_INFERENCE_QUEUE", "32"))
+inference_executor = BoundedExecutor(NLP_INFERENCE_WORKERS, NLP_INFERENCE_QUEUE)
+
+# Semantik arama: bellekte tutulacak en fazla kullanıcı indeksi ve yeniden kurulma süresi
+# (başka worker'da yazılan girişler aramada en fazla SEARCH_INDEX_TTL saniye eksik kalır)
+SEARCH_INDEX_MAX_USERS = int(os.environ.get("SEARCH_INDEX_MAX_USERS", "256"))
+SEARCH_INDEX_TTL = float(os.environ.get("SEARCH_INDEX_TTL", "300"))
+vector_indexes = VectorIndexStore(max_users=SEARCH_INDEX_MAX_USERS, ttl=SEARCH_INDEX_TTL)
+
 # Supabase Ayarları
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    print(f"Supabase bağlantı hatası: {e}")
-    supabase = None
+# Token doğrulama: JWT secret'ı (HS256) veya JWKS adresi (ES256/RS256) verilirse token'lar
+# yerelde doğrulanır. AUTH_STRICT_REMOTE=1 her isteği eskisi gibi Supabase'e sorar
+# (çıkış yapılmış oturumlar anında reddedilir, cache kullanılmaz).
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.environ.get("SUPABASE_JWKS_URL")
+AUTH_STRICT_REMOTE = os.environ.get("AUTH_STRICT_REMOTE", "0") == "1"
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+token_verifier = None if AUTH_STRICT_REMOTE else build_verifier(SUPABASE_JWT_SECRET, SUPABASE_JWKS_URL)
+token_cache = TokenCache(ttl=AUTH_CACHE_TTL, max_entries=AUTH_CACHE_MAX_ENTRIES)
+if not AUTH_STRICT_REMOTE and token_verifier is None:
+    print("⚠️ UYARI: SUPABASE_JWT_SECRET / SUPABASE_JWKS_URL eksik, token'lar her istekte Supabase'e sorulacak.")
 
 # Groq API Key (YENİ - ÜCRETSİZ!)
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", "15"))
 
 if not GROQ_API_KEY:
     print("⚠️ UYARI: GROQ_API_KEY eksik.")
 
+# İçgörü yenileme: son içgörü bu kadar gün / yeni girişten sonra arka planda yeniden üretilir;
+# aynı anda en fazla INSIGHT_MAX_CONCURRENCY üretim (Groq çağrısı) çalışır
+INSIGHT_MAX_AGE_DAYS = float(os.environ.get("INSIGHT_MAX_AGE_DAYS", "7"))
+INSIGHT_REFRESH_ENTRIES = int(os.environ.get("INSIGHT_REFRESH_ENTRIES", "5"))
+INSIGHT_MAX_CONCURRENCY = int(os.environ.get("INSIGHT_MAX_CONCURRENCY", "4"))
+_insight_tasks = {}  # user_id -> sürmekte olan üretim
+
+# Okuma cache'i: /entries, /insights ve /predict-mood yanıtları kullanıcı başına kısa süre
+# bellekte tutulur; kullanıcının yazmaları kendi kayıtlarını hemen düşürür
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", "30"))
+READ_CACHE_MAX_USERS = int(os.environ.get("READ_CACHE_MAX_USERS", "1024"))
+read_cache = UserReadCache(ttl=READ_CACHE_TTL, max_users=READ_CACHE_MAX_USERS)
+
 # --- MODELLERİ YÜKLE ---
 print("🧠 Yapay Zeka Modelleri yükleniyor...")
 MOOD_MODEL = None
 SCALER = None
 MODEL_FEATURES = []
+# Girişlere yazılan mood tahminlerinin hangi model dosyalarıyla üretildiği (.pkl içeriklerinin hash'i);
+# dosyalar değişince eski tahminler okunurken veya backfill_moods.py ile yeniden hesaplanır
+MOOD_MODEL_VERSION = None
 
+_step_start = time.perf_counter()
 try:
+    _model_hash = hashlib.sha256()
     with open('mood_regressor.pkl', 'rb') as f:
-        model_data = pickle.load(f)
+        raw = f.read()
+        _model_hash.update(raw)
+        model_data = pickle.loads(raw)
         MOOD_MODEL = model_data['model']
         MODEL_FEATURES = model_data['features']
     
     with open('scaler.pkl', 'rb') as f:
-        SCALER = pickle.load(f)
+        raw = f.read()
+        _model_hash.update(raw)
+        SCALER = pickle.loads(raw)
+
+    MOOD_MODEL_VERSION = "mood-" + _model_hash.hexdigest()[:12]
         
     print("✅ Mood Regressor (v2) başarıyla yüklendi!")
 except FileNotFoundError:
     print("⚠️ UYARI: .pkl dosyaları eksik. Tahmin yapılamaz.")
+STARTUP_TIMINGS["load_mood_regressor"] = round(time.perf_counter() - _step_start, 3)
+STARTUP_TIMINGS["import_main"] = round(time.perf_counter() - _IMPORT_START, 3)
 
-app = FastAPI(title="DailyMind AI API")
+
+# --- ASYNC İSTEMCİLER ---
+# Supabase ve Groq istemcileri event loop'a bağlıdır; loop başına bir kez kurulur
+# (uvicorn'da tek loop vardır, TestClient her istekte yeni loop açabilir).
+_async_clients = {}
+
+async def loop_client(name: str, factory):
+    loop = asyncio.get_running_loop()
+    cached = _async_clients.get(name)
+    if cached is None or cached[0] is not loop:
+        _async_clients[name] = (loop, await factory())
+    return _async_clients[name][1]
+
+async def get_supabase() -> Optional[AsyncClient]:
+    """Async Supabase istemcisi; ayarlar eksikse veya bağlantı kurulamazsa None"""
+    try:
+        return await loop_client("supabase", lambda: acreate_client(SUPABASE_URL, SUPABASE_KEY))
+    except Exception as e:
+        print(f"Supabase bağlantı hatası: {e}")
+        return None
+
+async def get_groq_client() -> httpx.AsyncClient:
+    async def create():
+        return httpx.AsyncClient(
+            base_url="https://api.groq.com/openai/v1",
+            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
+            timeout=GROQ_TIMEOUT,
+            # Bağlantılar açık tutulur (her tavsiyede yeni TLS el sıkışması yok)
+            limits=httpx.Limits(
+                max_connections=INSIGHT_MAX_CONCURRENCY,
+                max_keepalive_connections=INSIGHT_MAX_CONCURRENCY,
+                keepalive_expiry=120
+            )
+        )
+    return await loop_client("groq", create)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sunucu açılışında NLP modellerini bloklamadan ısıtır; /ready hazır olunca 200 döner."""
+    if NLP_WARMUP_ON_STARTUP:
+        threading.Thread(target=nlp_pipeline.warmup, name="nlp-warmup", daemon=True).start()
+    if token_verifier is not None:
+        threading.Thread(target=token_verifier.prefetch, name="jwks-prefetch", daemon=True).start()
+    yield
+    groq = _async_clients.pop("groq", None)
+    if groq is not None:
+        await groq[1].aclose()
+
+
+app = FastAPI(title="DailyMind AI API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -68,8 +202,97 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Her isteğin süresini route şablonu bazında kaydeder (/predict-mood/{entry_id} gibi)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+async def supabase_call(operation: str, call):
+    """Supabase çağrısını (query.execute, auth.*) süre ve hata metrikleriyle bekler"""
+    with SUPABASE_SECONDS.time(operation=operation):
+        try:
+            return await call()
+        except Exception:
+            SUPABASE_ERRORS_TOTAL.inc(operation=operation)
+            raise
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Çıkarım kuyrukları dolu: istemci kısa süre sonra tekrar denemeli"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def collect_runtime_metrics() -> list:
+    """Cache ve mikro-batch sayaçları zaten kendi modüllerinde tutulur; scrape anında okunur"""
+    cache = nlp_pipeline.cache_stats()
+    batching = analysis_scheduler.stats()
+    families = [
+        ("dailymind_nlp_cache_lookups_total", "counter", "NLP cache sorguları (sonuç: hits_memory / hits_disk / misses)", [
+            ({"cache": tier, "result": result}, cache[tier][result])
+            for tier in ("analysis", "embedding")
+            for result in ("hits_memory", "hits_disk", "misses")
+        ]),
+        ("dailymind_batch_queue_depth", "gauge", "Mikro-batch kuyruğunda bekleyen analiz sayısı", [
+            ({}, batching["queue_depth"])
+        ]),
+        ("dailymind_batch_items_total", "counter", "Mikro-batch ile analiz edilen metin sayısı", [
+            ({}, batching["items"])
+        ]),
+        ("dailymind_inference_in_flight", "gauge", "Çıkarım havuzunda çalışan veya bekleyen iş", [
+            ({}, inference_executor.stats()["in_flight"])
+        ]),
+        ("dailymind_inference_rejected_total", "counter", "Kuyruk dolu olduğu için reddedilen çıkarım işleri", [
+            ({"queue": "batch"}, batching["rejected"]),
+            ({"queue": "executor"}, inference_executor.stats()["rejected"]),
+        ]),
+    ]
+    cascade = nlp_pipeline.cascade_stats()
+    if cascade:
+        families.append(("dailymind_sentiment_cascade_total", "counter", "Duygu cascade'inde yönlendirilen metinler", [
+            ({"path": "fast"}, cascade["fast_path"]), ({"path": "bert"}, cascade["bert"])
+        ]))
+    reads = read_cache.stats()
+    families.append(("dailymind_read_cache_lookups_total", "counter", "Kullanıcı okuma cache'i sorguları (GET /entries, /insights, /predict-mood)", [
+        ({"kind": kind, "result": result}, reads[kind][field])
+        for kind in ("entries", "insight", "predict") if kind in reads
+        for result, field in (("hit", "hits"), ("miss", "misses"))
+    ]))
+    families.append(("dailymind_read_cache_invalidations_total", "counter", "Yazma sonrası düşürülen kullanıcı cache'leri", [
+        ({}, reads["invalidations"])
+    ]))
+    families.append(("dailymind_insight_generations_in_flight", "gauge", "Arka planda veya istekte süren içgörü üretimleri", [
+        ({}, sum(1 for task in _insight_tasks.values() if not task.done()))
+    ]))
+    ner_gate = nlp_pipeline.ner_gate_stats()
+    if ner_gate:
+        families.append(("dailymind_ner_gate_texts_total", "counter", "NER kapısından geçen metinler", [
+            ({"result": "skipped"}, ner_gate["skipped"]), ({"result": "ran"}, ner_gate["texts"] - ner_gate["skipped"])
+        ]))
+    return families
+
+REGISTRY.register_collector(collect_runtime_metrics)
+
+KONU_LISTESI = [
+    "İş ve Kariyer", "Eğitim ve Okul", "Sosyal İlişkiler", "Aile",
+    "Sağlık", "Finans ve Para", "Teknoloji", "Kişisel Gelişim", "Genel Günlük"
+]
+SCALED_FEATURES = ['kelime_sayisi', 'karakter_sayisi', 'duygu_skoru', 'varlik_toplam_sayi']
+
 def prepare_features_single(analysis_json: Dict, created_at_str: str) -> pd.DataFrame:
     """
     NLP analiz sonucunu ML modeli için feature vektörüne dönüştürür.
@@ -115,10 +338,6 @@ def prepare_features_single(analysis_json: Dict, created_at_str: str) -> pd.Data
         row[f'zaman_{tp}'] = 1 if time_period == tp else 0
 
     # Topic one-hot encoding
-    KONU_LISTESI = [
-        "İş ve Kariyer", "Eğitim ve Okul", "Sosyal İlişkiler", "Aile",
-        "Sağlık", "Finans ve Para", "Teknoloji", "Kişisel Gelişim", "Genel Günlük"
-    ]
     for konu in KONU_LISTESI:
         key = f"konu_{konu.replace(' ', '_').replace('İ', 'I').lower()}"
         row[key] = 1 if konu in topics else 0
@@ -141,11 +360,170 @@ def prepare_features_single(analysis_json: Dict, created_at_str: str) -> pd.Data
     
     # Feature scaling
     if SCALER:
-        cols_to_scale = ['kelime_sayisi', 'karakter_sayisi', 'duygu_skoru', 'varlik_toplam_sayi']
-        df[cols_to_scale] = SCALER.transform(df[cols_to_scale])
+        df[SCALED_FEATURES] = SCALER.transform(df[SCALED_FEATURES])
         
     return df
 
+def parse_created_at(created_at_str: str) -> datetime:
+    """ISO tarih; offset korunur (saat, pd.to_datetime'daki gibi girişin kendi saat diliminde)"""
+    try:
+        return datetime.fromisoformat(created_at_str)
+    except (TypeError, ValueError):
+        return pd.to_datetime(created_at_str).to_pydatetime()
+
+def prepare_features_batch(entries: List[Dict]) -> pd.DataFrame:
+    """
+    prepare_features_single'ın toplu hali: tüm girişlerin feature matrisini NumPy ile
+    tek geçişte kurar ve ölçekler (aynı kolonlar, aynı değerler).
+
+    Args:
+        entries: 'analiz_sonucu' ve 'created_at' alanları olan girişler
+
+    Returns:
+        DataFrame: MODEL_FEATURES kolonlarıyla (len(entries), len(MODEL_FEATURES)) matris
+    """
+    n = len(entries)
+    columns = {name: i for i, name in enumerate(MODEL_FEATURES)}
+    matrix = np.zeros((n, len(MODEL_FEATURES)), dtype=np.float64)
+
+    # JSON alanlarını kolon dizilerine topla (satır başına tek Python geçişi)
+    words = np.zeros(n)
+    chars = np.zeros(n)
+    raw_scores = np.zeros(n)
+    sign = np.ones(n)
+    hours = np.zeros(n, dtype=np.int64)
+    weekdays = np.zeros(n, dtype=np.int64)
+    entity_totals = np.zeros(n)
+    entity_counts = np.zeros((n, 3))
+    topic_hits = np.zeros((n, len(KONU_LISTESI)))
+    entity_types = {'PER': 0, 'ORG': 1, 'LOC': 2}
+    topic_index = {konu: i for i, konu in enumerate(KONU_LISTESI)}
+
+    for i, entry in enumerate(entries):
+        analysis_json = entry['analiz_sonucu']
+        metrics = analysis_json.get('metrics', {'kelime_sayisi': 0, 'karakter_sayisi': 0})
+        words[i] = metrics.get('kelime_sayisi', 0)
+        chars[i] = metrics.get('karakter_sayisi', 0)
+        sentiment = analysis_json.get('sentiment', {})
+        raw_scores[i] = sentiment.get('skor', 0)
+        label = sentiment.get('duygu', 'neutral')
+        sign[i] = -1 if label == 'negative' else 0 if label == 'neutral' else 1
+        created_at = parse_created_at(entry['created_at'])
+        hours[i] = created_at.hour
+        weekdays[i] = created_at.weekday()
+        entities = analysis_json.get('entities', [])
+        entity_totals[i] = len(entities)
+        for e in entities:
+            if e['varlik'] in entity_types:
+                entity_counts[i, entity_types[e['varlik']]] += 1
+        for konu in analysis_json.get('topics', []):
+            if konu in topic_index:
+                topic_hits[i, topic_index[konu]] = 1
+
+    def put(name, values):
+        if name in columns:
+            matrix[:, columns[name]] = values
+
+    put('kelime_sayisi', words)
+    put('karakter_sayisi', chars)
+    put('duygu_skoru', raw_scores * sign)
+    put('varlik_toplam_sayi', entity_totals)
+
+    # Temporal features
+    put('saat', hours)
+    put('hafta_sonu', weekdays >= 5)
+    for d in range(7):
+        put(f'gun_{d}', weekdays == d)
+    periods = np.digitize(hours, [6, 12, 18])  # 0: gece, 1: sabah, 2: ogle, 3: aksam
+    for p, tp in enumerate(['gece', 'sabah', 'ogle', 'aksam']):
+        put(f'zaman_{tp}', periods == p)
+
+    for konu, i in topic_index.items():
+        put(f"konu_{konu.replace(' ', '_').replace('İ', 'I').lower()}", topic_hits[:, i])
+    for etype, i in entity_types.items():
+        put(f'varlik_sayisi_{etype}', entity_counts[:, i])
+
+    # Feature scaling (StandardScaler ise doğrudan (x - ortalama) / ölçek)
+    if SCALER and n:
+        idx = [columns[name] for name in SCALED_FEATURES]
+        if getattr(SCALER, 'mean_', None) is not None and getattr(SCALER, 'scale_', None) is not None:
+            matrix[:, idx] = (matrix[:, idx] - SCALER.mean_) / SCALER.scale_
+        else:
+            matrix[:, idx] = SCALER.transform(pd.DataFrame(matrix[:, idx], columns=SCALED_FEATURES))
+
+    return pd.DataFrame(matrix, columns=MODEL_FEATURES)
+
+# --- SEMANTİK ARAMA YARDIMCILARI ---
+SEARCH_FIELDS = ("id", "metin", "created_at", "analiz_sonucu")
+EMBEDDING_FIELDS = ("embedding", "embedding_model")
+# GET /entries?fields= ile istenebilecek sütunlar; id ve created_at (sayfalama anahtarı) her zaman döner
+ENTRY_LIST_FIELDS = ("id", "created_at", "metin", "analiz_sonucu", "mood_score", "mood_emoji", "mood_model_version")
+ENTRIES_MAX_LIMIT = 200
+
+def strip_embedding(row: Dict) -> Dict:
+    """Embedding sütunları istemciye gönderilmez"""
+    return {k: v for k, v in row.items() if k not in EMBEDDING_FIELDS}
+
+def search_entry(row: Dict) -> Dict:
+    """Arama indeksinde giriş başına tutulan alanlar"""
+    return {k: row.get(k) for k in SEARCH_FIELDS}
+
+def entry_embedding(metin: str):
+    """Girişin SBERT embedding'i (analiz sırasında cache'e yazılmış olur); alınamazsa None"""
+    if nlp_pipeline.NLP_MODE != "full":
+        return None
+    try:
+        return nlp_pipeline.get_sentence_embedding(metin.strip())[0].numpy()
+    except Exception as e:
+        print(f"⚠️ Embedding alınamadı, giriş aramaya eklenmeyecek: {e}")
+        return None
+
+def load_user_vectors(user_id: str, db: AsyncClient, loop) -> list:
+    """
+    Kullanıcının tüm girişlerini ve kayıtlı embedding'lerini çeker.
+    Embedding'i olmayan (eski) veya başka modelle üretilmiş girişler bir kez
+    hesaplanıp veritabanına yazılır.
+
+    Çıkarım havuzunda çalışır; Supabase çağrıları isteğin event loop'una gönderilir.
+    """
+    def run(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    rows = []
+    page = 1000
+    while True:
+        query = db.table("gunluk_girisler")\
+            .select(", ".join(SEARCH_FIELDS + EMBEDDING_FIELDS))\
+            .eq("user_id", user_id)\
+            .order("id")\
+            .range(len(rows), len(rows) + page - 1)
+        data, _ = run(supabase_call("search_load", query.execute))
+        rows.extend(data[1])
+        if len(data[1]) < page:
+            break
+
+    vectors = []
+    missing = []
+    for row in rows:
+        if row.get("embedding") and row.get("embedding_model") == nlp_pipeline.EMBEDDING_VERSION:
+            vectors.append((search_entry(row), decode_embedding(row["embedding"])))
+        elif row.get("metin"):
+            missing.append(row)
+
+    for start in range(0, len(missing), nlp_pipeline.ANALYSIS_BATCH_SIZE):
+        chunk = missing[start:start + nlp_pipeline.ANALYSIS_BATCH_SIZE]
+        embeddings = nlp_pipeline.get_sentence_embedding([row["metin"].strip() for row in chunk])
+        for row, embedding in zip(chunk, embeddings):
+            encoded = encode_embedding(embedding.numpy())
+            run(supabase_call("embedding_backfill", db.table("gunluk_girisler").update({
+                "embedding": encoded,
+                "embedding_model": nlp_pipeline.EMBEDDING_VERSION
+            }).eq("id", row["id"]).execute))
+            vectors.append((search_entry(row), decode_embedding(encoded)))
+    if missing:
+        print(f"🔎 {len(missing)} eski giriş için embedding hesaplandı (user {user_id})")
+    return vectors
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 class UserAuth(BaseModel):
@@ -153,15 +531,49 @@ class UserAuth(BaseModel):
     password: str
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Supabase JWT token'ı doğrular ve kullanıcı bilgisini döner."""
+    """
+    Supabase JWT token'ı doğrular ve kullanıcı bilgisini döner.
+
+    Sıra: token cache -> yerel imza/süre kontrolü -> Supabase auth.get_user.
+    AUTH_STRICT_REMOTE=1 iken doğrudan Supabase'e sorulur.
+    """
+    if not AUTH_STRICT_REMOTE:
+        user = token_cache.get(token)
+        if user is not None:
+            AUTH_TOTAL.inc(method="cache", result="ok")
+            return user
+        if token_verifier is not None:
+            try:
+                if token_verifier.may_fetch(token):
+                    # JWKS yenilemesi / bilinmeyen kid HTTP isteği yapar: event loop'u bekletmesin
+                    user = await asyncio.to_thread(token_verifier.verify, token)
+                else:
+                    user = token_verifier.verify(token)
+                token_cache.put(token, user, user.expires_at)
+                AUTH_TOTAL.inc(method="local", result="ok")
+                return user
+            except InvalidToken as e:
+                AUTH_TOTAL.inc(method="local", result="invalid")
+                print(f"❌ Auth Error: {str(e)}")
+                raise HTTPException(status_code=401, detail=f"Yetkilendirme hatası: {str(e)}")
+            except UnverifiableToken:
+                pass  # Anahtarı bilinmiyor: Supabase'e sor
+
+    db = await get_supabase()
+    if not db:
+        raise HTTPException(500, "DB Bağlantı Hatası")
     try:
-        response = supabase.auth.get_user(token)
+        response = await supabase_call("auth_get_user", lambda: db.auth.get_user(token))
         if not response or not response.user:
             raise HTTPException(status_code=401, detail="Geçersiz token")
         
         print(f"✅ Authenticated User ID: {response.user.id}")
+        AUTH_TOTAL.inc(method="remote", result="ok")
+        if not AUTH_STRICT_REMOTE:
+            token_cache.put(token, response.user, token_expiry(token))
         return response.user
     except Exception as e:
+        AUTH_TOTAL.inc(method="remote", result="invalid")
         print(f"❌ Auth Error: {str(e)}")
         raise HTTPException(status_code=401, detail=f"Yetkilendirme hatası: {str(e)}")
 
@@ -169,29 +581,81 @@ class Girdi(BaseModel):
     metin: str
 
 @app.get("/")
-def root():
+async def root():
     return {"status": "Running", "model": "Mood Regressor"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness kontrolü: modeller yüklenene kadar 503 döner.
+    
+    Returns:
+        ready: Tüm modeller hazır mı
+        models: Model bazında yükleme durumu
+        startup: Import ve yükleme süreleri (saniye)
+    """
+    models = nlp_pipeline.model_status()
+    models["mood_regressor"] = {"state": "loaded" if MOOD_MODEL else "failed"}
+    is_ready = nlp_pipeline.is_ready() and MOOD_MODEL is not None
+    
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "backend": nlp_pipeline.ACTIVE_BACKEND,
+            "models": models,
+            "startup": {"main": STARTUP_TIMINGS, "nlp": nlp_pipeline.startup_report()}
+        }
+    )
+
+@app.get("/stats")
+async def stats():
+    """NLP cache'lerinin hit/miss sayaçlarını, mikro-batch kuyruğu ve duygu cascade'i istatistiklerini döner."""
+    return {
+        "cache": nlp_pipeline.cache_stats(),
+        "batching": analysis_scheduler.stats(),
+        "inference": inference_executor.stats(),
+        "sentiment_cascade": nlp_pipeline.cascade_stats(),
+        "ner_gate": nlp_pipeline.ner_gate_stats(),
+        "search": vector_indexes.stats(),
+        "read_cache": read_cache.stats(),
+        "auth": {
+            "mode": "remote" if AUTH_STRICT_REMOTE else ("local" if token_verifier else "remote_cached"),
+            "token_cache": token_cache.stats(),
+        },
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metin formatında süre histogramları ve sayaçlar."""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/auth/signup")
-def signup(user: UserAuth):
+async def signup(user: UserAuth):
     """Yeni kullanıcı kaydı oluşturur."""
+    db = await get_supabase()
+    if not db:
+        raise HTTPException(500, "DB Bağlantı Hatası")
     try:
-        response = supabase.auth.sign_up({
+        response = await supabase_call("auth_sign_up", lambda: db.auth.sign_up({
             "email": user.email,
             "password": user.password
-        })
+        }))
         return {"msg": "Kayıt başarılı", "user": response.user}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/auth/login")
-def login(user: UserAuth):
+async def login(user: UserAuth):
     """Kullanıcı girişi yapar ve JWT token döner."""
+    db = await get_supabase()
+    if not db:
+        raise HTTPException(500, "DB Bağlantı Hatası")
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await supabase_call("auth_sign_in", lambda: db.auth.sign_in_with_password({
             "email": user.email,
             "password": user.password
-        })
+        }))
         return {
             "access_token": response.session.access_token,
             "token_type": "bearer",
@@ -201,7 +665,7 @@ def login(user: UserAuth):
         raise HTTPException(status_code=400, detail="Giriş başarısız. Email veya şifre hatalı.")
 
 @app.post("/entries")
-def create_entry(girdi: Girdi, user: Any = Depends(get_current_user)):
+async def create_entry(girdi: Girdi, score: bool = False, user: Any = Depends(get_current_user)):
     """
     Yeni günlük girişi oluşturur ve NLP analizi yapar.
     
@@ -209,49 +673,356 @@ def create_entry(girdi: Girdi, user: Any = Depends(get_current_user)):
     1. Metni NLP pipeline'a gönder
     2. Analiz sonucunu veritabanına kaydet
     3. User ID ile ilişkilendir
+
+    score=true: Yanıta /predict-mood ile aynı biçimde "ai_prediction" eklenir
+    (bellekteki analizden; ayrı istek ve veritabanı okuması gerekmez). Model
+    yüklü değilse veya tahmin alınamadıysa None döner.
     """
-    if not supabase: 
+    db = await get_supabase()
+    if not db: 
         raise HTTPException(500, "DB Bağlantı Hatası")
     
     try:
         print(f"Gelen metin: {girdi.metin[:30]}...")
         print(f"User ID: {user.id}")
         
-        analiz = analyze_text(girdi.metin)
+        analiz = await analysis_scheduler.analyze_async(girdi.metin)
         if analiz.get("hata"): 
             raise HTTPException(500, analiz["hata"])
 
-        data, _ = supabase.table('gunluk_girisler').insert({
+        # Analizde hesaplanan SBERT embedding'i cache'ten alınır, arama için saklanır
+        embedding = await inference_executor.run(entry_embedding, girdi.metin)
+        row = {
             "metin": girdi.metin,
             "analiz_sonucu": analiz,
-            "user_id": str(user.id)
-        }).execute()
-        
-        print(f"✅ Entry created: {data[1][0]['id']}")
-        return {"status": "success", "data": data[1][0]}
+            "user_id": str(user.id),
+            # Mood feature'ları saate bağlı: tahminle aynı zaman damgası yazılır
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        if MOOD_MODEL:
+            try:
+                prediction = await inference_executor.run(predict_entry_mood, row)
+                row.update(mood_columns(prediction))
+            except QueueFullError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Mood tahmini yazılamadı, ilk okumada hesaplanacak: {e}")
+        if embedding is not None:
+            row["embedding"] = encode_embedding(embedding)
+            row["embedding_model"] = nlp_pipeline.EMBEDDING_VERSION
+
+        data, _ = await supabase_call("entries_insert", db.table('gunluk_girisler').insert(row).execute)
+        entry = data[1][0]
+        read_cache.invalidate(str(user.id))
+        run_in_background(record_topic_stats(
+            db, str(user.id), entry["id"], analiz.get("topics", []),
+            row.get("mood_score") if MOOD_MODEL else 3.0
+        ))
+        if embedding is not None:
+            vector_indexes.add(str(user.id), search_entry(entry), decode_embedding(row["embedding"]))
+
+        print(f"✅ Entry created: {entry['id']}")
+        response = {"status": "success", "data": strip_embedding(entry)}
+        if score:
+            if "mood_score" in row:
+                mood_score = clamp_mood(row["mood_score"])
+                emoji, msg = mood_bucket(mood_score)
+                response["ai_prediction"] = {"mood_score": mood_score, "emoji": emoji, "message": msg}
+            else:
+                if not MOOD_MODEL:
+                    MODEL_MISSING_TOTAL.inc(endpoint="create_entry")
+                response["ai_prediction"] = None
+        return response
+    except QueueFullError:
+        raise
     except Exception as e:
         print(f"❌ Insert Error: {str(e)}")
         raise HTTPException(500, str(e))
 
+def encode_cursor(row: Dict) -> str:
+    """Sayfanın son satırından (created_at, id) keyset cursor'ı"""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, entry_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # Filtreye yalnızca ISO zaman damgası girer (pd.to_datetime "now" gibi değerleri de kabul ederdi)
+        if not isinstance(created_at, str) or not isinstance(entry_id, int) or isinstance(entry_id, bool):
+            raise ValueError("cursor biçimi")
+        return datetime.fromisoformat(created_at).isoformat(), entry_id
+    except (TypeError, ValueError):
+        raise HTTPException(400, "Geçersiz cursor")
+
+def entry_columns(fields: Optional[str]) -> str:
+    """fields= parametresini select listesine çevirir (verilmezse embedding dışındaki tüm sütunlar)"""
+    if not fields:
+        return ", ".join(ENTRY_LIST_FIELDS + ("user_id",))
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in ENTRY_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Bilinmeyen alan(lar): {', '.join(unknown)}. İzin verilenler: {', '.join(ENTRY_LIST_FIELDS)}")
+    return ", ".join(dict.fromkeys(["id", "created_at", *requested]))
+
 @app.get("/entries")
-def get_entries(limit: int = 50, user: Any = Depends(get_current_user)):
-    """Kullanıcının günlüklerini tarih sırasına göre getirir."""
-    if not supabase: 
+async def get_entries(
+    request: Request,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    user: Any = Depends(get_current_user)
+):
+    """
+    Kullanıcının günlüklerini tarih sırasına göre (yeniden eskiye) getirir.
+
+    Args:
+        limit: Sayfa boyutu (en fazla ENTRIES_MAX_LIMIT)
+        cursor: Önceki yanıtın X-Next-Cursor başlığı; (created_at, id) keyset sayfalaması
+        fields: Virgülle ayrılmış sütunlar (ör. "metin,mood_emoji"); liste ekranları ağır
+            analiz_sonucu'nu almayabilir. id ve created_at her zaman döner.
+
+    Yanıt gövdesi girişlerin listesidir. Başlıklar:
+        X-Next-Cursor: Sonraki sayfa (son sayfada yok)
+        ETag: Gövdenin hash'i; If-None-Match eşleşirse 304 döner
+    """
+    user_id = str(user.id)
+    limit = max(1, min(limit, ENTRIES_MAX_LIMIT))
+    columns = entry_columns(fields)
+    after = decode_cursor(cursor) if cursor else None
+    cache_key = ("entries", limit, cursor, columns)
+
+    page = read_cache.get(user_id, cache_key)
+    if page is None:
+        db = await get_supabase()
+        if not db: 
+            raise HTTPException(500, "DB Hatası")
+        
+        try:
+            version = read_cache.version(user_id)
+            query = db.table("gunluk_girisler")\
+                .select(columns)\
+                .eq("user_id", user.id)
+            if after:
+                created_at, entry_id = after
+                query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{entry_id})')
+            query = query\
+                .order("created_at", desc=True)\
+                .order("id", desc=True)\
+                .limit(limit + 1)
+            data, _ = await supabase_call("entries_list", query.execute)
+            rows = [strip_embedding(row) for row in data[1]]
+        except Exception as e:
+            raise HTTPException(500, str(e))
+
+        entries = rows[:limit]
+        body = json.dumps(entries, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        page = {
+            "body": body,
+            "etag": '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            "next_cursor": encode_cursor(entries[-1]) if len(rows) > limit else None,
+        }
+        read_cache.put(user_id, cache_key, page, version)
+
+    headers = {"ETag": page["etag"], "Cache-Control": "private, no-cache"}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if_none_match = request.headers.get("if-none-match", "")
+    if page["etag"] in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=page["body"], media_type="application/json", headers=headers)
+
+@app.get("/entries/search")
+async def search_entries(q: str, limit: int = 10, user: Any = Depends(get_current_user)):
+    """
+    Kullanıcının günlüklerinde anlamsal (semantik) arama yapar.
+
+    Sorgu metni SBERT ile vektörleştirilir ve kullanıcının bellekteki indeksinde
+    en yakın girişler bulunur; girişler yeniden vektörleştirilmez.
+    """
+    db = await get_supabase()
+    if not db:
         raise HTTPException(500, "DB Hatası")
-    
+    if nlp_pipeline.NLP_MODE != "full":
+        raise HTTPException(503, "Semantik arama yalnızca NLP_MODE=full ile kullanılabilir")
+    query_text = q.strip()
+    if not query_text:
+        raise HTTPException(400, "Arama metni boş olamaz")
+    limit = max(1, min(limit, 50))
+
     try:
-        data, _ = supabase.table("gunluk_girisler")\
-            .select("*")\
-            .eq("user_id", user.id)\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .execute()
-        return data[1]
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        def search():
+            # Önce sorgu: modelleri yükler, indeks EMBEDDING_VERSION'ı kullanılan backend'le karşılaştırır
+            query = nlp_pipeline.get_sentence_embedding(query_text)[0].numpy()
+            index = vector_indexes.get(str(user.id), lambda user_id: load_user_vectors(user_id, db, loop))
+            return index.search(query, limit)
+
+        results = await inference_executor.run(search)
+        return {
+            "query": query_text,
+            "took_ms": round(1000 * (time.perf_counter() - start), 2),
+            "results": [{**entry, "score": round(score, 4)} for entry, score in results],
+        }
+    except QueueFullError:
+        raise
     except Exception as e:
+        print(f"❌ Arama hatası: {e}")
         raise HTTPException(500, str(e))
 
+def predict_entry_mood(entry: Dict) -> float:
+    """Tek girişin mood tahmini (CPU; çıkarım havuzunda çalışır)"""
+    with MOOD_SECONDS.time(step="features"):
+        features = prepare_features_single(entry['analiz_sonucu'], entry['created_at'])
+    with MOOD_SECONDS.time(step="predict"):
+        return MOOD_MODEL.predict(features)[0]
+
+def predict_entry_moods(entries: List[Dict]) -> List[float]:
+    """Girişlerin mood tahminleri; model yoksa nötr 3.0"""
+    if not MOOD_MODEL:
+        MODEL_MISSING_TOTAL.inc(endpoint="insights")
+        return [3.0] * len(entries)
+    if not entries:
+        return []
+    with MOOD_SECONDS.time(step="features"):
+        features = prepare_features_batch(entries)
+    with MOOD_SECONDS.time(step="predict"):
+        return MOOD_MODEL.predict(features).tolist()
+
+MOOD_FIELDS = ("mood_score", "mood_emoji", "mood_model_version")
+
+def mood_bucket(mood_score: float) -> tuple:
+    """1.0-5.0 arası skorun emoji ve mesajı"""
+    if mood_score >= 4.5: 
+        return "🤩", "Harika bir gün geçirmişsin!"
+    elif mood_score >= 3.5: 
+        return "😊", "Gayet olumlu ve keyifli."
+    elif mood_score >= 2.5: 
+        return "😐", "Rutin bir gün."
+    elif mood_score >= 1.5: 
+        return "😔", "Biraz zorlu olmuş."
+    else: 
+        return "😫", "Çok stresli bir gün, kendine dikkat et."
+
+def clamp_mood(prediction: float) -> float:
+    return max(1.0, min(5.0, round(prediction, 1)))
+
+def mood_columns(prediction: float) -> Dict:
+    """Girişe yazılan mood sütunları (ham tahmin saklanır; insights ortalamaları bunu kullanır)"""
+    return {
+        "mood_score": float(prediction),
+        "mood_emoji": mood_bucket(clamp_mood(prediction))[0],
+        "mood_model_version": MOOD_MODEL_VERSION,
+    }
+
+def stored_mood(entry: Dict) -> Optional[float]:
+    """Girişte güncel modelle yazılmış tahmin varsa onu döner, yoksa None"""
+    if entry.get("mood_score") is None or entry.get("mood_model_version") != MOOD_MODEL_VERSION:
+        return None
+    return float(entry["mood_score"])
+
+# Yanıtı bekletmeden çalışan yazma işleri (referans tutulmazsa task GC'ye gidebilir)
+_background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def write_moods(db: AsyncClient, user_id: str, rows: List[tuple]):
+    """Eski/eksik mood tahminlerini (entry_id, tahmin) kullanıcının girişlerine yazar"""
+    try:
+        await asyncio.gather(*[
+            supabase_call("mood_backfill", db.table("gunluk_girisler").update(mood_columns(prediction)).eq("id", entry_id).execute)
+            for entry_id, prediction in rows
+        ])
+        read_cache.invalidate(user_id, "entries")
+        print(f"💾 {len(rows)} giriş için mood tahmini güncellendi ({MOOD_MODEL_VERSION})")
+    except Exception as e:
+        print(f"⚠️ Mood tahminleri yazılamadı: {e}")
+
+# --- KONU BAZLI MOOD TOPLAMLARI (user_topic_stats) ---
+TOPIC_RECENT_LIMIT = 5
+TOPIC_STATS_ENTRY_FIELDS = "id, created_at, analiz_sonucu, mood_score, mood_model_version"
+
+async def clear_topic_stats(db: AsyncClient, user_id: str):
+    """Toplamları siler; sonraki /insights tüm geçmişten yeniden kurar"""
+    await supabase_call("topic_stats_clear", db.table("user_topic_stats").delete().eq("user_id", user_id).execute)
+
+async def record_topic_stats(db: AsyncClient, user_id: str, entry_id: int, topics: List[str], mood: Optional[float]):
+    """Yeni girişi konularının toplamlarına ekler (RPC, tek round trip ve atomik)"""
+    try:
+        if mood is None:
+            raise ValueError("girişin mood tahmini yok")
+        await supabase_call("topic_stats_add", db.rpc("add_entry_to_topic_stats", {
+            "p_user_id": user_id,
+            "p_topics": topics,
+            "p_mood": mood,
+            "p_entry_id": entry_id,
+            "p_model_version": MOOD_MODEL_VERSION,
+            "p_recent_limit": TOPIC_RECENT_LIMIT,
+        }).execute)
+    except Exception as e:
+        # Eksik kalan toplam yanlış içgörü üretmesin: silinir, ilk /insights'ta yeniden kurulur
+        print(f"⚠️ Konu toplamları güncellenemedi, yeniden kurulacak: {e}")
+        try:
+            await clear_topic_stats(db, user_id)
+        except Exception as clear_error:
+            print(f"⚠️ Konu toplamları silinemedi: {clear_error}")
+
+async def rebuild_topic_stats(db: AsyncClient, user_id: str) -> List[Dict]:
+    """
+    Toplamları kullanıcının tüm geçmişinden yeniden kurar (ilk kullanım veya Mood
+    Regressor değiştiğinde). Yalnızca mood tahmini eksik/eski girişler okunur; tahminleri
+    hesaplanıp girişlere de yazılır. Toplama ve yazma, eşzamanlı add_entry_to_topic_stats
+    çağrılarıyla çakışmasın diye tek transaction'da rebuild_topic_stats RPC'sinde yapılır.
+    """
+    entries = []
+    last_id = 0
+    page = 1000
+    while True:
+        query = db.table("gunluk_girisler")\
+            .select(TOPIC_STATS_ENTRY_FIELDS)\
+            .eq("user_id", user_id)
+        if MOOD_MODEL_VERSION:
+            query = query.or_(f"mood_model_version.is.null,mood_model_version.neq.{MOOD_MODEL_VERSION}")
+        # Keyset: tarama sırasında eklenen girişler sayfaları kaydırmaz
+        query = query.gt("id", last_id).order("id").limit(page)
+        data, _ = await supabase_call("topic_stats_entries", query.execute)
+        if not data[1]:
+            break
+        last_id = data[1][-1]["id"]
+        entries.extend(data[1])
+        if len(data[1]) < page:
+            break
+
+    stale = [entry for entry in entries if entry.get("analiz_sonucu") and stored_mood(entry) is None]
+    moods = await inference_executor.run(predict_entry_moods, stale) if stale else []
+    if stale and MOOD_MODEL:
+        run_in_background(write_moods(db, user_id, [(entry["id"], mood) for entry, mood in zip(stale, moods)]))
+
+    data, _ = await supabase_call("topic_stats_rebuild", db.rpc("rebuild_topic_stats", {
+        "p_user_id": user_id,
+        "p_moods": {str(entry["id"]): float(mood) for entry, mood in zip(stale, moods)},
+        "p_model_version": MOOD_MODEL_VERSION,
+        "p_recent_limit": TOPIC_RECENT_LIMIT,
+    }).execute)
+    stats = data[1] or []
+    print(f"🧮 Konu toplamları yeniden kuruldu: {len(stats)} konu, {len(stale)} girişin mood tahmini hesaplandı (user {user_id})")
+    return stats
+
+async def load_topic_stats(db: AsyncClient, user_id: str) -> List[Dict]:
+    """Kullanıcının konu toplamları; yoksa veya başka model sürümüyle kurulduysa yeniden kurulur"""
+    query = db.table("user_topic_stats").select("*").eq("user_id", user_id)
+    data, _ = await supabase_call("topic_stats_get", query.execute)
+    stats = data[1]
+    if not stats or any(row.get("mood_model_version") != MOOD_MODEL_VERSION for row in stats):
+        stats = await rebuild_topic_stats(db, user_id)
+    return stats
+
 @app.get("/predict-mood/{entry_id}")
-def predict_mood(entry_id: int, user: Any = Depends(get_current_user)):
+async def predict_mood(entry_id: int, user: Any = Depends(get_current_user)):
     """
     Belirli bir günlük girişi için ML tabanlı mood skoru tahmin eder.
     
@@ -261,36 +1032,36 @@ def predict_mood(entry_id: int, user: Any = Depends(get_current_user)):
         message: Açıklayıcı mesaj
     """
     if not MOOD_MODEL: 
+        MODEL_MISSING_TOTAL.inc(endpoint="predict_mood")
         raise HTTPException(503, "Model Yüklenemedi")
+    user_id = str(user.id)
+    cached = read_cache.get(user_id, ("predict", entry_id))
+    if cached is not None:
+        return cached
+    db = await get_supabase()
+    if not db:
+        raise HTTPException(500, "DB Hatası")
     
     try:
-        data, _ = supabase.table("gunluk_girisler")\
+        version = read_cache.version(user_id)
+        query = db.table("gunluk_girisler")\
             .select("*")\
             .eq("id", entry_id)\
-            .eq("user_id", user.id)\
-            .execute()
+            .eq("user_id", user.id)
+        data, _ = await supabase_call("entry_get", query.execute)
             
         if not data[1]: 
             raise HTTPException(404, "Günlük bulunamadı veya erişim yetkiniz yok")
         
         entry = data[1][0]
-        features = prepare_features_single(entry['analiz_sonucu'], entry['created_at'])
-        prediction = MOOD_MODEL.predict(features)[0]
-        mood_score = max(1.0, min(5.0, round(prediction, 1)))
-        
-        # Mood kategorileri
-        if mood_score >= 4.5: 
-            emoji, msg = "🤩", "Harika bir gün geçirmişsin!"
-        elif mood_score >= 3.5: 
-            emoji, msg = "😊", "Gayet olumlu ve keyifli."
-        elif mood_score >= 2.5: 
-            emoji, msg = "😐", "Rutin bir gün."
-        elif mood_score >= 1.5: 
-            emoji, msg = "😔", "Biraz zorlu olmuş."
-        else: 
-            emoji, msg = "😫", "Çok stresli bir gün, kendine dikkat et."
+        prediction = stored_mood(entry)
+        if prediction is None:
+            prediction = await inference_executor.run(predict_entry_mood, entry)
+            run_in_background(write_moods(db, user_id, [(entry["id"], prediction)]))
+        mood_score = clamp_mood(prediction)
+        emoji, msg = mood_bucket(mood_score)
 
-        return {
+        result = {
             "entry_id": entry_id,
             "ai_prediction": {
                 "mood_score": mood_score,
@@ -298,12 +1069,16 @@ def predict_mood(entry_id: int, user: Any = Depends(get_current_user)):
                 "message": msg
             }
         }
+        read_cache.put(user_id, ("predict", entry_id), result, version)
+        return result
         
+    except QueueFullError:
+        raise
     except Exception as e:
         print(f"Hata: {e}")
         raise HTTPException(500, f"Tahmin hatası: {str(e)}")
 
-def get_ai_advice(topic: str, mood_score: float, entries_text: List[str]) -> str:
+async def get_ai_advice(topic: str, mood_score: float, entries_text: List[str]) -> str:
     """
     Groq API (Llama 3.1) kullanarak kişiselleştirilmiş psikolojik tavsiye üretir.
     
@@ -333,14 +1108,14 @@ Kullanıcıya 1-2 cümlelik uygulanabilir tavsiye ver."""
 
     # Groq API çağrısı
     if GROQ_API_KEY:
+        fallback_reason = "groq_error"
+        start = time.perf_counter()
+        outcome = "error"
         try:
             print(f"🚀 Groq API (Llama 3.1) deneniyor... Konu: {topic}")
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
+            groq = await get_groq_client()
+            response = await groq.post(
+                "/chat/completions",
                 json={
                     "model": "llama-3.1-8b-instant",
                     "messages": [
@@ -349,24 +1124,30 @@ Kullanıcıya 1-2 cümlelik uygulanabilir tavsiye ver."""
                     ],
                     "max_tokens": 150,
                     "temperature": 0.7
-                },
-                timeout=15
+                }
             )
             
             if response.status_code == 200:
                 result = response.json()["choices"][0]["message"]["content"].strip()
+                outcome = fallback_reason = "short_response"
                 if result and len(result) > 20:
+                    outcome = "success"
                     print(f"✅ Groq başarılı: {result[:60]}...")
                     return result
             else:
+                outcome = fallback_reason = "http_error"
                 print(f"⚠️ Groq hatası: {response.status_code}")
                 
         except Exception as e:
             print(f"❌ Groq bağlantı hatası: {e}")
+        finally:
+            GROQ_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
     else:
+        fallback_reason = "no_api_key"
         print("⚠️ GROQ_API_KEY bulunamadı!")
     
     # Fallback mesajları (mood_score bazlı)
+    ADVICE_FALLBACK_TOTAL.inc(reason=fallback_reason)
     print("⚠️ AI kullanılamıyor, akıllı fallback mesajı döndürülüyor.")
     
     if mood_score < 2.5:
@@ -376,66 +1157,25 @@ Kullanıcıya 1-2 cümlelik uygulanabilir tavsiye ver."""
     else:
         return f"'{topic}' konusunda harika gidiyorsun! (Puan: {mood_score:.1f}/5). Bu pozitif enerjiyi korumaya devam et."
 
-@app.get("/insights")
-def generate_insights(user: Any = Depends(get_current_user)):
+async def build_insight(db: AsyncClient, user_id: str) -> Dict:
     """
-    Kullanıcının günlüklerini analiz ederek AI destekli içgörü üretir.
-    
-    Flow:
-    1. Cache kontrolü (7 gün) - Gereksiz AI çağrısı önleme
-    2. Günlükleri çek ve topic bazlı mood analizi yap
-    3. En iyi/kötü konuyu belirle
-    4. Groq AI'dan tavsiye al
-    5. Sonucu cache'e kaydet
-    
+    Topic bazlı mood toplamlarından hedef konuyu seçer, Groq'tan tavsiye alır ve
+    sonucu user_insights'a kaydeder.
+
     Returns:
-        insight: AI tavsiyesi
-        related_topic: İlgili konu
-        trend: "positive" | "negative" | "neutral"
-        source: "cache" | "new_gen"
+        insight, related_topic, trend, source ("new_gen" | "error")
     """
-    if not supabase:
-        return {"insight": "Veritabanı hatası.", "related_topic": None, "trend": "neutral"}
-
-    # Cache kontrolü (7 günlük)
-    yedi_gun_once = (datetime.utcnow() - timedelta(days=7)).isoformat()
-    
-    try:
-        existing_insight, _ = supabase.table("user_insights")\
-            .select("*")\
-            .eq("user_id", user.id)\
-            .gte("created_at", yedi_gun_once)\
-            .order("created_at", desc=True)\
-            .limit(1)\
-            .execute()
-        
-        if existing_insight[1]:
-            print("🔄 Cache'den veri getirildi (7 gün içinde).")
-            cached_data = existing_insight[1][0]
-            return {
-                "insight": cached_data["insight_text"],
-                "related_topic": cached_data["related_topic"],
-                "trend": cached_data["trend"],
-                "source": "cache"
-            }
-    except Exception as e:
-        print(f"Cache kontrol hatası: {e}")
-
-    # Yeni analiz başlat
-    print(f"🔍 Yeni analiz başlatılıyor... User: {user.id}")
+    print(f"🔍 Yeni analiz başlatılıyor... User: {user_id}")
     
     try:
-        data, _ = supabase.table("gunluk_girisler")\
-            .select("*")\
-            .eq("user_id", user.id)\
-            .order("created_at", desc=True)\
-            .limit(50)\
-            .execute()
-        
-        entries = data[1]
-        print(f"📚 {len(entries)} günlük bulundu.")
+        query = db.table("gunluk_girisler")\
+            .select("id", count="exact", head=True)\
+            .eq("user_id", user_id)
+        _, count = await supabase_call("insights_entry_count", query.execute)
+        entry_count = count[1] or 0
+        print(f"📚 {entry_count} günlük bulundu.")
         
-        if len(entries) < 3:
+        if entry_count < 3:
             return {
                 "insight": "Henüz yeterli veri yok, yazmaya devam et! 📝", 
                 "related_topic": None, 
@@ -443,28 +1183,14 @@ def generate_insights(user: Any = Depends(get_current_user)):
                 "source": "new_gen"
             }
 
-        # Topic bazlı mood agregasyonu
-        topic_moods = {} 
-        topic_entries_text = {}
-
-        for entry in entries:
-            features = prepare_features_single(entry['analiz_sonucu'], entry['created_at'])
-            predicted_mood = MOOD_MODEL.predict(features)[0] if MOOD_MODEL else 3.0
-            
-            topics = entry['analiz_sonucu'].get('topics', [])
-            for topic in topics:
-                if topic not in topic_moods:
-                    topic_moods[topic] = []
-                    topic_entries_text[topic] = []
-                
-                topic_moods[topic].append(predicted_mood)
-                topic_entries_text[topic].append(entry['metin'])
+        # Topic bazlı mood agregasyonu: her girişte güncellenen toplamlar (tüm geçmiş, konu sayısı kadar satır)
+        topic_stats = {row["topic"]: row for row in await load_topic_stats(db, user_id)}
 
         # Ortalama mood hesaplama
         avg_moods = []
-        for topic, scores in topic_moods.items():
-            if len(scores) >= 2:
-                avg = sum(scores) / len(scores)
+        for topic, row in topic_stats.items():
+            if row["entry_count"] >= 2:
+                avg = row["mood_sum"] / row["entry_count"]
                 avg_moods.append((topic, avg))
         
         if not avg_moods:
@@ -492,20 +1218,28 @@ def generate_insights(user: Any = Depends(get_current_user)):
             target_score = best_score
             trend = "positive"
 
-        # AI tavsiyesi al
-        relevant_texts = topic_entries_text[target_topic][:5]
+        # AI tavsiyesi al (konunun en yeni girişlerinin metinleri)
+        recent_ids = topic_stats[target_topic]["recent_entry_ids"][:TOPIC_RECENT_LIMIT]
+        query = db.table("gunluk_girisler")\
+            .select("id, metin")\
+            .in_("id", recent_ids)\
+            .eq("user_id", user_id)
+        data, _ = await supabase_call("insights_topic_texts", query.execute)
+        texts_by_id = {row["id"]: row["metin"] for row in data[1]}
+        relevant_texts = [texts_by_id[entry_id] for entry_id in recent_ids if entry_id in texts_by_id]
         print(f"🎯 Hedef konu: {target_topic}, Puan: {target_score:.1f}")
         
-        final_insight = get_ai_advice(target_topic, target_score, relevant_texts)
+        final_insight = await get_ai_advice(target_topic, target_score, relevant_texts)
 
         # Cache'e kaydet
         try:
-            supabase.table("user_insights").insert({
-                "user_id": str(user.id),
+            await supabase_call("insights_cache_put", db.table("user_insights").insert({
+                "user_id": user_id,
                 "insight_text": final_insight,
                 "related_topic": target_topic,
                 "trend": trend
-            }).execute()
+            }).execute)
+            read_cache.invalidate(user_id, "insight")
             print("💾 İçgörü kaydedildi.")
         except Exception as e:
             print(f"Cache kayıt hatası: {e}")
@@ -517,6 +1251,8 @@ def generate_insights(user: Any = Depends(get_current_user)):
             "source": "new_gen"
         }
 
+    except QueueFullError:
+        raise
     except Exception as e:
         print(f"❌ Insight Hatası: {e}")
         import traceback
@@ -526,4 +1262,117 @@ def generate_insights(user: Any = Depends(get_current_user)):
             "related_topic": None, 
             "trend": "neutral", 
             "source": "error"
-        }
\ No newline at end of file
+        }
+
+async def insight_semaphore() -> asyncio.Semaphore:
+    async def create():
+        return asyncio.Semaphore(INSIGHT_MAX_CONCURRENCY)
+    return await loop_client("insight_semaphore", create)
+
+def _log_insight_task(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Arka plan içgörü üretimi başarısız: {task.exception()}")
+
+def insight_generation(db: AsyncClient, user_id: str) -> asyncio.Task:
+    """
+    Kullanıcının içgörü üretimi (single-flight): sürmekte olan varsa aynı task döner.
+    Aynı anda en fazla INSIGHT_MAX_CONCURRENCY üretim (Groq çağrısı) çalışır.
+    """
+    task = _insight_tasks.get(user_id)
+    if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+        return task
+
+    async def generate():
+        async with await insight_semaphore():
+            return await build_insight(db, user_id)
+
+    task = asyncio.create_task(generate())
+    _insight_tasks[user_id] = task
+    task.add_done_callback(_log_insight_task)
+    task.add_done_callback(lambda t: _insight_tasks.pop(user_id, None) if _insight_tasks.get(user_id) is t else None)
+    return task
+
+def insight_too_old(insight: Dict) -> bool:
+    created_at = parse_created_at(insight["created_at"])
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created_at > timedelta(days=INSIGHT_MAX_AGE_DAYS)
+
+def insight_response(insight: Dict, refreshing: bool) -> Dict:
+    return {
+        "insight": insight["insight_text"],
+        "related_topic": insight["related_topic"],
+        "trend": insight["trend"],
+        "source": "cache",
+        "refreshing": refreshing
+    }
+
+async def insight_is_stale(db: AsyncClient, user_id: str, insight: Dict) -> bool:
+    """Son içgörü INSIGHT_MAX_AGE_DAYS'ten eski mi veya sonrasında INSIGHT_REFRESH_ENTRIES kadar giriş yazılmış mı"""
+    if insight_too_old(insight):
+        return True
+    query = db.table("gunluk_girisler")\
+        .select("id", count="exact", head=True)\
+        .eq("user_id", user_id)\
+        .gt("created_at", insight["created_at"])
+    _, count = await supabase_call("insights_new_entries", query.execute)
+    return (count[1] or 0) >= INSIGHT_REFRESH_ENTRIES
+
+@app.get("/insights")
+async def generate_insights(user: Any = Depends(get_current_user)):
+    """
+    Kullanıcının günlüklerini analiz ederek AI destekli içgörü üretir.
+    
+    Flow:
+    1. Son içgörü varsa hemen döner; INSIGHT_MAX_AGE_DAYS'ten eskiyse veya sonrasında
+       INSIGHT_REFRESH_ENTRIES kadar yeni giriş yazıldıysa yenisi arka planda üretilir
+    2. Hiç içgörü yoksa build_insight beklenir (konu toplamları -> hedef konu -> Groq -> kayıt)
+    
+    Returns:
+        insight: AI tavsiyesi
+        related_topic: İlgili konu
+        trend: "positive" | "negative" | "neutral"
+        source: "cache" | "new_gen" | "error"
+        refreshing: Cache'ten dönüldüyse arka planda yenisinin üretilip üretilmediği
+    """
+    user_id = str(user.id)
+    # Okuma cache'inde taze içgörü: cache'e konduğundan beri kullanıcı giriş yazmadı
+    # (yazsaydı kayıt düşerdi), yalnızca yaşı kontrol edilir
+    cached_data = read_cache.get(user_id, "insight")
+    if cached_data is not None and not insight_too_old(cached_data):
+        INSIGHT_CACHE_TOTAL.inc(result="hit")
+        return insight_response(cached_data, refreshing=False)
+
+    db = await get_supabase()
+    if not db:
+        return {"insight": "Veritabanı hatası.", "related_topic": None, "trend": "neutral"}
+
+    # Son içgörü (stale-while-revalidate): eskimişse bile hemen döner, yenisi arka planda üretilir
+    try:
+        version = read_cache.version(user_id)
+        query = db.table("user_insights")\
+            .select("*")\
+            .eq("user_id", user.id)\
+            .order("created_at", desc=True)\
+            .limit(1)
+        existing_insight, _ = await supabase_call("insights_cache_get", query.execute)
+        
+        if existing_insight[1]:
+            cached_data = existing_insight[1][0]
+            refreshing = await insight_is_stale(db, user_id, cached_data)
+            if refreshing:
+                INSIGHT_CACHE_TOTAL.inc(result="stale")
+                print("🔄 Eski içgörü döndürüldü, yenisi arka planda üretiliyor.")
+                insight_generation(db, user_id)
+            else:
+                INSIGHT_CACHE_TOTAL.inc(result="hit")
+                read_cache.put(user_id, "insight", cached_data, version)
+                print("🔄 Cache'den veri getirildi.")
+            return insight_response(cached_data, refreshing)
+    except Exception as e:
+        print(f"Cache kontrol hatası: {e}")
+
+    # Hiç içgörü yok: üretimi bekle (aynı kullanıcının eşzamanlı istekleri tek üretimi paylaşır;
+    # istek iptal edilse de üretim tamamlanıp kaydedilir)
+    INSIGHT_CACHE_TOTAL.inc(result="miss")
+    return await asyncio.shield(insight_generation(db, user_id))
\ No newline at end of file
@@ -0,0 +1,190 @@
+# metrics.py - Prometheus metin formatında (exposition format 0.0.4) sayaç ve histogramlar
+#
+# Ek bağımlılık gerektirmez; main.py bunları GET /metrics'ten sunar.
+# Değerler process başınadır: serve.py ile çalışırken her worker kendi
+# değerlerini raporlar (istek hangi worker'a düşerse onunkiler görünür).
+#
+# Kullanım:
+#   NLP_STAGE_SECONDS.observe(0.12, stage="ner")
+#   with SUPABASE_SECONDS.time(operation="entries_insert"): ...
+#   ADVICE_FALLBACK_TOTAL.inc(reason="no_api_key")
+
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # label değerleri -> [bucket sayaçları, toplam, adet]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Bloğun süresini (hata olsa da) kaydeder"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = {**labels, "le": _format_value(bound)}
+                lines.append(f"{self.name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Metrik ve collector listesi. Collector'lar başka modüllerin zaten tuttuğu
+    sayaçları (cache istatistikleri, kuyruk derinliği) scrape anında okur:
+    fn() -> [(isim, tip, açıklama, [(labels, değer)])]
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, fn):
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"⚠️ Metrik toplanamadı ({getattr(collector, '__name__', collector)}): {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- NLP ---
+NLP_STAGE_SECONDS = REGISTRY.histogram(
+    "dailymind_nlp_stage_seconds", "NLP aşamalarının batch başına süresi", ["stage"]
+)
+NLP_TEXTS_TOTAL = REGISTRY.counter(
+    "dailymind_nlp_texts_total", "Modellere giden metin sayısı (aşama bazında)", ["stage"]
+)
+
+# --- MOOD MODELİ ---
+MOOD_SECONDS = REGISTRY.histogram(
+    "dailymind_mood_seconds", "Mood tahmini adımlarının süresi (features / predict)", ["step"]
+)
+MODEL_MISSING_TOTAL = REGISTRY.counter(
+    "dailymind_model_missing_total", "Mood modeli yüklü olmadığı için varsayılana düşen veya reddedilen istekler", ["endpoint"]
+)
+
+# --- DIŞ SERVİSLER ---
+SUPABASE_SECONDS = REGISTRY.histogram(
+    "dailymind_supabase_seconds", "Supabase çağrılarının süresi", ["operation"]
+)
+SUPABASE_ERRORS_TOTAL = REGISTRY.counter(
+    "dailymind_supabase_errors_total", "Hata ile sonuçlanan Supabase çağrıları", ["operation"]
+)
+GROQ_SECONDS = REGISTRY.histogram(
+    "dailymind_groq_seconds", "Groq API çağrılarının süresi", ["outcome"]
+)
+ADVICE_FALLBACK_TOTAL = REGISTRY.counter(
+    "dailymind_advice_fallback_total", "Groq yerine hazır mesaja düşen tavsiyeler", ["reason"]
+)
+INSIGHT_CACHE_TOTAL = REGISTRY.counter(
+    "dailymind_insight_cache_total", "/insights 7 günlük cache sonucu", ["result"]
+)
+
+# --- KİMLİK DOĞRULAMA ---
+AUTH_TOTAL = REGISTRY.counter(
+    "dailymind_auth_total", "Token doğrulamaları (cache / local / remote)", ["method", "result"]
+)
+
+# --- HTTP ---
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "dailymind_http_request_seconds", "FastAPI route'larının süresi", ["method", "route", "status"]
+)
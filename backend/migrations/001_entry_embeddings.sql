@@ -0,0 +1,7 @@
+-- 001_entry_embeddings.sql - Semantik arama için giriş embedding'leri
+--
+-- embedding       : L2 normalize SBERT embedding'i, float16, base64 (vector_index.encode_embedding)
+-- embedding_model : Embedding sürümü (model + backend + pencere ayarları); sürüm değişince eski kayıtlar ilk aramada yeniden hesaplanır
+
+alter table gunluk_girisler add column if not exists embedding text;
+alter table gunluk_girisler add column if not exists embedding_model text;
@@ -0,0 +1,10 @@
+-- 002_entry_mood.sql - Giriş yazılırken saklanan mood tahmini
+--
+-- mood_score         : Mood Regressor'ün ham tahmini (/predict-mood 1.0-5.0 aralığına kırpıp yuvarlar)
+-- mood_emoji         : Skorun emoji kategorisi (main.mood_bucket)
+-- mood_model_version : Tahmini üreten .pkl dosyalarının hash'i; model değişince eski kayıtlar
+--                      ilk okumada veya backfill_moods.py ile yeniden hesaplanır
+
+alter table gunluk_girisler add column if not exists mood_score double precision;
+alter table gunluk_girisler add column if not exists mood_emoji text;
+alter table gunluk_girisler add column if not exists mood_model_version text;
@@ -0,0 +1,107 @@
+-- 003_user_topic_stats.sql - /insights için kullanıcı başına konu bazlı mood toplamları
+--
+-- Her POST /entries girişin konularına add_entry_to_topic_stats ile eklenir; /insights
+-- geçmişi taramadan yalnızca bu satırları okur (konu sayısı kadar). Toplamlar kullanıcının
+-- ilk /insights isteğinde rebuild_topic_stats ile tüm geçmişten kurulur.
+--
+-- entry_count        : Konudaki giriş sayısı
+-- mood_sum           : Girişlerin mood tahminlerinin toplamı (ortalama = mood_sum / entry_count)
+-- recent_entry_ids   : Konudaki en yeni girişlerin id'leri (yeniden eskiye, en fazla p_recent_limit)
+-- mood_model_version : Toplamları üreten Mood Regressor sürümü; farklı sürümle eklenen giriş
+--                      'mixed' yapar ve main.py toplamları tüm geçmişten yeniden kurar
+--
+-- gunluk_girisler.topic_stats_counted : Giriş toplamlara eklendi mi. İki fonksiyon da aynı
+-- kullanıcı için advisory lock alır; yeniden kurulumla eşzamanlı gelen add çağrısı girişi
+-- ya kurulumdan önce ekler (kurulum silip yeniden sayar) ya da sonra gelir ve zaten
+-- sayılmış girişi ikinci kez eklemez.
+
+create table if not exists user_topic_stats (
+    user_id uuid not null,
+    topic text not null,
+    entry_count integer not null default 0,
+    mood_sum double precision not null default 0,
+    recent_entry_ids bigint[] not null default '{}',
+    mood_model_version text,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, topic)
+);
+
+alter table gunluk_girisler add column if not exists topic_stats_counted boolean not null default false;
+
+-- Tek çağrıda, satır kilidiyle artırır (eşzamanlı girişler birbirini ezmez)
+create or replace function add_entry_to_topic_stats(
+    p_user_id uuid,
+    p_topics text[],
+    p_mood double precision,
+    p_entry_id bigint,
+    p_model_version text,
+    p_recent_limit integer default 5
+) returns void
+language sql
+as $$
+    select pg_advisory_xact_lock(hashtext('user_topic_stats:' || p_user_id::text));
+
+    with counted as (
+        update gunluk_girisler set topic_stats_counted = true
+        where id = p_entry_id and user_id = p_user_id and not topic_stats_counted
+          -- Toplamları henüz kurulmamış kullanıcı (ör. bu migration'dan önceki girişler): ilk /insights geçmişten kurar
+          and exists (select 1 from user_topic_stats where user_id = p_user_id)
+        returning id
+    )
+    insert into user_topic_stats as s (user_id, topic, entry_count, mood_sum, recent_entry_ids, mood_model_version)
+    select p_user_id, t, 1, p_mood, array[p_entry_id], p_model_version
+    from (select distinct unnest(p_topics) as t) topics
+    where exists (select 1 from counted)
+    on conflict (user_id, topic) do update set
+        entry_count = s.entry_count + 1,
+        mood_sum = s.mood_sum + excluded.mood_sum,
+        recent_entry_ids = (array[p_entry_id] || s.recent_entry_ids)[1:p_recent_limit],
+        mood_model_version = case
+            when s.mood_model_version is not distinct from excluded.mood_model_version then s.mood_model_version
+            else 'mixed'
+        end,
+        updated_at = now();
+$$;
+
+-- Toplamları tek transaction'da girişlerden yeniden kurar ve kurulan satırları döner.
+-- Mood: p_moods'ta varsa o ({"<entry_id>": mood}, main.py'nin eksik/eski tahminler için
+-- hesapladıkları), yoksa p_model_version ile yazılmış mood_score. Mood'u bilinmeyen giriş
+-- sayılmaz; kendi add_entry_to_topic_stats çağrısı ekler.
+create or replace function rebuild_topic_stats(
+    p_user_id uuid,
+    p_moods jsonb,
+    p_model_version text,
+    p_recent_limit integer default 5
+) returns setof user_topic_stats
+language plpgsql
+as $$
+begin
+    perform pg_advisory_xact_lock(hashtext('user_topic_stats:' || p_user_id::text));
+
+    delete from user_topic_stats where user_id = p_user_id;
+
+    with moods as (
+        select g.id, g.created_at, g.analiz_sonucu::jsonb -> 'topics' as topics, coalesce(
+            (p_moods ->> g.id::text)::double precision,
+            case when g.mood_model_version is not distinct from p_model_version then g.mood_score end
+        ) as mood
+        from gunluk_girisler g
+        where g.user_id = p_user_id
+    ), flagged as (
+        update gunluk_girisler g set topic_stats_counted = (m.mood is not null)
+        from moods m
+        where g.id = m.id
+    )
+    insert into user_topic_stats (user_id, topic, entry_count, mood_sum, recent_entry_ids, mood_model_version)
+    select p_user_id, t.topic, count(*), sum(m.mood),
+           (array_agg(m.id order by m.created_at desc, m.id desc))[1:p_recent_limit], p_model_version
+    from moods m
+    cross join lateral (
+        select distinct jsonb_array_elements_text(coalesce(m.topics, '[]'::jsonb)) as topic
+    ) t
+    where m.mood is not null
+    group by t.topic;
+
+    return query select * from user_topic_stats where user_id = p_user_id;
+end;
+$$;
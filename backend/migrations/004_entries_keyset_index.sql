@@ -0,0 +1,7 @@
+-- 004_entries_keyset_index.sql - GET /entries keyset sayfalaması için index
+--
+-- Liste sorgusu: user_id = ? and (created_at, id) < (cursor) order by created_at desc, id desc limit n
+-- Bu index ile her sayfa, geçmişin uzunluğundan bağımsız olarak index'ten n satır okur.
+
+create index if not exists gunluk_girisler_user_created_id_idx
+    on gunluk_girisler (user_id, created_at desc, id desc);
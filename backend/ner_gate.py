@@ -0,0 +1,145 @@
+# ner_gate.py - NER modelinin önünde ucuz ön filtre
+#
+# Günlük cümlelerinin çoğunda özel isim yoktur. Kapı (gate) her cümlede aday
+# arar; aday yoksa NER hiç çalışmaz, varsa yalnızca aday cümleler NER'e gider.
+# Aday sayılanlar:
+#   - Cümle başı dışında büyük harfle başlayan kelime ("... Ahmet ile")
+#   - Kesme işaretli büyük harfli kelime, cümle başında da olsa ("İstanbul'a")
+#   - En az iki harfli tamamı büyük kısaltma ("THY", "ODTÜ")
+#   - Gazetteer'daki bilinen isim/yer, küçük harfle yazılmış olsa da ("ahmet", "ankara")
+#
+# Modlar (NLP_NER_GATE): off | on | audit
+#   audit: çıktı her zaman tam NER'den gelir; kapılı NER ile karşılaştırılıp kaçırılan
+#          varlıklar sayılır (recall ölçümü).
+
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+
+SENTENCE_RE = re.compile(r"[^.!?…\n]+[.!?…]*")
+WORD_RE = re.compile(r"[^\W\d_][\w'’]*")
+APOSTROPHES = ("'", "’")
+
+# Sık kullanılan isimler ve il adları (küçük harf); NER_GAZETTEER_PATH ile genişletilebilir
+GAZETTEER = set("""
+ahmet mehmet mustafa ali hüseyin hasan ibrahim ismail osman yusuf murat ömer emre burak can cem
+kerem mert onur serkan tolga volkan yasin barış berk deniz ege efe emir enes eren furkan hakan kaan
+ayşe fatma emine hatice zeynep elif meryem şerife zehra sultan hülya esra merve büşra özge ebru
+selin ceren damla derya dilek gamze gizem irem melike nazlı pınar seda sevgi tuğba yağmur aslı
+adana adıyaman afyon ağrı amasya ankara antalya artvin aydın balıkesir bilecik bingöl bitlis bolu
+burdur bursa çanakkale çankırı çorum denizli diyarbakır edirne elazığ erzincan erzurum eskişehir
+gaziantep giresun gümüşhane hakkari hatay ısparta mersin istanbul izmir kars kastamonu kayseri
+kırklareli kırşehir kocaeli konya kütahya malatya manisa kahramanmaraş mardin muğla muş nevşehir
+niğde ordu rize sakarya samsun siirt sinop sivas tekirdağ tokat trabzon tunceli şanlıurfa uşak van
+yozgat zonguldak aksaray bayburt karaman kırıkkale batman şırnak bartın ardahan iğdır yalova
+karabük kilis osmaniye düzce kadıköy beşiktaş üsküdar şişli bodrum kapadokya
+""".split())
+
+
+def tr_lower(text: str) -> str:
+    """Türkçe I/İ kurallarıyla küçük harfe çevirir"""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def load_gazetteer(path: str = None) -> set:
+    names = set(GAZETTEER)
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            names.update(tr_lower(line.strip()) for line in f if line.strip())
+    return names
+
+
+class NerGate:
+    """
+    Args:
+        gazetteer: Küçük harfli bilinen isimler kümesi
+        audit_examples: Audit modunda saklanacak son kaçırılan varlık örneği sayısı
+    """
+
+    def __init__(self, gazetteer=None, audit_examples=20):
+        self.gazetteer = gazetteer if gazetteer is not None else set(GAZETTEER)
+        self.version = hashlib.sha256("\n".join(sorted(self.gazetteer)).encode("utf-8")).hexdigest()[:12]
+        self._lock = threading.Lock()
+
+        self.texts = 0
+        self.skipped = 0
+        self.total_chars = 0
+        self.gated_chars = 0
+        self.audited = 0
+        self.reference_entities = 0
+        self.missed_entities = 0
+        self.missed_examples = deque(maxlen=audit_examples)
+
+    def is_candidate(self, word: str, sentence_start: bool) -> bool:
+        base = word
+        for apostrophe in APOSTROPHES:
+            base = base.split(apostrophe)[0]
+        if not base:
+            return False
+        if base[0].isupper() and (not sentence_start or base != word):
+            return True
+        if len(base) >= 2 and base.isupper():
+            return True
+        return tr_lower(base) in self.gazetteer
+
+    def candidate_spans(self, text: str) -> list:
+        """Varlık içerebilecek cümlelerin (başlangıç, bitiş) karakter aralıkları"""
+        spans = []
+        for sentence in SENTENCE_RE.finditer(text):
+            words = WORD_RE.finditer(sentence.group())
+            if any(self.is_candidate(w.group(), position == 0) for position, w in enumerate(words)):
+                start, end = sentence.span()
+                # Baştaki boşlukları at; offset'ler orijinal metne göre kalır
+                while start < end and text[start].isspace():
+                    start += 1
+                spans.append((start, end))
+        return spans
+
+    def plan(self, texts) -> list:
+        """Her metin için NER'e gidecek aralıklar; boş liste NER'in atlanacağı anlamına gelir"""
+        plans = [self.candidate_spans(text) for text in texts]
+        with self._lock:
+            self.texts += len(plans)
+            self.skipped += sum(1 for spans in plans if not spans)
+            self.total_chars += sum(len(text) for text in texts)
+            self.gated_chars += sum(end - start for spans in plans for start, end in spans)
+        return plans
+
+    def audit(self, reference: list, gated: list, min_score: float):
+        """
+        Tam NER (referans) ile kapılı NER çıktılarını karşılaştırır.
+        Skor eşiğini geçen referans varlıklardan kapılı çıktıda olmayanlar kaçırılmış sayılır.
+        """
+        def key(entity):
+            return entity["entity_group"], entity["word"], entity.get("start")
+
+        with self._lock:
+            for reference_entities, gated_entities in zip(reference, gated):
+                found = {key(e) for e in gated_entities if e["score"] > min_score}
+                expected = [e for e in reference_entities if e["score"] > min_score]
+                self.audited += 1
+                self.reference_entities += len(expected)
+                for entity in expected:
+                    if key(entity) not in found:
+                        self.missed_entities += 1
+                        self.missed_examples.append({"varlik": entity["entity_group"], "metin": entity["word"]})
+
+    def stats(self) -> dict:
+        stats = {
+            "texts": self.texts,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / self.texts, 4) if self.texts else 0.0,
+            "gated_char_ratio": round(self.gated_chars / self.total_chars, 4) if self.total_chars else 0.0,
+        }
+        if self.audited:
+            found = self.reference_entities - self.missed_entities
+            stats["audit"] = {
+                "texts": self.audited,
+                "reference_entities": self.reference_entities,
+                "missed_entities": self.missed_entities,
+                "recall": round(found / self.reference_entities, 4) if self.reference_entities else 1.0,
+                "missed_examples": list(self.missed_examples),
+            }
+        return stats
@@ -1,240 +1,1162 @@
 # nlp_pipeline.py 
 
-from transformers import pipeline, AutoTokenizer, AutoModel
+import time
+
+_MODULE_IMPORT_START = time.perf_counter()
+
+import hashlib
+import json
+import logging
+import os
+import threading
 import torch
 import torch.nn.functional as F
-import logging
+from analysis_cache import ContentCache, cache_key
+from inference_backends import build_backend
+from sentiment_cascade import load_cascade, model_fingerprint
+from ner_gate import NerGate, load_gazetteer
+from distilled_model import distilled_version
+from metrics import NLP_STAGE_SECONDS, NLP_TEXTS_TOTAL
+
+# Başlangıç süresi raporu (saniye): import ve model yükleme adımları ayrı ayrı tutulur
+STARTUP_TIMINGS = {"import_torch": round(time.perf_counter() - _MODULE_IMPORT_START, 3)}
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 print("NLP Pipeline modülü yükleniyor...")
 
-try:
-    
-    sentiment_pipeline = pipeline(
-        "sentiment-analysis",
-        model="savasy/bert-base-turkish-sentiment-cased"
-    )
-    print("✓ Duygu analizi modeli yüklendi.")
+# Model adları hub kimliği veya yerel klasör olabilir (benchmark.py --tiny küçük yerel modeller verir)
+SENTIMENT_MODEL_NAME = os.environ.get("NLP_SENTIMENT_MODEL", "savasy/bert-base-turkish-sentiment-cased")
+NER_MODEL_NAME = os.environ.get("NLP_NER_MODEL", "savasy/bert-base-turkish-ner-cased")
+sbert_model_name = os.environ.get("NLP_SBERT_MODEL", "emrecan/bert-base-turkish-cased-mean-nli-stsb-tr")
 
-    
-    ner_pipeline = pipeline(
-        "ner",
-        model="savasy/bert-base-turkish-ner-cased",
-        tokenizer="savasy/bert-base-turkish-ner-cased",
-        aggregation_strategy="simple"
-    )
-    print("✓ NER modeli yüklendi.")
+# Yerel model klasörü (prefetch_models.py doldurur): <dizin>/<org>--<model>/ altında safetensors
+# ağırlıkları. safetensors dosyaları heap'e kopyalanmadan mmap edilir; aynı makinedeki
+# process'ler (serve.py worker'ları dahil) sayfaları page cache üzerinden paylaşır.
+# Klasörde olmayan modeller hub'dan çözülür; NLP_OFFLINE_STRICT=1 iken bunun yerine
+# yükleme hemen başarısız olur ve hub'a hiç gidilmez.
+NLP_MODEL_DIR = os.environ.get(
+    "NLP_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "nlp_models")
+)
+NLP_OFFLINE_STRICT = os.environ.get("NLP_OFFLINE_STRICT", "0") == "1"
+if NLP_OFFLINE_STRICT:
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
 
-    
-    sbert_model_name = "emrecan/bert-base-turkish-cased-mean-nli-stsb-tr"
-    sbert_tokenizer = AutoTokenizer.from_pretrained(sbert_model_name)
-    sbert_model = AutoModel.from_pretrained(sbert_model_name)
-    
-    def mean_pooling(model_output, attention_mask):
-        """Token embedding'lerinin ortalamasını alır"""
-        token_embeddings = model_output[0]
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-        return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-    
-    def get_sentence_embedding(text):
-        """Metin için embedding vektörü üretir"""
-        encoded_input = sbert_tokenizer(text, padding=True, truncation=True, return_tensors='pt', max_length=512)
-        with torch.no_grad():
-            model_output = sbert_model(**encoded_input)
-        return mean_pooling(model_output, encoded_input['attention_mask'])
-    
-    
-    KONU_ETIKETLERI = {
-        "İş ve Kariyer": "iş toplantı patron müdür proje görev şirket ofis maaş terfi kariyer işyeri mesai çalışma  çalışmak",
-        "Eğitim ve Okul": "okul ders öğretmen sınav ödev üniversite öğrenci not eğitim",
-        "Sosyal İlişkiler": "arkadaş buluşma dostluk sosyal ilişki dost sohbet eğlence",
-        "Aile": "anne baba kardeş aile çocuk ebeveyn akraba ev yuva  sevgili eş çocukluk  ailevi ",
-        "Sağlık": "hastane doktor sağlık hastalık ilaç tedavi eczane vitamin hasta tahlil muayene kilo diyet spor halsiz rahatsız ağrı acı yorgun grip nezle",
-        "Finans ve Para": "para maaş banka kredi alışveriş borç tasarruf yatırım harcama ödeme market",
-        "Teknoloji": "bilgisayar telefon internet uygulama yazılım teknoloji dijital online oyun",
-        "Kişisel Gelişim": "hedef motivasyon öğrenme kitap okuma özgüven başarı kariyer planı eğitim semineri",
-        "Genel Günlük": "bugün gün günlük rutin normal gündelik sabah akşam gece hava hava durumu yemek kahve çay uyku uyumak dinlenme",
-    }
-    
-    
-    HARD_KEYWORDS = {
-        "İş ve Kariyer": ["iş", "işe", "işten", "işyeri", "patron", "patronum", "müdür", "toplantı", "proje", "görev", "ofis", "mesai", "şirket"],
-        "Eğitim ve Okul": ["okul", "okula", "okulda", "okuldan", "ders", "derste", "öğretmen", "sınav", "ödev", "üniversite", "öğrenci", "not", "eğitim", "sınıf", "kampüs", "hoca", ],
-        "Aile": ["anne", "annem", "annemi", "baba", "babam", "babamı", "babamla", "kardeş", "kardeşim", "aile", "çocuk", "çocuğum", "ebeveyn", "akraba", "eş", "sevgili", "evlat", "dede", "nine", "hala", "dayı", "amca", "teyze",],
-        "Sağlık": ["hastane", "hastaneye", "hastanede", "hastaneden", "doktor", "doktora", "hasta", "hastalık", "ilaç", "tedavi", "eczane", "vitamin", "tahlil", "ağrı", "acı", "grip", "nezle", "muayene", "kilo", "diyet",],
-        "Finans ve Para": ["para", "parası", "maaş", "banka", "kredi", "borç", "ödeme", "alışveriş", "alışverişe", "market", "satın", "harcama", "ücret", "fatura", "finans", "yatırım","tasarruf","bütçe","makbuz"],
-        "Teknoloji": ["bilgisayar", "telefon", "internet", "uygulama", "yazılım", "oyun", "online","dijital", "teknoloji", "kulaklık", "tablet", "televizyon", "sosyal medya", "wifi", "modem","şarj","wifi"],
-        "Kişisel Gelişim": ["hedef", "motivasyon", "başarı", "gelişim", "kitap", "kitabı", "oku", "okuma", "okuyorum", "özgüven", "plan", "seminer", "eğitim","spor", "kurs", ],
+# Çıkarım backend'i: torch | int8 | onnx | onnx-int8 (bkz. inference_backends.py, export_models.py)
+NLP_BACKEND = os.environ.get("NLP_BACKEND", "torch")
+NLP_ONNX_DIR = os.environ.get(
+    "NLP_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_models")
+)
+
+# Analiz modu: full (3 ayrı BERT + SBERT konu skorlayıcı) | distilled (tek encoder, 3 başlık;
+# bkz. distilled_model.py, train_distilled_model.py)
+NLP_MODE = os.environ.get("NLP_MODE", "full")
+NLP_DISTILLED_DIR = os.environ.get(
+    "NLP_DISTILLED_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "distilled_model")
+)
+
+
+KONU_ETIKETLERI = {
+    "İş ve Kariyer": "iş toplantı patron müdür proje görev şirket ofis maaş terfi kariyer işyeri mesai çalışma  çalışmak",
+    "Eğitim ve Okul": "okul ders öğretmen sınav ödev üniversite öğrenci not eğitim",
+    "Sosyal İlişkiler": "arkadaş buluşma dostluk sosyal ilişki dost sohbet eğlence",
+    "Aile": "anne baba kardeş aile çocuk ebeveyn akraba ev yuva  sevgili eş çocukluk  ailevi ",
+    "Sağlık": "hastane doktor sağlık hastalık ilaç tedavi eczane vitamin hasta tahlil muayene kilo diyet spor halsiz rahatsız ağrı acı yorgun grip nezle",
+    "Finans ve Para": "para maaş banka kredi alışveriş borç tasarruf yatırım harcama ödeme market",
+    "Teknoloji": "bilgisayar telefon internet uygulama yazılım teknoloji dijital online oyun",
+    "Kişisel Gelişim": "hedef motivasyon öğrenme kitap okuma özgüven başarı kariyer planı eğitim semineri",
+    "Genel Günlük": "bugün gün günlük rutin normal gündelik sabah akşam gece hava hava durumu yemek kahve çay uyku uyumak dinlenme",
+}
+
+
+HARD_KEYWORDS = {
+    "İş ve Kariyer": ["iş", "işe", "işten", "işyeri", "patron", "patronum", "müdür", "toplantı", "proje", "görev", "ofis", "mesai", "şirket"],
+    "Eğitim ve Okul": ["okul", "okula", "okulda", "okuldan", "ders", "derste", "öğretmen", "sınav", "ödev", "üniversite", "öğrenci", "not", "eğitim", "sınıf", "kampüs", "hoca", ],
+    "Aile": ["anne", "annem", "annemi", "baba", "babam", "babamı", "babamla", "kardeş", "kardeşim", "aile", "çocuk", "çocuğum", "ebeveyn", "akraba", "eş", "sevgili", "evlat", "dede", "nine", "hala", "dayı", "amca", "teyze",],
+    "Sağlık": ["hastane", "hastaneye", "hastanede", "hastaneden", "doktor", "doktora", "hasta", "hastalık", "ilaç", "tedavi", "eczane", "vitamin", "tahlil", "ağrı", "acı", "grip", "nezle", "muayene", "kilo", "diyet",],
+    "Finans ve Para": ["para", "parası", "maaş", "banka", "kredi", "borç", "ödeme", "alışveriş", "alışverişe", "market", "satın", "harcama", "ücret", "fatura", "finans", "yatırım","tasarruf","bütçe","makbuz"],
+    "Teknoloji": ["bilgisayar", "telefon", "internet", "uygulama", "yazılım", "oyun", "online","dijital", "teknoloji", "kulaklık", "tablet", "televizyon", "sosyal medya", "wifi", "modem","şarj","wifi"],
+    "Kişisel Gelişim": ["hedef", "motivasyon", "başarı", "gelişim", "kitap", "kitabı", "oku", "okuma", "okuyorum", "özgüven", "plan", "seminer", "eğitim","spor", "kurs", ],
+}
+
+
+CONTEXTUAL_KEYWORDS = {
+
+}
+
+
+# --- MODEL DURUMU (LAZY LOADING) ---
+# Modeller import sırasında değil, ilk kullanımda veya warmup() çağrısında yüklenir.
+sentiment_pipeline = None
+ner_pipeline = None
+sbert_tokenizer = None
+sbert_model = None
+zero_shot_pipeline = None
+konu_embeddings = {}
+KONU_NAMES = list(KONU_ETIKETLERI)
+konu_matrix = None  # (K, D) normalize edilmiş konu embedding matrisi
+SHARED_TOKENIZATION = {"sentiment": False, "ner": False}
+ACTIVE_BACKEND = None
+distilled_nlp_model = None
+distilled_tokenizer = None
+
+if NLP_MODE == "distilled":
+    MODEL_STATUS = {"distilled": "not_loaded"}
+else:
+    MODEL_STATUS = {"sentiment": "not_loaded", "ner": "not_loaded", "sbert": "not_loaded", "topics": "not_loaded"}
+MODEL_ERRORS = {}
+_load_lock = threading.Lock()
+
+WARMUP_TEXT = "Bugün işte yoğun bir gün geçirdim ama akşam ailemle güzel vakit geçirdik."
+
+
+def is_ready() -> bool:
+    """Tüm modeller yüklenip kullanıma hazırsa True döner"""
+    return all(state == "loaded" for state in MODEL_STATUS.values())
+
+
+def model_status() -> dict:
+    """Her model için yükleme durumu, süresi ve (varsa) hatası"""
+    return {
+        name: {
+            "state": state,
+            "load_seconds": STARTUP_TIMINGS.get(f"load_{name}"),
+            "error": MODEL_ERRORS.get(name),
+            **MODEL_SOURCES.get(name, {}),
+        }
+        for name, state in MODEL_STATUS.items()
     }
+
+
+def startup_report() -> dict:
+    """Import ve model yükleme sürelerini bileşen bazında döner"""
+    return dict(STARTUP_TIMINGS)
+
+
+def local_model_path(name: str) -> str:
+    """Hub adının NLP_MODEL_DIR altındaki klasörü (savasy/bert-... -> savasy--bert-...)"""
+    return os.path.join(NLP_MODEL_DIR, name.replace("/", "--"))
+
+
+def model_source(name: str) -> str:
+    """
+    Modelin yükleneceği yer: zaten bir klasörse kendisi, NLP_MODEL_DIR'de varsa yerel
+    kopya, yoksa hub adı. NLP_OFFLINE_STRICT=1 iken yerel kopya yoksa hata verir.
+    """
+    if os.path.isdir(name):
+        return name
+    local = local_model_path(name)
+    if os.path.exists(os.path.join(local, "config.json")):
+        return local
+    if NLP_OFFLINE_STRICT:
+        raise RuntimeError(
+            f"'{name}' yerel model klasöründe yok ({local}); önce 'python prefetch_models.py' çalıştırın."
+        )
+    return name
+
+
+def mapped_fraction(model) -> float:
+    """
+    Parametre baytlarının ne kadarı bir .safetensors dosyasının mmap bölgesinde (Linux).
+    1.0: ağırlıklar heap'e kopyalanmamış; None: ölçülemedi.
+    """
+    try:
+        with open("/proc/self/maps") as f:
+            regions = [
+                tuple(int(x, 16) for x in line.split()[0].split("-"))
+                for line in f if ".safetensors" in line
+            ]
+    except OSError:
+        return None
+    total = mapped = 0
+    for param in model.parameters():
+        size = param.numel() * param.element_size()
+        total += size
+        if any(start <= param.data_ptr() < end for start, end in regions):
+            mapped += size
+    return round(mapped / total, 3) if total else None
+
+
+MODEL_SOURCES = {}
+
+
+def _load_component(name, loader):
+    """Tek bir bileşeni yükler; durum ve süresini MODEL_STATUS / STARTUP_TIMINGS'e yazar"""
+    if MODEL_STATUS[name] == "loaded":
+        return
+    MODEL_STATUS[name] = "loading"
+    start = time.perf_counter()
+    try:
+        loader()
+    except Exception as e:
+        MODEL_STATUS[name] = "failed"
+        MODEL_ERRORS[name] = str(e)
+        raise
+    STARTUP_TIMINGS[f"load_{name}"] = round(time.perf_counter() - start, 3)
+    MODEL_STATUS[name] = "loaded"
+    MODEL_ERRORS.pop(name, None)
+
+
+def load_models(retry_failed: bool = False) -> bool:
+    """
+    Duygu, NER ve SBERT modellerini henüz yüklenmediyse yükler.
     
+    İlk analiz çağrısında otomatik çalışır. Daha önce başarısız olan bir yükleme,
+    her istekte tekrar denenip isteği bekletmesin diye yalnızca retry_failed=True
+    ile yeniden denenir.
     
-    CONTEXTUAL_KEYWORDS = {
-          
+    Returns:
+        bool: Tüm modeller kullanıma hazırsa True
+    """
+    global sentiment_pipeline, ner_pipeline, sbert_tokenizer, sbert_model
+    global zero_shot_pipeline, konu_embeddings, SHARED_TOKENIZATION, ACTIVE_BACKEND, sentiment_cascade
+
+    if is_ready():
+        return True
+
+    with _load_lock:
+        if is_ready():
+            return True
+        if not retry_failed and "failed" in MODEL_STATUS.values():
+            return False
+        if NLP_MODE == "distilled":
+            return _load_distilled_models()
+
+        # Yerel kopyası olmayan model varsa transformers import edilmeden başarısız ol
+        try:
+            sources = {
+                "sentiment": model_source(SENTIMENT_MODEL_NAME),
+                "ner": model_source(NER_MODEL_NAME),
+                "sbert": model_source(sbert_model_name),
+            }
+        except RuntimeError as e:
+            for name in ("sentiment", "ner", "sbert"):
+                MODEL_STATUS[name] = "failed"
+                MODEL_ERRORS[name] = str(e)
+            print(f"HATA: {e}")
+            return False
+
+        try:
+            start = time.perf_counter()
+            from transformers import pipeline, AutoTokenizer, AutoModel
+            STARTUP_TIMINGS.setdefault("import_transformers", round(time.perf_counter() - start, 3))
+
+            def load_sentiment():
+                global sentiment_pipeline
+                sentiment_pipeline = pipeline(
+                    "sentiment-analysis",
+                    model=sources["sentiment"]
+                )
+                _record_source("sentiment", sources["sentiment"], sentiment_pipeline.model)
+                print("✓ Duygu analizi modeli yüklendi.")
+
+            def load_ner():
+                global ner_pipeline
+                ner_pipeline = pipeline(
+                    "ner",
+                    model=sources["ner"],
+                    tokenizer=sources["ner"],
+                    aggregation_strategy="simple"
+                )
+                _record_source("ner", sources["ner"], ner_pipeline.model)
+                print("✓ NER modeli yüklendi.")
+
+            def load_sbert():
+                global sbert_tokenizer, sbert_model
+                sbert_tokenizer = AutoTokenizer.from_pretrained(sources["sbert"])
+                sbert_model = AutoModel.from_pretrained(sources["sbert"])
+                _record_source("sbert", sources["sbert"], sbert_model)
+
+            def load_topics():
+                global konu_matrix
+                embeddings = {}
+                for konu, keywords in KONU_ETIKETLERI.items():
+                    embeddings[konu] = F.normalize(_sbert_embedding(keywords), p=2, dim=1)
+                konu_embeddings.clear()
+                konu_embeddings.update(embeddings)
+                konu_matrix = torch.cat([konu_embeddings[konu] for konu in KONU_NAMES], dim=0)
+                print("✓ Sentence-BERT (Konu Sınıflandırma) yüklendi.")
+
+            _load_component("sentiment", load_sentiment)
+            _load_component("ner", load_ner)
+            _load_component("sbert", load_sbert)
+            if ACTIVE_BACKEND is None:
+                start = time.perf_counter()
+                ACTIVE_BACKEND = _apply_backend(NLP_BACKEND)
+                STARTUP_TIMINGS["apply_backend"] = round(time.perf_counter() - start, 3)
+                _refresh_versions()
+            # Konu embedding'leri, metinlerle aynı backend üzerinden hesaplanmalı
+            _load_component("topics", load_topics)
+
+            SHARED_TOKENIZATION = {
+                "sentiment": tokenizers_match(sbert_tokenizer, sentiment_pipeline.tokenizer),
+                "ner": tokenizers_match(sbert_tokenizer, ner_pipeline.tokenizer),
+            }
+            print(f"✓ Ortak tokenizasyon: {SHARED_TOKENIZATION}")
+            if NLP_SENTIMENT_CASCADE and sentiment_cascade is None:
+                sentiment_cascade = load_cascade(NLP_CASCADE_MODEL, NLP_CASCADE_THRESHOLD)
+            zero_shot_pipeline = classify_topics
+        except Exception as e:
+            print(f"HATA: Modeller yüklenirken bir sorun oluştu: {e}")
+            return False
+
+    return True
+
+
+def _record_source(name, source, model):
+    MODEL_SOURCES[name] = {
+        "source": "local" if os.path.isdir(source) else "hub",
+        "path": source,
+        "mmap_fraction": mapped_fraction(model),
     }
+
+
+def _apply_backend(backend: str) -> str:
+    """
+    Yüklenen fp32 modelleri seçilen backend'e (int8 / ONNX Runtime) çevirir.
+    Backend kurulamazsa eager torch ile devam edilir.
     
+    Returns:
+        str: Kullanılan backend
+    """
+    global sbert_model
+
+    if backend == "torch":
+        return backend
+    try:
+        runnables = build_backend(
+            backend,
+            {"sentiment": sentiment_pipeline.model, "ner": ner_pipeline.model, "sbert": sbert_model},
+            NLP_ONNX_DIR
+        )
+    except Exception as e:
+        print(f"⚠️ UYARI: '{backend}' backend'i kurulamadı, torch ile devam ediliyor: {e}")
+        return "torch"
+
+    sentiment_pipeline.model = runnables["sentiment"]
+    ner_pipeline.model = runnables["ner"]
+    sbert_model = runnables["sbert"]
+    print(f"✓ NLP backend'i: {backend}")
+    return backend
+
+
+def _load_distilled_models() -> bool:
+    """NLP_MODE=distilled: yalnızca tek encoder'lı öğrenci modeli yükler"""
+    global distilled_nlp_model, distilled_tokenizer, ACTIVE_BACKEND
+
+    def load_distilled():
+        global distilled_nlp_model, distilled_tokenizer
+        from distilled_model import load_distilled as load
+
+        distilled_nlp_model, distilled_tokenizer = load(NLP_DISTILLED_DIR)
+        print(f"✓ Distilled model yüklendi: {NLP_DISTILLED_DIR}")
+
+    try:
+        _load_component("distilled", load_distilled)
+    except Exception as e:
+        print(f"HATA: Distilled model yüklenemedi: {e} (önce 'python train_distilled_model.py' çalıştırın)")
+        return False
+
+    if ACTIVE_BACKEND is None:
+        ACTIVE_BACKEND = "torch"
+        if NLP_BACKEND == "int8":
+            from inference_backends import quantize_int8
+            distilled_nlp_model = quantize_int8(distilled_nlp_model)
+            ACTIVE_BACKEND = "int8"
+        elif NLP_BACKEND != "torch":
+            print(f"⚠️ UYARI: Distilled mod '{NLP_BACKEND}' backend'ini desteklemiyor, torch ile devam ediliyor.")
+        _refresh_versions()
+    return True
+
+
+def loaded_models() -> list:
+    """Kullanımdaki çağrılabilir modeller (moda göre)"""
+    if NLP_MODE == "distilled":
+        return [distilled_nlp_model]
+    return [getattr(sentiment_pipeline, "model", None), getattr(ner_pipeline, "model", None), sbert_model]
+
+
+def after_fork():
+    """
+    Pre-fork modunda (serve.py) her worker'da fork'tan hemen sonra çağrılır.
+    torch ağırlıkları parent ile copy-on-write paylaşılır; ONNX Runtime
+    oturumları ise worker içinde yeniden açılır.
+    """
+    for model in loaded_models():
+        if hasattr(model, "reopen"):
+            model.reopen()
+
+
+def warmup() -> bool:
+    """
+    Modelleri yükler ve kısa bir örnek metinle ilk çıkarımı yaparak ısıtır.
+    Sunucu açılışında çağrılır; böylece ilk gerçek istek model yüklemesini beklemez.
+    """
+    if not load_models(retry_failed=True):
+        print_startup_report()
+        return False
+
+    start = time.perf_counter()
+    analyze_texts([WARMUP_TEXT])
+    STARTUP_TIMINGS["warmup_inference"] = round(time.perf_counter() - start, 3)
+    print_startup_report()
+    return True
+
+
+def print_startup_report():
+    print("⏱️ NLP başlangıç süreleri:")
+    for component, seconds in STARTUP_TIMINGS.items():
+        print(f"  {component}: {seconds:.3f} sn")
+
+
+def mean_pooling(model_output, attention_mask):
+    """Token embedding'lerinin ortalamasını alır"""
+    token_embeddings = model_output[0]
+    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+    return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+
+def get_sentence_embedding(text):
+    """Metin için embedding vektörü üretir (tek metinler cache'ten okunur)"""
+    if NLP_MODE == "distilled":
+        raise RuntimeError("SBERT embedding'leri yalnızca NLP_MODE=full ile kullanılabilir.")
+    if not load_models():
+        raise RuntimeError("NLP modelleri yüklenemedi.")
+    if isinstance(text, str):
+        key = cache_key(text, EMBEDDING_VERSION)
+        return EMBEDDING_CACHE.get_or_compute(key, lambda: _sbert_embedding(text))
+    return _sbert_embedding(text)
+
+def _sbert_embedding(text):
+    texts = [text] if isinstance(text, str) else list(text)
+    encoded = encode_texts(sbert_tokenizer, texts)
+    window_embeddings = forward_windows(sbert_model, encoded, reduce=_pooled_output)
+    return pool_embeddings(window_embeddings, encoded, len(texts))
+
+
+def classify_topics(text, primary_threshold=0.22, secondary_threshold=0.18):
+    """
+    HİBRİT YAKLAŞIM: Cosine similarity + Hard keyword matching + Contextual filtering
+    """
+    return classify_topics_batch([text], primary_threshold, secondary_threshold)[0]
+
+def classify_topics_batch(texts, primary_threshold=0.22, secondary_threshold=0.18, embeddings=None):
+    """
+    Birden fazla metnin konularını belirler.
     
-    konu_embeddings = {}
-    for konu, keywords in KONU_ETIKETLERI.items():
-        konu_embeddings[konu] = F.normalize(get_sentence_embedding(keywords), p=2, dim=1)
+    Konu benzerlikleri tek bir matris çarpımıyla (metin x konu), keyword boost'ları
+    önceden kurulmuş token -> konu indeksiyle hesaplanır.
+    """
+    texts = list(texts)
+    if embeddings is None:
+        embeddings = get_sentence_embedding(texts)
+    similarities = score_topic_similarities(embeddings).tolist()
+    return [
+        _select_topics(text, row, primary_threshold, secondary_threshold)
+        for text, row in zip(texts, similarities)
+    ]
+
+def score_topic_similarities(embeddings):
+    """(N, D) embedding'ler için (N, K) cosine benzerlik matrisi döner (K = konu sayısı)"""
+    return F.normalize(embeddings, p=2, dim=1) @ konu_matrix.T
+
+
+# --- KEYWORD İNDEKSİ ---
+# HARD_KEYWORDS bir kez token -> (keyword token'ları, konu, sıra) indeksine çevrilir;
+# her çağrıda tüm keyword listesini substring olarak taramak yerine metnin
+# token'ları indekste aranır. Eşleşme kuralı eskisiyle aynıdır: keyword metinde
+# boşlukla (veya metin başı/sonuyla) sınırlanmış olarak geçmelidir.
+NLP_KEYWORD_SUFFIXES = os.environ.get("NLP_KEYWORD_SUFFIXES", "0") == "1"
+
+# NLP_KEYWORD_SUFFIXES=1 ile "hastanedeyim", "Ali'yle" gibi çekimli biçimler de kökleri
+# üzerinden eşleşir. Varsayılan kapalıdır; açıldığında konu çıktısı değişebilir.
+TURKISH_SUFFIXES = sorted([
+    "lar", "ler", "ları", "leri", "larım", "lerim", "ların", "lerin",
+    "ım", "im", "um", "üm", "ın", "in", "un", "ün", "ı", "i", "u", "ü",
+    "yı", "yi", "yu", "yü", "ya", "ye", "a", "e", "da", "de", "ta", "te",
+    "dan", "den", "tan", "ten", "la", "le", "yla", "yle",
+    "ını", "ini", "unu", "ünü", "nın", "nin", "nun", "nün",
+    "yım", "yim", "dayım", "deyim", "daydım", "deydim", "yken", "ken",
+], key=len, reverse=True)
+KEYWORD_STRIP_CHARS = ".,!?;:\"'()[]…"
+
+
+def _build_keyword_index(hard_keywords):
+    index = {}
+    for konu, keywords in hard_keywords.items():
+        for order, keyword in enumerate(keywords):
+            tokens = tuple(keyword.split(" "))
+            index.setdefault(tokens[0], []).append((tokens, konu, order))
+    return index
+
+
+KEYWORD_INDEX = _build_keyword_index(HARD_KEYWORDS)
+
+
+def _suffix_stems(token):
+    """Token'ın noktalama, kesme işareti ve yaygın çekim eklerinden arındırılmış kök adayları"""
+    token = token.strip(KEYWORD_STRIP_CHARS)
+    stems = {token}
+    for apostrophe in ("'", "’"):
+        if apostrophe in token:
+            stems.add(token.split(apostrophe, 1)[0])
+    for stem in list(stems):
+        for suffix in TURKISH_SUFFIXES:
+            if stem.endswith(suffix) and len(stem) - len(suffix) >= 3:
+                stems.add(stem[:-len(suffix)])
+    return stems
+
+
+def match_keywords(text_lower):
+    """
+    Metinde geçen hard keyword'leri bulur.
     
-    def classify_topics(text, primary_threshold=0.22, secondary_threshold=0.18):
-        """
-        HİBRİT YAKLAŞIM: Cosine similarity + Hard keyword matching + Contextual filtering
-        """
-        text_lower = text.lower()
-        text_embedding = F.normalize(get_sentence_embedding(text), p=2, dim=1)
-        
-        results = []
-        for konu, konu_emb in konu_embeddings.items():
-            similarity = F.cosine_similarity(text_embedding, konu_emb).item()
-            
-            # HARD KEYWORD BOOST
+    Returns:
+        dict: konu -> eşleşen ilk keyword (HARD_KEYWORDS sırasına göre)
+    """
+    tokens = text_lower.split(" ")
+    best = {}
+    for position, token in enumerate(tokens):
+        candidates = KEYWORD_INDEX.get(token, ())
+        if NLP_KEYWORD_SUFFIXES:
+            candidates = list(candidates)
+            for stem in _suffix_stems(token) - {token}:
+                candidates.extend(c for c in KEYWORD_INDEX.get(stem, ()) if len(c[0]) == 1)
+        for keyword_tokens, konu, order in candidates:
+            if len(keyword_tokens) > 1 and tuple(tokens[position:position + len(keyword_tokens)]) != keyword_tokens:
+                continue
+            if konu not in best or order < best[konu][0]:
+                best[konu] = (order, " ".join(keyword_tokens))
+    return {konu: keyword for konu, (_, keyword) in best.items()}
+
+
+def _select_topics(text, similarities, primary_threshold, secondary_threshold):
+    """Bir metnin konu benzerlik satırına keyword boost'u ekler ve eşikleri uygular"""
+    matched = match_keywords(text.lower())
+
+    results = []
+    for konu, similarity in zip(KONU_NAMES, similarities):
+        # HARD KEYWORD BOOST
+        keyword = matched.get(konu)
+        keyword_boost = 0.15 if keyword else 0.0
+
+        # BAĞLAMSAL FİLTRE: Bazı keyword'ler yalnızca güçlü semantic skorla kabul edilir
+        if keyword and keyword in CONTEXTUAL_KEYWORDS.get(konu, ()) and similarity < 0.18:
             keyword_boost = 0.0
-            matched_keywords = []
-            if konu in HARD_KEYWORDS:
-                for keyword in HARD_KEYWORDS[konu]:
-                    # SUBSTRING KONTROLÜ: Kelimenin başında/sonunda boşluk olmalı
-                    # Örnek: "iş" kelimesi "alışveriş" içinde geçmesin
-                    if f" {keyword} " in f" {text_lower} " or text_lower.startswith(keyword + " ") or text_lower.endswith(" " + keyword):
-                        keyword_boost = 0.15
-                        matched_keywords.append(keyword)
-                        break
-            
-            # BAĞLAMSAL FİLTRE: Bazı keyword'ler yalnızca güçlü semantic skorla kabul edilir
-            if konu in CONTEXTUAL_KEYWORDS and keyword_boost > 0:
-                for ctx_keyword in CONTEXTUAL_KEYWORDS[konu]:
-                    if ctx_keyword in matched_keywords:
-                        # Eğer bu bağlamsal kelimeyse ve base skor düşükse, boost'u iptal et
-                        if similarity < 0.18:  # Threshold yükseltildi (0.15 → 0.18)
-                            keyword_boost = 0.0
-                            matched_keywords = []
-                            break
-            
-            final_score = similarity + keyword_boost
-            results.append((konu, final_score, similarity, keyword_boost, matched_keywords))
-        
-        results.sort(key=lambda x: x[1], reverse=True)
-        
-        # DEBUG
-        print(f"\n🔍 KONU SKORLARI ('{text[:50]}...'):")
-        for konu, final, orig, boost, keywords in results[:6]:
+            keyword = None
+
+        final_score = similarity + keyword_boost
+        results.append((konu, final_score, similarity, keyword_boost, keyword))
+
+    results.sort(key=lambda x: x[1], reverse=True)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🔍 KONU SKORLARI ('%s...'):", text[:50])
+        for konu, final, orig, boost, keyword in results[:6]:
             boost_str = f" (+{boost:.2f} boost)" if boost > 0 else ""
-            keyword_str = f" [matched: {keywords[0]}]" if keywords else ""
-            print(f"  {konu}: {final:.4f} (base: {orig:.4f}{boost_str}{keyword_str})")
-        
-        topics = []
-        
-        # STRATEJİ 1: Primary threshold
+            keyword_str = f" [matched: {keyword}]" if keyword else ""
+            logger.debug("  %s: %.4f (base: %.4f%s%s)", konu, final, orig, boost_str, keyword_str)
+
+    topics = []
+
+    # STRATEJİ 1: Primary threshold
+    for konu, final_score, _, _, _ in results:
+        if final_score >= primary_threshold and konu != "Genel Günlük":
+            topics.append(konu)
+
+    # STRATEJİ 2: Secondary threshold
+    if not topics:
         for konu, final_score, _, _, _ in results:
-            if final_score >= primary_threshold and konu != "Genel Günlük":
+            if final_score >= secondary_threshold and konu != "Genel Günlük":
                 topics.append(konu)
-                print(f"  ✅ Konu eklendi: {konu} ({final_score:.4f})")
-        
-        # STRATEJİ 2: Secondary threshold
-        if not topics:
-            for konu, final_score, _, _, _ in results:
-                if final_score >= secondary_threshold and konu != "Genel Günlük":
-                    topics.append(konu)
-                    print(f"  ➕ İkincil konu: {konu} ({final_score:.4f})")
-        
-        # STRATEJİ 3: Fallback
-        if not topics:
-            best_topic, best_score, _, _, _ = results[0]
-            if best_score > 0.12:
-                topics.append(best_topic)
-                print(f"  ⚠️ Fallback: {best_topic} ({best_score:.4f})")
-        
-        # Maksimum 3 konu
-        topics = topics[:3]
-        
-        return topics
-    
-    zero_shot_pipeline = classify_topics
-    print("✓ Sentence-BERT (Konu Sınıflandırma) yüklendi.")
 
-except Exception as e:
-    print(f"HATA: Modeller yüklenirken bir sorun oluştu: {e}")
-    sentiment_pipeline = None
-    ner_pipeline = None
-    zero_shot_pipeline = None
+    # STRATEJİ 3: Fallback
+    if not topics:
+        best_topic, best_score, _, _, _ = results[0]
+        if best_score > 0.12:
+            topics.append(best_topic)
+
+    # Maksimum 3 konu
+    topics = topics[:3]
+    logger.debug("  Konular: %s", topics)
+
+    return topics
+
+# --- ORTAK TOKENİZASYON ---
+# Üç model de Türkçe BERT-base cased tabanlı; vocab'ları aynıysa metin bir kez
+# tokenize edilir ve aynı encoding üç modele birden verilir.
+TOKENIZER_PROBE = "İstanbul'da ÇALIŞAN Ayşe Hanım, 3 gündür çok yorgun ve hasta."
+
+def tokenizers_match(tokenizer_a, tokenizer_b):
+    """İki tokenizer aynı vocab ve normalizasyonla aynı token id'lerini üretiyorsa True döner"""
+    if tokenizer_a is tokenizer_b:
+        return True
+    if not (tokenizer_a.is_fast and tokenizer_b.is_fast):
+        return False
+    if tokenizer_a.get_vocab() != tokenizer_b.get_vocab():
+        return False
+    return tokenizer_a(TOKENIZER_PROBE)["input_ids"] == tokenizer_b(TOKENIZER_PROBE)["input_ids"]
+
+# --- KAYAN PENCERE (SLIDING WINDOW) ---
+# 512 token'ı aşan metinler örtüşen pencerelere bölünür; tüm pencereler tek
+# grupta çalışır ve sonuçlar metin bazında birleştirilir. Bir forward pass'e en
+# fazla WINDOW_BATCH_SIZE pencere girer, böylece bellek metin uzunluğundan
+# bağımsız sınırlı kalır, süre ise pencere sayısıyla doğrusal artar.
+WINDOW_MAX_TOKENS = 512
+WINDOW_STRIDE = 64  # ardışık pencereler arasında örtüşen token sayısı
+WINDOW_BATCH_SIZE = int(os.environ.get("NLP_WINDOW_BATCH_SIZE", "16"))
+
+def encode_texts(tokenizer, texts):
+    """
+    Metinleri tek seferde tokenize eder (offset ve özel token maskesi NER için tutulur).
+
+    Uzun metinler WINDOW_STRIDE örtüşmeli pencerelere bölünür; her satırın hangi
+    metne ait olduğu "overflow_to_sample_mapping" içinde tutulur. Slow
+    tokenizer'lar pencereleme desteklemediğinden eskisi gibi kesilir.
+    """
+    texts = list(texts)
+    windowed = tokenizer.is_fast
+    encoded = tokenizer(
+        texts,
+        padding=True,
+        truncation=True,
+        max_length=WINDOW_MAX_TOKENS,
+        stride=WINDOW_STRIDE if windowed else 0,
+        return_overflowing_tokens=windowed,
+        return_tensors='pt',
+        return_offsets_mapping=windowed,
+        return_special_tokens_mask=True
+    )
+    if "overflow_to_sample_mapping" not in encoded:
+        encoded["overflow_to_sample_mapping"] = torch.arange(len(texts))
+    return encoded
+
+def model_inputs(encoded):
+    """Encoding içinden yalnızca modelin forward'ına giden tensörleri seçer"""
+    return {k: v for k, v in encoded.items() if k in ("input_ids", "attention_mask", "token_type_ids")}
+
+def forward_windows(model, encoded, reduce=None):
+    """
+    Modeli pencereler üzerinde WINDOW_BATCH_SIZE'lık parçalar halinde çalıştırır.
+
+    Args:
+        reduce: (model_output, inputs) -> tensör; verilmezse model_output[0].
+                SBERT için pooling burada yapılır, token çıktıları biriktirilmez.
+    """
+    inputs = model_inputs(encoded)
+    rows = inputs["input_ids"].shape[0]
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, rows, WINDOW_BATCH_SIZE):
+            chunk = {k: v[start:start + WINDOW_BATCH_SIZE] for k, v in inputs.items()}
+            output = model(**chunk)
+            outputs.append(reduce(output, chunk) if reduce else output[0])
+    if isinstance(outputs[0], dict):
+        return {k: torch.cat([output[k] for output in outputs]) for k in outputs[0]}
+    return torch.cat(outputs)
+
+def windows_by_text(encoded, n_texts):
+    """Her metnin encoding içindeki pencere (satır) indekslerini döner"""
+    rows = [[] for _ in range(n_texts)]
+    for row, sample in enumerate(encoded["overflow_to_sample_mapping"].tolist()):
+        rows[sample].append(row)
+    return rows
+
+def window_weights(encoded, rows):
+    """Pencere ağırlıkları: her penceredeki gerçek token sayısı"""
+    return encoded["attention_mask"][rows].sum(dim=1).float()
+
+def pool_embeddings(window_embeddings, encoded, n_texts):
+    """Pencere embedding'lerini token sayısıyla ağırlıklı ortalayarak metin embedding'i üretir"""
+    pooled = []
+    for rows in windows_by_text(encoded, n_texts):
+        if len(rows) == 1:
+            pooled.append(window_embeddings[rows[0]])
+            continue
+        weights = window_weights(encoded, rows)
+        pooled.append((window_embeddings[rows] * weights.unsqueeze(-1)).sum(dim=0) / weights.sum())
+    return torch.stack(pooled)
+
+def combine_sentiment(logits, encoded, n_texts):
+    """Pencerelerin sınıf olasılıklarını token sayısıyla ağırlıklı ortalar, en yüksek etiketi seçer"""
+    results = []
+    for rows in windows_by_text(encoded, n_texts):
+        if len(rows) == 1:
+            results.append(sentiment_pipeline.postprocess({"logits": logits[rows[0]:rows[0] + 1]}))
+            continue
+        weights = window_weights(encoded, rows).tolist()
+        totals = {}
+        for row, weight in zip(rows, weights):
+            for item in sentiment_pipeline.postprocess({"logits": logits[row:row + 1]}, top_k=None):
+                totals[item["label"]] = totals.get(item["label"], 0.0) + weight * item["score"]
+        label, score = max(totals.items(), key=lambda kv: kv[1])
+        results.append({"label": label, "score": score / sum(weights)})
+    return results
+
+def ner_postprocess(text, encoded, logits, i):
+    """Tek bir satırın NER logit'lerini pipeline'ın 'simple' aggregation'ı ile varlıklara çevirir"""
+    length = int(encoded["attention_mask"][i].sum())
+    offsets = encoded.get("offset_mapping")
+    model_outputs = {
+        "logits": logits[i:i + 1, :length],
+        "input_ids": encoded["input_ids"][i:i + 1, :length],
+        "offset_mapping": offsets[i:i + 1, :length] if offsets is not None else None,
+        "special_tokens_mask": encoded["special_tokens_mask"][i:i + 1, :length],
+        "sentence": text,
+        "is_last": True,
+    }
+    from transformers.pipelines.token_classification import AggregationStrategy
+    return ner_pipeline.postprocess([model_outputs], aggregation_strategy=AggregationStrategy.SIMPLE)
+
+def combine_entities(texts, encoded, logits):
+    """
+    Pencerelerin varlıklarını birleştirir. Offset'ler orijinal metne göre olduğundan
+    örtüşme bölgesinde iki kez bulunan varlıklar aynı konuma düşer; pipeline'ın
+    aggregate_overlapping_entities'i bunlardan en uzun/en yüksek skorluyu tutar.
+    """
+    results = []
+    for text, rows in zip(texts, windows_by_text(encoded, len(texts))):
+        entities = []
+        for row in rows:
+            entities.extend(ner_postprocess(text, encoded, logits, row))
+        if len(rows) > 1 and entities:
+            entities = ner_pipeline.aggregate_overlapping_entities(entities)
+        results.append(entities)
+    return results
+
+def _pooled_output(model_output, inputs):
+    return mean_pooling(model_output, inputs["attention_mask"])
+
+def select_texts(encoded, indices):
+    """Encoding'den yalnızca verilen metinlerin pencerelerini alır (metin numaraları 0'dan yeniden başlar)"""
+    position = {text_index: new_index for new_index, text_index in enumerate(indices)}
+    mapping = encoded["overflow_to_sample_mapping"].tolist()
+    rows = [row for row, sample in enumerate(mapping) if sample in position]
+    selected = {k: v[rows] for k, v in encoded.items() if k != "overflow_to_sample_mapping"}
+    selected["overflow_to_sample_mapping"] = torch.tensor([position[mapping[row]] for row in rows])
+    return selected
+
+def run_gated_ner(texts):
+    """
+    NER kapısı: aday içermeyen metinlerde NER çalışmaz, diğerlerinde yalnızca
+    aday cümleler modele gider. Cümle offset'leri orijinal metne geri kaydırılır.
+    """
+    plans = ner_gate.plan(texts)
+    span_texts, owners = [], []
+    for i, (text, spans) in enumerate(zip(texts, plans)):
+        for start, end in spans:
+            span_texts.append(text[start:end])
+            owners.append((i, start))
+
+    results = [[] for _ in texts]
+    if not span_texts:
+        return results
+    encoded = encode_texts(ner_pipeline.tokenizer, span_texts)
+    span_entities = combine_entities(span_texts, encoded, forward_windows(ner_pipeline.model, encoded))
+    for (i, offset), entities in zip(owners, span_entities):
+        for entity in entities:
+            if entity.get("start") is not None:
+                entity["start"] += offset
+                entity["end"] += offset
+            results[i].append(entity)
+    return results
+
+def run_nlp_models(texts, sentiment_overrides=None):
+    """
+    Duygu, NER ve SBERT modellerini bir metin grubu üzerinde çalıştırır.
+
+    Vocab'ı eşleşen modeller ortak encoding'i kullanır, eşleşmeyenler kendi
+    tokenizer'ına düşer. Uzun metinlerin pencereleri aynı grupta çalışır ve
+    sonuçlar metin başına birleştirilir.
+
+    Args:
+        sentiment_overrides: metin indeksi -> duygu sonucu; bu metinler için
+                             BERT duygu modeli çalışmaz (duygu cascade'i)
+
+    NLP_NER_GATE=on iken NER, run_gated_ner ile yalnızca aday cümlelerde çalışır.
+
+    Returns:
+        (sentiment_results, ner_results, embeddings)
+    """
+    sentiment_overrides = sentiment_overrides or {}
+    with NLP_STAGE_SECONDS.time(stage="tokenize"):
+        shared = encode_texts(sbert_tokenizer, texts)
+        sentiment_encoded = shared if SHARED_TOKENIZATION["sentiment"] else encode_texts(sentiment_pipeline.tokenizer, texts)
+
+    bert_indices = [i for i in range(len(texts)) if i not in sentiment_overrides]
+    bert_results = []
+    if bert_indices:
+        with NLP_STAGE_SECONDS.time(stage="sentiment"):
+            if len(bert_indices) < len(texts):
+                sentiment_encoded = select_texts(sentiment_encoded, bert_indices)
+            sentiment_logits = forward_windows(sentiment_pipeline.model, sentiment_encoded)
+            bert_results = combine_sentiment(sentiment_logits, sentiment_encoded, len(bert_indices))
+        NLP_TEXTS_TOTAL.inc(len(bert_indices), stage="sentiment")
+    with NLP_STAGE_SECONDS.time(stage="ner"):
+        if NLP_NER_GATE == "on":
+            ner_results = run_gated_ner(texts)
+        else:
+            ner_encoded = shared if SHARED_TOKENIZATION["ner"] else encode_texts(ner_pipeline.tokenizer, texts)
+            ner_results = combine_entities(texts, ner_encoded, forward_windows(ner_pipeline.model, ner_encoded))
+    NLP_TEXTS_TOTAL.inc(len(texts), stage="ner")
+    if NLP_NER_GATE == "audit":
+        with NLP_STAGE_SECONDS.time(stage="ner_audit"):
+            ner_gate.audit(ner_results, run_gated_ner(texts), NER_THRESHOLD)
+    with NLP_STAGE_SECONDS.time(stage="embedding"):
+        window_embeddings = forward_windows(sbert_model, shared, reduce=_pooled_output)
+        embeddings = pool_embeddings(window_embeddings, shared, len(texts))
+    NLP_TEXTS_TOTAL.inc(len(texts), stage="embedding")
+
+    sentiment_results = [sentiment_overrides.get(i) for i in range(len(texts))]
+    for i, result in zip(bert_indices, bert_results):
+        sentiment_results[i] = result
+    return sentiment_results, ner_results, embeddings
+
+
+def run_distilled_model(texts):
+    """
+    NLP_MODE=distilled: öğrenci modelin üç başlığı tek forward pass'te çalışır.
+    Uzun metinlerin pencereleri full moddaki gibi token sayısıyla ağırlıklı birleştirilir.
+
+    Returns:
+        (sentiment_results, ner_results, topics_results) - full moddaki _build_analysis girdileriyle aynı biçim
+    """
+    from distilled_model import decode_entities, decode_topics, head_probabilities, merge_overlapping, sentiment_from_outputs
+
+    model = distilled_nlp_model
+    encoded = encode_texts(distilled_tokenizer, texts)
+    probs = forward_windows(model, encoded, reduce=lambda output, chunk: head_probabilities(output))
+
+    sentiment_results, ner_results, topics_results = [], [], []
+    for text, rows in zip(texts, windows_by_text(encoded, len(texts))):
+        weights = window_weights(encoded, rows)
+        weights = (weights / weights.sum()).unsqueeze(-1)
+        sentiment_probs = (probs["sentiment"][rows] * weights).sum(dim=0)
+        sentiment_score = (probs["sentiment_score"][rows] * weights.squeeze(-1)).sum()
+        topic_probs = (probs["topics"][rows] * weights).sum(dim=0)
+
+        entities = []
+        for row in rows:
+            entities.extend(decode_entities(
+                text, encoded["offset_mapping"][row], encoded["special_tokens_mask"][row],
+                probs["ner"][row], model.ner_labels
+            ))
+        if len(rows) > 1:
+            entities = merge_overlapping(entities)
+
+        sentiment_results.append(sentiment_from_outputs(sentiment_probs, sentiment_score, model.sentiment_labels))
+        ner_results.append(entities)
+        topics_results.append(decode_topics(topic_probs, model.topic_labels))
+    return sentiment_results, ner_results, topics_results
 
 
 # --- AYARLAR ---
 NER_THRESHOLD = 0.70
 SENTIMENT_THRESHOLD = 0.75
 MIN_WORD_COUNT = 3
+ANALYSIS_BATCH_SIZE = 16
 
+# --- DUYGU CASCADE (bkz. sentiment_cascade.py) ---
+# Açıkken hızlı model emin olduğu metinlerde BERT duygu modelinin yerine geçer.
+# Eşik SENTIMENT_THRESHOLD'un altına inemez; aksi halde hızlı yoldan gelen
+# etiket _build_analysis'te "neutral"e dönerdi.
+NLP_SENTIMENT_CASCADE = os.environ.get("NLP_SENTIMENT_CASCADE", "0") == "1"
+NLP_CASCADE_THRESHOLD = max(float(os.environ.get("NLP_CASCADE_THRESHOLD", "0.90")), SENTIMENT_THRESHOLD)
+NLP_CASCADE_MODEL = os.environ.get(
+    "NLP_CASCADE_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_cascade.pkl")
+)
+sentiment_cascade = None
 
-def analyze_text(text: str) -> dict:
-    """Gelen metni duygu, NER ve konu analiziyle işler"""
-    if not sentiment_pipeline or not ner_pipeline or not zero_shot_pipeline:
-        print("HATA: NLP modelleri yüklenemedi, analiz yapılamıyor.")
-        return {"hata": "NLP modelleri yüklenemedi."}
+# --- NER KAPISI (bkz. ner_gate.py) ---
+# off: NER her metinde çalışır | on: aday cümle yoksa atlanır, varsa yalnızca aday cümlelerde çalışır
+# audit: çıktı tam NER'den gelir, kapılı NER ayrıca çalıştırılıp kaçırılan varlıklar sayılır
+NLP_NER_GATE = os.environ.get("NLP_NER_GATE", "off")
+if NLP_NER_GATE not in ("off", "on", "audit"):
+    print(f"⚠️ Bilinmeyen NLP_NER_GATE '{NLP_NER_GATE}', 'off' kullanılıyor.")
+    NLP_NER_GATE = "off"
+ner_gate = NerGate(load_gazetteer(os.environ.get("NER_GAZETTEER_PATH"))) if NLP_NER_GATE != "off" else None
 
-    # --- KORUMA KALKANI ---
-    stripped_text = text.strip()
-    word_count = len(stripped_text.split())
-    char_count = len(stripped_text)
-    
-    metrics = {
-        "kelime_sayisi": word_count,
-        "karakter_sayisi": char_count
+# --- CACHE AYARLARI ---
+# Analiz mantığı (eşikler, etiketler, postprocess) değişince artırılır; eski cache kayıtları geçersiz olur
+ANALYSIS_CACHE_REVISION = 1
+NLP_CACHE_SIZE = int(os.environ.get("NLP_CACHE_SIZE", "2048"))
+NLP_CACHE_PATH = os.environ.get(
+    "NLP_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "nlp_cache.sqlite3")
+)
+
+
+def _analysis_version() -> str:
+    """Analiz sonucunu etkileyen model ve ayarlardan kısa bir sürüm özeti üretir"""
+    config = {
+        "models": [SENTIMENT_MODEL_NAME, NER_MODEL_NAME, sbert_model_name],
+        "thresholds": [NER_THRESHOLD, SENTIMENT_THRESHOLD],
+        "konu_etiketleri": KONU_ETIKETLERI,
+        "hard_keywords": HARD_KEYWORDS,
+        "contextual_keywords": CONTEXTUAL_KEYWORDS,
+        "keyword_suffixes": NLP_KEYWORD_SUFFIXES,
+        "window": [WINDOW_MAX_TOKENS, WINDOW_STRIDE],
+        "backend": ACTIVE_BACKEND,
+        "mode": [NLP_MODE, distilled_version(NLP_DISTILLED_DIR)] if NLP_MODE == "distilled" else NLP_MODE,
+        "sentiment_cascade": (
+            [NLP_CASCADE_THRESHOLD, model_fingerprint(NLP_CASCADE_MODEL)] if NLP_SENTIMENT_CASCADE else None
+        ),
+        "ner_gate": ner_gate.version if NLP_NER_GATE == "on" else None,
+        "revision": ANALYSIS_CACHE_REVISION,
+    }
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def _embedding_version() -> str:
+    """Embedding'i etkileyen model, backend ve pencere ayarlarından kısa bir sürüm özeti üretir"""
+    config = {
+        "model": sbert_model_name,
+        "backend": ACTIVE_BACKEND,
+        "window": [WINDOW_MAX_TOKENS, WINDOW_STRIDE],
     }
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
 
+
+def _embedding_to_bytes(embedding) -> bytes:
+    return embedding.detach().to(torch.float32).contiguous().numpy().tobytes()
+
+
+def _embedding_from_bytes(data: bytes):
+    return torch.frombuffer(bytearray(data), dtype=torch.float32).unsqueeze(0)
+
+
+def _refresh_versions():
+    """
+    Sürümler istenen NLP_BACKEND'e değil, kullanılan backend'e (ACTIVE_BACKEND) bağlıdır:
+    onnx/int8 kurulamayıp torch'a düşülen worker'lar torch sürümüyle aynı anahtarları üretir.
+    Modeller yüklenince load_models tarafından yeniden hesaplanır.
+    """
+    global ANALYSIS_VERSION, EMBEDDING_VERSION
+    ANALYSIS_VERSION = _analysis_version()
+    EMBEDDING_VERSION = _embedding_version()
+
+
+ANALYSIS_VERSION = None
+EMBEDDING_VERSION = None
+
+# Analiz cache'i yalnızca model çıktısını (sentiment/entities/topics) tutar; metrics her seferinde metinden hesaplanır
+ANALYSIS_CACHE = ContentCache(
+    "analysis",
+    encode=lambda value: json.dumps(value, ensure_ascii=False).encode("utf-8"),
+    decode=lambda data: json.loads(data),
+    max_entries=NLP_CACHE_SIZE,
+    db_path=NLP_CACHE_PATH
+)
+EMBEDDING_CACHE = ContentCache(
+    "embedding",
+    encode=_embedding_to_bytes,
+    decode=_embedding_from_bytes,
+    max_entries=NLP_CACHE_SIZE,
+    db_path=NLP_CACHE_PATH
+)
+
+
+def cache_stats() -> dict:
+    """Analiz ve embedding cache'lerinin hit/miss sayaçları"""
+    return {
+        "analysis": ANALYSIS_CACHE.stats(),
+        "embedding": EMBEDDING_CACHE.stats(),
+        "version": ANALYSIS_VERSION,
+    }
+
+
+def cascade_stats():
+    """Duygu cascade'inde hızlı yoldan geçen metinlerin oranı (kapalıysa None)"""
+    return sentiment_cascade.stats() if sentiment_cascade else None
+
+
+def ner_gate_stats():
+    """NER kapısının atlama oranı ve (audit modunda) recall ölçümü (kapalıysa None)"""
+    return dict(ner_gate.stats(), mode=NLP_NER_GATE) if ner_gate else None
+
+
+def _text_metrics(stripped_text: str) -> dict:
+    return {
+        "kelime_sayisi": len(stripped_text.split()),
+        "karakter_sayisi": len(stripped_text)
+    }
+
+
+def _needs_nlp(stripped_text: str, metrics: dict) -> bool:
+    """Kısa metinler ve soru cümleleri NLP modellerine gönderilmez"""
     is_question = stripped_text.endswith('?')
-    is_too_short = word_count < MIN_WORD_COUNT 
-
-    if is_question or is_too_short:
-        print(f"Kısa/Soru cümlesi algılandı. NLP analizi atlanıyor.")
-        return {
-            "sentiment": {"duygu": "neutral", "skor": 1.0},
-            "entities": [],
-            "topics": [],
-            "metrics": metrics
-        }
+    is_too_short = metrics["kelime_sayisi"] < MIN_WORD_COUNT
+    return not (is_question or is_too_short)
+
+
+def _neutral_analysis(metrics: dict) -> dict:
+    return {
+        "sentiment": {"duygu": "neutral", "skor": 1.0},
+        "entities": [],
+        "topics": [],
+        "metrics": metrics
+    }
+
+
+def _with_metrics(nlp_result: dict, metrics: dict) -> dict:
+    """Cache'lenen model çıktısını metrics ile birleştirip analiz formatına çevirir"""
+    return {
+        "sentiment": dict(nlp_result["sentiment"]),
+        "entities": list(nlp_result["entities"]),
+        "topics": list(nlp_result["topics"]),
+        "metrics": metrics
+    }
+
+
+def _build_analysis(sentiment_result: dict, ner_result: list, topics: list, metrics: dict) -> dict:
+    """Model çıktılarını eşiklerden geçirip API'nin döndüğü analiz formatına çevirir"""
+    original_label = sentiment_result["label"]
+    original_score = float(round(sentiment_result["score"], 4))
     
+    final_label = "neutral" if original_score < SENTIMENT_THRESHOLD else original_label
+    sentiment = {"duygu": final_label, "skor": original_score}
+
+    entities = [
+        {
+            "varlik": entity["entity_group"],
+            "metin": entity["word"],
+            "skor": float(round(entity["score"], 4))
+        } for entity in ner_result if entity["score"] > NER_THRESHOLD
+    ]
+    
+    return {
+        "sentiment": sentiment,
+        "entities": entities,
+        "topics": topics,
+        "metrics": metrics
+    }
+
+
+def analyze_texts(texts: list, batch_size: int = ANALYSIS_BATCH_SIZE) -> list:
+    """
+    Birden fazla metni toplu (batch) halinde duygu, NER ve konu analiziyle işler.
+    
+    Metinler uzunluklarına göre sıralanıp batch_size'lık gruplara ayrılır; her grup
+    yalnızca kendi en uzun metnine kadar pad edilir. Kısa metin ve soru kısayolları
+    analyze_text ile aynıdır.
+    
+    Returns:
+        list: Giriş sırasıyla, analyze_text ile aynı formatta analiz sonuçları
+    """
+    if not load_models():
+        print("HATA: NLP modelleri yüklenemedi, analiz yapılamıyor.")
+        return [{"hata": "NLP modelleri yüklenemedi."} for _ in texts]
+
+    batch_size = max(1, int(batch_size))
+    results = [None] * len(texts)
+    pending = []
+
+    # --- KORUMA KALKANI ---
+    for i, text in enumerate(texts):
+        stripped_text = text.strip()
+        metrics = _text_metrics(stripped_text)
+        if _needs_nlp(stripped_text, metrics):
+            pending.append((i, stripped_text, metrics))
+        else:
+            print(f"Kısa/Soru cümlesi algılandı. NLP analizi atlanıyor.")
+            results[i] = _neutral_analysis(metrics)
+
+    # --- CACHE ---
+    # Aynı (normalize) metin daha önce analiz edildiyse modeller çalışmaz; şu an
+    # başka bir istekte analiz ediliyorsa onun sonucu beklenir.
+    to_run = []
+    waiting = []
+    for i, stripped_text, metrics in pending:
+        key = cache_key(stripped_text, ANALYSIS_VERSION)
+        cached = ANALYSIS_CACHE.get(key)
+        if cached is not None:
+            results[i] = _with_metrics(cached, metrics)
+            continue
+        future, owner = ANALYSIS_CACHE.claim(key)
+        if owner:
+            to_run.append((i, stripped_text, metrics, key))
+        else:
+            waiting.append((i, metrics, future))
+
+    # Benzer uzunluktaki metinler aynı gruba düşsün, padding minimumda kalsın
+    to_run.sort(key=lambda item: len(item[1]))
+
     # --- ANALİZ ---
+    unresolved = {key for _, _, _, key in to_run}
     try:
-        # 1. DUYGU ANALİZİ
-        sentiment_result = sentiment_pipeline(stripped_text)[0]
-        original_label = sentiment_result["label"]
-        original_score = float(round(sentiment_result["score"], 4))
-        
-        final_label = "neutral" if original_score < SENTIMENT_THRESHOLD else original_label
-        sentiment = {"duygu": final_label, "skor": original_score}
-
-        # 2. VARLIK TANIMA
-        ner_result = ner_pipeline(stripped_text)
-        entities = [
-            {
-                "varlik": entity["entity_group"],
-                "metin": entity["word"],
-                "skor": float(round(entity["score"], 4))
-            } for entity in ner_result if entity["score"] > NER_THRESHOLD
-        ]
-        
-        # 3. KONU SINIFLANDIRMA (Sentence-BERT)
-        topics = zero_shot_pipeline(stripped_text)
-        
-        return {
-            "sentiment": sentiment,
-            "entities": entities,
-            "topics": topics,
-            "metrics": metrics
-        }
+        for start in range(0, len(to_run), batch_size):
+            group = to_run[start:start + batch_size]
+            group_texts = [stripped_text for _, stripped_text, _, _ in group]
+            try:
+                if NLP_MODE == "distilled":
+                    # DUYGU + VARLIK + KONU: tek encoder, tek forward pass
+                    with NLP_STAGE_SECONDS.time(stage="distilled"):
+                        sentiment_results, ner_results, topics_results = run_distilled_model(group_texts)
+                    NLP_TEXTS_TOTAL.inc(len(group_texts), stage="distilled")
+                    embeddings = None
+                else:
+                    # 1-2. DUYGU ANALİZİ + VARLIK TANIMA (+ SBERT embedding, tek tokenizasyon)
+                    # Duygu cascade'i açıksa hızlı modelin emin olduğu metinlerde BERT duygu modeli atlanır
+                    fast_sentiments = None
+                    if sentiment_cascade:
+                        with NLP_STAGE_SECONDS.time(stage="cascade"):
+                            fast_sentiments = sentiment_cascade.route(group_texts)
+                    sentiment_results, ner_results, embeddings = run_nlp_models(group_texts, fast_sentiments)
+                    # 3. KONU SINIFLANDIRMA (Sentence-BERT)
+                    with NLP_STAGE_SECONDS.time(stage="topics"):
+                        topics_results = classify_topics_batch(group_texts, embeddings=embeddings)
+            except Exception as e:
+                print(f"Analiz sırasında hata: {e}")
+                import traceback
+                traceback.print_exc()
+                for i, _, _, key in group:
+                    ANALYSIS_CACHE.fail(key, e)
+                    unresolved.discard(key)
+                    results[i] = {"hata": f"Metin analizi sırasında hata: {str(e)}"}
+                continue
 
-    except Exception as e:
-        print(f"Analiz sırasında hata: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"hata": f"Metin analizi sırasında hata: {str(e)}"}
+            for row, ((i, stripped_text, metrics, key), sentiment_result, ner_result, topics) in enumerate(zip(
+                group, sentiment_results, ner_results, topics_results
+            )):
+                analysis = _build_analysis(sentiment_result, ner_result, topics, metrics)
+                ANALYSIS_CACHE.resolve(key, {k: analysis[k] for k in ("sentiment", "entities", "topics")})
+                unresolved.discard(key)
+                if embeddings is not None:
+                    EMBEDDING_CACHE.put(cache_key(stripped_text, EMBEDDING_VERSION), embeddings[row:row + 1].clone())
+                results[i] = analysis
+    finally:
+        # Beklenmedik bir hata bekleyen istekleri asılı bırakmasın
+        for key in unresolved:
+            ANALYSIS_CACHE.fail(key, RuntimeError("Analiz tamamlanamadı"))
+
+    for i, metrics, future in waiting:
+        try:
+            results[i] = _with_metrics(future.result(), metrics)
+        except Exception as e:
+            results[i] = {"hata": f"Metin analizi sırasında hata: {str(e)}"}
+
+    return results
+
+
+def analyze_text(text: str) -> dict:
+    """Gelen metni duygu, NER ve konu analiziyle işler"""
+    return analyze_texts([text], batch_size=1)[0]
+
+
+STARTUP_TIMINGS["import_nlp_pipeline"] = round(time.perf_counter() - _MODULE_IMPORT_START, 3)
 
 
 # TEST BLOĞU
 if __name__ == "__main__":
     print("\n--- NLP Pipeline Test ---")
     
-    if not sentiment_pipeline or not ner_pipeline or not zero_shot_pipeline:
+    if not warmup():
         print("❌ Modeller yüklenemedi.")
     else:
         import json
@@ -0,0 +1,124 @@
+# prefetch_models.py - NLP modellerini yerel model klasörüne (NLP_MODEL_DIR) indirir
+#
+# Her model hub'dan bir kez çekilip <NLP_MODEL_DIR>/<org>--<model>/ altına
+# safetensors olarak kaydedilir (hub'da yalnızca pytorch_model.bin olsa da).
+# Sunucu bu klasörden ağırlıkları mmap ederek yükler; ağa çıkmaz.
+#
+# Kullanım:
+#   python prefetch_models.py                   # eksik modelleri indir + doğrula
+#   python prefetch_models.py --force           # hepsini yeniden indir
+#   python prefetch_models.py --verify-only     # yalnızca yerel kopyaları doğrula
+#
+# Ardından sunucu NLP_OFFLINE_STRICT=1 ile çalıştırılabilir.
+
+import os
+
+# Doğrulama adımı da nlp_pipeline'ı içe aktarır; ısıtma ve cascade gereksiz
+os.environ["NLP_WARMUP_ON_STARTUP"] = "0"
+os.environ["NLP_MODE"] = "full"
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+MANIFEST_FILE = "prefetch.json"
+
+
+def model_classes():
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoModelForTokenClassification
+    return {
+        "sentiment": AutoModelForSequenceClassification,
+        "ner": AutoModelForTokenClassification,
+        "sbert": AutoModel,
+    }
+
+
+def fetch(name: str, model_class, target: str):
+    """Modeli hub'dan yükleyip safetensors olarak target'a kaydeder (yarım kalan indirme bırakmaz)"""
+    from transformers import AutoTokenizer
+
+    partial = target + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    model = model_class.from_pretrained(name)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model.save_pretrained(partial, safe_serialization=True)
+    tokenizer.save_pretrained(partial)
+    with open(os.path.join(partial, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "name": name,
+            "revision": getattr(model.config, "_commit_hash", None),
+            "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }, f, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(partial, target)
+
+
+def verify(model_dir: str) -> bool:
+    """
+    Yerel kopyaları ayrı bir process'te NLP_OFFLINE_STRICT=1 ile yükler; yükleme
+    süresini ve ağırlıkların mmap edilip edilmediğini raporlar.
+    """
+    script = (
+        "import json, nlp_pipeline as n; ok = n.load_models(); "
+        "print(json.dumps({'ok': ok, 'models': n.model_status(), 'timings': n.startup_report()}))"
+    )
+    env = dict(os.environ, NLP_MODEL_DIR=model_dir, NLP_OFFLINE_STRICT="1", NLP_BACKEND="torch")
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    try:
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        print(f"❌ Doğrulama çalıştırılamadı:\n{result.stderr[-2000:]}")
+        return False
+
+    for name in ("sentiment", "ner", "sbert"):
+        info = report["models"][name]
+        if info["state"] != "loaded":
+            print(f"❌ {name}: {info.get('error')}")
+            continue
+        mapped = info.get("mmap_fraction")
+        note = "mmap" if mapped == 1.0 else f"mmap oranı {mapped} (ağırlıklar heap'e kopyalanıyor)"
+        print(f"✓ {name}: {info['load_seconds']} sn, {note}")
+    print(f"⏱️ transformers import: {report['timings'].get('import_transformers')} sn")
+    return report["ok"]
+
+
+if __name__ == "__main__":
+    import nlp_pipeline
+
+    parser = argparse.ArgumentParser(description="NLP modellerini yerel model klasörüne indirir")
+    parser.add_argument("--model-dir", default=nlp_pipeline.NLP_MODEL_DIR)
+    parser.add_argument("--force", action="store_true", help="Var olan yerel kopyaları da yeniden indir")
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args()
+
+    if nlp_pipeline.NLP_OFFLINE_STRICT and not args.verify_only:
+        print("❌ NLP_OFFLINE_STRICT=1 iken indirme yapılamaz.")
+        raise SystemExit(1)
+
+    names = {
+        "sentiment": nlp_pipeline.SENTIMENT_MODEL_NAME,
+        "ner": nlp_pipeline.NER_MODEL_NAME,
+        "sbert": nlp_pipeline.sbert_model_name,
+    }
+    if not args.verify_only:
+        os.makedirs(args.model_dir, exist_ok=True)
+        classes = model_classes()
+        for kind, name in names.items():
+            target = os.path.join(args.model_dir, name.replace("/", "--"))
+            if os.path.exists(os.path.join(target, "config.json")) and not args.force:
+                print(f"↷ {name} zaten var: {target}")
+                continue
+            start = time.perf_counter()
+            print(f"⬇️ {name} indiriliyor...")
+            fetch(name, classes[kind], target)
+            print(f"✓ {name} -> {target} ({time.perf_counter() - start:.1f} sn)")
+
+    print("\n🔍 Yerel kopyalar doğrulanıyor (NLP_OFFLINE_STRICT=1)...")
+    raise SystemExit(0 if verify(args.model_dir) else 1)
@@ -0,0 +1,103 @@
+# read_cache.py - Kullanıcı bazında okuma cache'i (GET /entries, /insights, /predict-mood)
+#
+# Ekranlar her odaklanmada aynı verileri ister; yanıtlar kullanıcı başına kısa bir
+# TTL ile bellekte tutulur. Kullanıcının yazmaları (create_entry, mood backfill,
+# yeni içgörü) o kullanıcının kayıtlarını anında düşürür.
+#
+# Cache process başınadır: serve.py ile çalışırken başka bir worker'a düşen yazma
+# bu worker'ın kaydını düşüremez; bu durumda eski veri en fazla TTL kadar görünür.
+#
+# Yarış: Okuma başlarken version(user_id) alınır, put aynı version'la yapılır.
+# Arada invalidate olduysa (okuma yazmadan önceki veriyi getirmiş olabilir) kaydedilmez.
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserReadCache:
+    """
+    Args:
+        ttl: Kaydın en uzun ömrü (saniye)
+        max_users: Bellekte tutulacak en fazla kullanıcı (LRU)
+    """
+
+    def __init__(self, ttl: float = 30.0, max_users: int = 1024):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users = OrderedDict()  # user_id -> {"version": int, "items": {key: (değer, bitiş)}}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.invalidations = 0
+
+    @staticmethod
+    def _kind(key) -> str:
+        return key[0] if isinstance(key, tuple) else str(key)
+
+    def _state(self, user_id):
+        state = self._users.get(user_id)
+        if state is None:
+            # Yeni durum her zaman yeni bir version alır: düşürülmüş kullanıcıya ait eski okuma yazılamaz
+            state = self._users[user_id] = {"version": next(self._versions), "items": {}}
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return state
+
+    def version(self, user_id) -> int:
+        with self._lock:
+            return self._state(user_id)["version"]
+
+    def get(self, user_id, key):
+        """Kayıt varsa ve süresi dolmadıysa değeri, yoksa None döner"""
+        kind = self._kind(key)
+        with self._lock:
+            state = self._users.get(user_id)
+            item = state["items"].get(key) if state else None
+            if item is not None and item[1] <= time.monotonic():
+                del state["items"][key]
+                item = None
+            if item is None:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            return item[0]
+
+    def put(self, user_id, key, value, version: int):
+        with self._lock:
+            state = self._state(user_id)
+            if state["version"] != version:
+                return
+            state["items"][key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id, *kinds):
+        """Kullanıcının kayıtlarını düşürür; kinds verilirse yalnızca o türleri ("entries", "insight")"""
+        with self._lock:
+            state = self._state(user_id)
+            state["version"] = next(self._versions)
+            if kinds:
+                state["items"] = {k: v for k, v in state["items"].items() if self._kind(k) not in kinds}
+            else:
+                state["items"] = {}
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            kinds = sorted(set(self.hits) | set(self.misses))
+            stats = {
+                "users": len(self._users),
+                "items": sum(len(state["items"]) for state in self._users.values()),
+                "invalidations": self.invalidations,
+            }
+            for kind in kinds:
+                hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+                stats[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+            return stats
@@ -0,0 +1,92 @@
+# sentiment_cascade.py - BERT duygu modelinin önünde hızlı doğrusal model (cascade)
+#
+# Karakter n-gram TF-IDF + Logistic Regression modeli, BERT'in ürettiği nihai
+# etiketler (positive / negative / neutral) üzerinde eğitilir
+# (train_sentiment_cascade.py). Hızlı model positive/negative için eşik üstünde
+# eminse BERT duygu modeli o metin için hiç çalışmaz; emin değilse BERT'e düşülür.
+# predict_sentiment.py'deki confidence_threshold mantığının aynısı.
+
+import hashlib
+import os
+import pickle
+import threading
+
+CASCADE_LABELS = ("positive", "negative")  # hızlı yoldan dönebilecek etiketler
+
+
+def model_fingerprint(path: str) -> str:
+    """Model dosyasının kısa özeti (cache sürümü için); dosya yoksa 'missing'"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        return "missing"
+
+
+class SentimentCascade:
+    """
+    Args:
+        model: predict_proba ve classes_ sunan sklearn pipeline
+        threshold: Hızlı yolun kabul edilmesi için en düşük olasılık
+    """
+
+    def __init__(self, model, threshold=0.90):
+        self.model = model
+        self.threshold = threshold
+        self.labels = list(model.classes_)
+        self._lock = threading.Lock()
+        self.fast = 0
+        self.bert = 0
+
+    @classmethod
+    def load(cls, path: str, threshold: float):
+        with open(path, "rb") as f:
+            model_data = pickle.load(f)
+        return cls(model_data["model"], threshold)
+
+    def predict_proba(self, texts) -> list:
+        """Her metin için {etiket: olasılık}"""
+        probabilities = self.model.predict_proba(list(texts))
+        return [dict(zip(self.labels, map(float, row))) for row in probabilities]
+
+    def route(self, texts) -> dict:
+        """
+        Hızlı modelin emin olduğu metinleri seçer.
+
+        Returns:
+            dict: metin indeksi -> {"label", "score"} (BERT sentiment çıktısıyla aynı biçim);
+                  sözlükte olmayan metinler BERT'e gider.
+        """
+        confident = {}
+        for i, probs in enumerate(self.predict_proba(texts)):
+            label, score = max(probs.items(), key=lambda kv: kv[1])
+            if label in CASCADE_LABELS and score >= self.threshold:
+                confident[i] = {"label": label, "score": score}
+
+        with self._lock:
+            self.fast += len(confident)
+            self.bert += len(texts) - len(confident)
+        return confident
+
+    def stats(self) -> dict:
+        total = self.fast + self.bert
+        return {
+            "threshold": self.threshold,
+            "fast_path": self.fast,
+            "bert": self.bert,
+            "fast_path_rate": round(self.fast / total, 4) if total else 0.0,
+        }
+
+
+def load_cascade(path: str, threshold: float):
+    """Cascade modelini yükler; dosya yoksa veya bozuksa None döner (BERT her zaman çalışır)"""
+    if not os.path.exists(path):
+        print(f"⚠️ UYARI: {path} bulunamadı, duygu cascade'i kapalı. 'python train_sentiment_cascade.py' ile eğitin.")
+        return None
+    try:
+        cascade = SentimentCascade.load(path, threshold)
+    except Exception as e:
+        print(f"⚠️ UYARI: Duygu cascade modeli yüklenemedi: {e}")
+        return None
+    print(f"✓ Duygu cascade'i aktif (eşik {threshold:.2f})")
+    return cascade
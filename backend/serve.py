@@ -0,0 +1,188 @@
+# serve.py - Pre-fork sunucu modu
+#
+# Modeller (3 BERT + RandomForest) parent process'te bir kez yüklenip ısıtılır,
+# ardından worker'lar fork edilir. Ağırlıklar copy-on-write ile paylaşıldığından
+# her worker'ın ek belleği yaklaşık kendi özel heap'i kadardır. NLP_MODEL_DIR'den
+# (prefetch_models.py) yüklenen safetensors ağırlıkları zaten mmap edildiğinden
+# page cache üzerinden paylaşılır.
+#
+# Kullanım:
+#   python serve.py --workers 4                       # 4 worker, çekirdekler eşit bölünür
+#   python serve.py --workers 2 --threads-per-worker 2
+#   python serve.py --workers 4 --memory-report 30     # 30 sn'de bir worker bellek tablosu
+#
+# Geliştirme için 'uvicorn main:app --reload' kullanılmaya devam edilebilir.
+
+import os
+
+# Worker'lar modelleri parent'tan devralır; main import edilirken arka plan ısıtması başlamasın
+os.environ["NLP_WARMUP_ON_STARTUP"] = "0"
+
+import argparse
+import gc
+import signal
+import socket
+import sys
+import time
+import torch
+import uvicorn
+
+
+def default_workers() -> int:
+    return int(os.environ.get("SERVE_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Dinleyen soketi parent'ta açar; tüm worker'lar aynı soketten accept eder"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def memory_usage(pid: int) -> dict:
+    """/proc/<pid>/smaps_rollup'tan RSS, PSS ve özel (paylaşılmayan) bellek (MB)"""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def preload():
+    """Parent'ta uygulamayı import eder, modelleri yükler ve ısıtır"""
+    import main
+    import nlp_pipeline
+
+    if not nlp_pipeline.warmup():
+        print("❌ NLP modelleri yüklenemedi, sunucu başlatılmıyor.")
+        raise SystemExit(1)
+
+    for model in nlp_pipeline.loaded_models():
+        if isinstance(model, torch.nn.Module):
+            model.eval()
+            model.requires_grad_(False)
+
+    # Parent'ta oluşan nesneleri GC takibinden çıkar; worker'larda GC taraması
+    # bu sayfalara yazıp copy-on-write kopyalarına yol açmasın
+    gc.collect()
+    gc.freeze()
+    return main.app
+
+
+def run_worker(app, sock: socket.socket, threads: int, args):
+    """Fork edilen worker: thread sayısını ayarlar ve paylaşılan soket üzerinde uvicorn çalıştırır"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+
+    import nlp_pipeline
+    nlp_pipeline.after_fork()
+
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn(app, sock, threads, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app, sock, threads, args)
+        except BaseException as e:
+            print(f"❌ Worker {os.getpid()} hatası: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def print_memory_report(workers):
+    print("🧠 Bellek (MB)  | RSS     | PSS     | Özel")
+    for label, pid in [("parent", os.getpid())] + [(f"worker {pid}", pid) for pid in workers]:
+        usage = memory_usage(pid)
+        if usage:
+            print(f"  {label:<13}| {usage['rss_mb']:7.1f} | {usage['pss_mb']:7.1f} | {usage['private_mb']:7.1f}")
+
+
+def serve():
+    parser = argparse.ArgumentParser(description="Modelleri bir kez yükleyip worker'ları fork eden sunucu")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Worker başına torch thread sayısı (varsayılan: çekirdek sayısı / worker)")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--memory-report", type=float, default=0,
+                        help="Saniye cinsinden aralıkla worker bellek tablosu yazdır (0: kapalı)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("❌ Pre-fork modu bu platformda desteklenmiyor; 'uvicorn main:app' kullanın.")
+        raise SystemExit(1)
+
+    workers_count = max(1, args.workers)
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers_count)
+
+    # Isıtma tek thread'le yapılır; parent'ta büyük bir thread havuzu kurulmasın
+    torch.set_num_threads(1)
+    sock = bind_socket(args.host, args.port)
+    app = preload()
+    print(f"🚀 {workers_count} worker x {threads} thread, http://{args.host}:{args.port}")
+
+    workers = set()
+    for _ in range(workers_count):
+        workers.add(spawn(app, sock, threads, args))
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    last_report = time.monotonic()
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.5)
+            if args.memory_report and time.monotonic() - last_report >= args.memory_report:
+                print_memory_report(workers)
+                last_report = time.monotonic()
+            continue
+
+        workers.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} beklenmedik şekilde kapandı (durum {status}), yeniden başlatılıyor")
+            workers.add(spawn(app, sock, threads, args))
+
+    sock.close()
+    print("👋 Sunucu kapandı")
+
+
+if __name__ == "__main__":
+    sys.exit(serve())
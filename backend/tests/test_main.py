@@ -75,4 +75,225 @@ def test_get_insights():
     assert "insight" in data
     # Veri varsa related_topic ve trend de olmalı
     if "related_topic" in data:
-        assert data["trend"] in ["positive", "negative", "neutral"]
\ No newline at end of file
+        assert data["trend"] in ["positive", "negative", "neutral"]
+
+# 6. Readiness Testi (GET /ready)
+def test_ready():
+    response = client.get("/ready")
+    # Modeller arka planda yüklenirken 503, hazır olunca 200 döner
+    assert response.status_code in [200, 503]
+    data = response.json()
+    assert data["ready"] == (response.status_code == 200)
+    assert "sentiment" in data["models"]
+    assert "import_nlp_pipeline" in data["startup"]["main"]
+
+# 7. İstatistik Testi (GET /stats)
+def test_stats():
+    response = client.get("/stats")
+    assert response.status_code == 200
+    cache = response.json()["cache"]
+    for tier in ["analysis", "embedding"]:
+        assert {"hits_memory", "hits_disk", "misses"} <= set(cache[tier])
+    batching = response.json()["batching"]
+    assert {"queue_depth", "batch_size_histogram"} <= set(batching)
+
+# 8. Semantik Arama İndeksi (float16 saklama + artımlı ekleme)
+def test_vector_index_search():
+    import numpy as np
+    from vector_index import VectorIndexStore, decode_embedding, encode_embedding
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 768)).astype(np.float32)
+    store = VectorIndexStore()
+    index = store.get("u1", lambda user_id: [
+        ({"id": i}, decode_embedding(encode_embedding(v))) for i, v in enumerate(vectors[:19])
+    ])
+    store.add("u1", {"id": 19}, decode_embedding(encode_embedding(vectors[19])))
+
+    assert len(index) == 20
+    results = index.search(vectors[19], limit=3)
+    assert results[0][0]["id"] == 19
+    assert results[0][1] > 0.99
+
+    # Başarısız yüklemeyi bekleyen çağıranın yeniden denemesinde eklenen giriş kaybolmaz
+    import threading
+    import time
+    started, fail = threading.Event(), threading.Event()
+
+    def failing_loader(user_id):
+        started.set()
+        fail.wait(1)
+        raise RuntimeError("db")
+
+    def retry_loader(user_id):
+        store.add("u2", {"id": 1}, vectors[1])
+        return [({"id": 0}, vectors[0])]
+
+    first = threading.Thread(target=lambda: pytest.raises(RuntimeError, store.get, "u2", failing_loader))
+    first.start()
+    started.wait(1)
+    retried = []
+    second = threading.Thread(target=lambda: retried.append(store.get("u2", retry_loader)))
+    second.start()
+    time.sleep(0.05)
+    fail.set()
+    first.join(1)
+    second.join(1)
+    assert [entry["id"] for entry in retried[0].entries] == [0, 1]
+
+    # Süresi dolan indeks yeniden kurulur (başka worker'da yazılan girişler görünür)
+    expiring = VectorIndexStore(ttl=0)
+    assert len(expiring.get("u3", lambda user_id: [({"id": 0}, vectors[0])])) == 1
+    assert len(expiring.get("u3", lambda user_id: [({"id": i}, vectors[i]) for i in range(2)])) == 2
+    assert expiring.stats()["loads"] == 2
+
+# 9. NER Kapısı (aday cümle tespiti)
+def test_ner_gate_candidate_spans():
+    from ner_gate import NerGate
+
+    gate = NerGate()
+    assert gate.candidate_spans("Bugün çok yorgunum. Akşam erken yattım.") == []
+    text = "Sabah koştum. Sonra Zeynep aradı! İyi geldi."
+    assert [text[start:end] for start, end in gate.candidate_spans(text)] == ["Sonra Zeynep aradı!"]
+    assert gate.candidate_spans("İstanbul'a gittik.")
+    assert gate.candidate_spans("ankara çok soğuktu")
+
+# 10. Metrik Testi (GET /metrics, Prometheus metin formatı)
+def test_metrics():
+    client.get("/stats")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE dailymind_http_request_seconds histogram" in body
+    assert 'route="/stats"' in body
+    assert "dailymind_nlp_cache_lookups_total" in body
+
+# 11. Yerel JWT Doğrulama (HS256 + token cache)
+def test_local_token_verification():
+    jwt = pytest.importorskip("jwt")
+    import time
+    from auth import InvalidToken, TokenCache, TokenVerifier
+
+    secret = "test-secret-test-secret-test-secret"
+    claims = {"sub": "user-1", "email": "a@b.com", "role": "authenticated", "aud": "authenticated"}
+    token = jwt.encode({**claims, "exp": int(time.time()) + 3600}, secret, algorithm="HS256")
+    verifier = TokenVerifier(secret=secret)
+
+    user = verifier.verify(token)
+    assert user.id == "user-1" and user.email == "a@b.com"
+    with pytest.raises(InvalidToken):
+        verifier.verify(jwt.encode({**claims, "exp": int(time.time()) - 60}, secret, algorithm="HS256"))
+    with pytest.raises(InvalidToken):
+        verifier.verify(jwt.encode({**claims, "exp": int(time.time()) + 3600}, "baska-secret-baska-secret-baska", algorithm="HS256"))
+
+    # Yalnızca JWKS gerektiren (asimetrik) token'lar event loop dışında doğrulanır
+    import base64
+    es256 = base64.urlsafe_b64encode(b'{"alg":"ES256","kid":"k1"}').decode().rstrip("=") + ".e30.sig"
+    jwks_verifier = TokenVerifier(secret=secret, jwks_url="https://example.invalid/jwks.json")
+    assert not verifier.may_fetch(es256)
+    assert jwks_verifier.may_fetch(es256) and not jwks_verifier.may_fetch(token)
+
+    cache = TokenCache(ttl=60)
+    cache.put(token, user, user.expires_at)
+    assert cache.get(token) is user
+    cache.put("eski", user, time.time() - 1)
+    assert cache.get("eski") is None
+
+# 12. Toplu Feature Hazırlama (prepare_features_batch == prepare_features_single)
+def test_prepare_features_batch():
+    import numpy as np
+    import main
+
+    if not main.MODEL_FEATURES:
+        pytest.skip("mood_regressor.pkl yüklenemedi")
+    entries = [
+        {"analiz_sonucu": {"metrics": {"kelime_sayisi": 12, "karakter_sayisi": 80},
+                           "sentiment": {"skor": 0.9, "duygu": "negative"},
+                           "entities": [{"varlik": "PER"}, {"varlik": "LOC"}, {"varlik": "MISC"}],
+                           "topics": ["Aile", "İş ve Kariyer"]},
+         "created_at": "2024-05-04T23:15:00.123456+00:00"},
+        {"analiz_sonucu": {"metrics": {"kelime_sayisi": 3, "karakter_sayisi": 20},
+                           "sentiment": {"skor": 0.7, "duygu": "positive"},
+                           "entities": [], "topics": []},
+         "created_at": "2024-05-06T08:00:00+03:00"},
+    ]
+    batch = main.prepare_features_batch(entries)
+    single = np.vstack([
+        main.prepare_features_single(e["analiz_sonucu"], e["created_at"]).to_numpy(dtype=float) for e in entries
+    ])
+    assert list(batch.columns) == main.MODEL_FEATURES
+    assert np.allclose(batch.to_numpy(), single)
+
+# 13. Saklanan Mood Tahmini (model sürümüne göre geçerlilik)
+def test_stored_mood_columns():
+    import main
+
+    columns = main.mood_columns(4.62)
+    assert columns["mood_emoji"] == "🤩"
+    assert columns["mood_model_version"] == main.MOOD_MODEL_VERSION
+    assert main.stored_mood(columns) == 4.62
+    assert main.stored_mood({**columns, "mood_model_version": "eski-model"}) is None
+    assert main.stored_mood({"mood_score": None}) is None
+
+# 14. Kullanıcı Okuma Cache'i (TTL + yazmada düşürme)
+def test_user_read_cache():
+    from read_cache import UserReadCache
+
+    cache = UserReadCache(ttl=60)
+    version = cache.version("u1")
+    cache.put("u1", ("entries", 50), [{"id": 1}], version)
+    assert cache.get("u1", ("entries", 50)) == [{"id": 1}]
+    assert cache.get("u2", ("entries", 50)) is None
+
+    # Yazmadan önce başlamış okuma, yazmadan sonra cache'e konamaz
+    stale_version = cache.version("u1")
+    cache.invalidate("u1")
+    assert cache.get("u1", ("entries", 50)) is None
+    cache.put("u1", ("entries", 50), [{"id": 1}], stale_version)
+    assert cache.get("u1", ("entries", 50)) is None
+
+    cache.put("u1", "insight", {"trend": "positive"}, cache.version("u1"))
+    cache.invalidate("u1", "entries")
+    assert cache.get("u1", "insight") == {"trend": "positive"}
+    assert cache.stats()["insight"]["hits"] == 1
+
+# 15. Giriş Listesi Sayfalama (keyset cursor + alan seçimi)
+def test_entries_cursor_and_fields():
+    import main
+    from fastapi import HTTPException
+
+    row = {"id": 42, "created_at": "2024-05-04T23:15:00.123456+00:00"}
+    assert main.decode_cursor(main.encode_cursor(row)) == (row["created_at"], 42)
+    for bad in ("gecersiz", main.encode_cursor({"id": 42, "created_at": "now"}),
+                main.encode_cursor({"id": 42, "created_at": 1714864500})):
+        with pytest.raises(HTTPException):
+            main.decode_cursor(bad)
+
+    assert main.entry_columns("metin,mood_emoji") == "id, created_at, metin, mood_emoji"
+    assert "embedding" not in main.entry_columns(None)
+    with pytest.raises(HTTPException):
+        main.entry_columns("embedding")
+
+# 16. Mikro-batch: iptal edilen çağıran diğerlerini bekletmez
+def test_batch_scheduler_survives_cancelled_caller():
+    import asyncio
+    import time
+    from batch_scheduler import MicroBatchScheduler
+
+    def process(texts):
+        time.sleep(0.1)
+        return [text.upper() for text in texts]
+
+    scheduler = MicroBatchScheduler(process, max_batch_size=4, max_wait_ms=30)
+
+    async def run(cancel_after):
+        cancelled = asyncio.create_task(scheduler.analyze_async("a"))
+        other = asyncio.create_task(scheduler.analyze_async("b"))
+        await asyncio.sleep(cancel_after)  # kuyruktayken / analiz sürerken
+        cancelled.cancel()
+        return await asyncio.wait_for(other, 2), await asyncio.wait_for(scheduler.analyze_async("c"), 2)
+
+    assert asyncio.run(run(0.005)) == ("B", "C")
+    assert asyncio.run(run(0.06)) == ("B", "C")
+    assert scheduler._thread.is_alive()
@@ -0,0 +1,274 @@
+# train_distilled_model.py - Üç öğretmen modeli tek encoder'lı öğrenci modele damıtır
+#
+# Öğretmen etiketleri kayıtlı analiz_sonucu geçmişidir (duygu etiketi + skoru,
+# varlıklar, konular); yani öğrenci, servis edilen nihai çıktıyı taklit eder.
+# Öğrenci encoder'ı SBERT encoder'ının katmanları seyreltilerek başlatılır.
+#
+# Kullanım:
+#   python train_distilled_model.py                        # Supabase geçmişiyle eğit
+#   python train_distilled_model.py --jsonl kayitlar.jsonl # {"metin", "analiz_sonucu"} satırları
+#   python train_distilled_model.py --layers 4 --epochs 3 --no-speed
+#
+# Çıktı: distilled_model/ klasörü + rapor (başlık bazında öğretmen uyumu, hız kazancı).
+# Servis: NLP_MODE=distilled
+
+import os
+
+# Hız karşılaştırması için öğretmenler full moddaki yoldan çalışır
+os.environ["NLP_MODE"] = "full"
+os.environ["NLP_SENTIMENT_CASCADE"] = "0"
+
+import argparse
+import json
+import random
+import statistics
+import time
+import torch
+import torch.nn.functional as F
+from distilled_model import (
+    SENTIMENT_LABELS, DistilledNLPModel, bio_labels, decode_entities, decode_topics,
+    entity_tag_ids, head_probabilities, load_distilled, shrink_encoder
+)
+
+MIN_WORD_COUNT = 3  # nlp_pipeline.MIN_WORD_COUNT
+TRAIN_MAX_LENGTH = 256
+
+
+def fetch_from_supabase(limit=5000) -> list:
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    data, _ = supabase.table('gunluk_girisler').select('metin, analiz_sonucu').range(0, limit).execute()
+    print(f"✓ Veritabanından {len(data[1])} adet kayıt çekildi.")
+    return data[1]
+
+
+def load_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def teacher_examples(rows: list) -> list:
+    """Yalnızca modellerden geçmiş kayıtlar (kısa metin / soru kısayolları ve hatalı kayıtlar hariç)"""
+    examples = []
+    for row in rows:
+        text = (row.get("metin") or "").strip()
+        analiz = row.get("analiz_sonucu") or {}
+        if isinstance(analiz, str):
+            analiz = json.loads(analiz)
+        sentiment = analiz.get("sentiment") or {}
+        if len(text.split()) < MIN_WORD_COUNT or text.endswith("?") or sentiment.get("duygu") not in SENTIMENT_LABELS:
+            continue
+        examples.append({
+            "text": text,
+            "sentiment": sentiment["duygu"],
+            "score": float(sentiment.get("skor", 0.0)),
+            "entities": analiz.get("entities") or [],
+            "topics": analiz.get("topics") or [],
+        })
+    return examples
+
+
+def encode_batch(tokenizer, model, batch: list) -> dict:
+    encoded = tokenizer(
+        [e["text"] for e in batch],
+        padding=True,
+        truncation=True,
+        max_length=TRAIN_MAX_LENGTH,
+        return_tensors="pt",
+        return_offsets_mapping=True,
+        return_special_tokens_mask=True
+    )
+    ner_tags = [
+        entity_tag_ids(e["text"], e["entities"], encoded["offset_mapping"][i].tolist(),
+                       encoded["special_tokens_mask"][i].tolist(), model.ner_labels)
+        for i, e in enumerate(batch)
+    ]
+    topic_targets = torch.tensor([
+        [1.0 if topic in e["topics"] else 0.0 for topic in model.topic_labels] for e in batch
+    ])
+    return {
+        "inputs": {k: encoded[k] for k in ("input_ids", "attention_mask", "token_type_ids") if k in encoded},
+        "sentiment": torch.tensor([model.sentiment_labels.index(e["sentiment"]) for e in batch]),
+        "score": torch.tensor([e["score"] for e in batch]),
+        "ner": torch.tensor(ner_tags),
+        "topics": topic_targets,
+    }
+
+
+def distillation_loss(outputs: dict, targets: dict) -> torch.Tensor:
+    return (
+        F.cross_entropy(outputs["sentiment"], targets["sentiment"])
+        + F.mse_loss(outputs["sentiment_score"], targets["score"])
+        + F.cross_entropy(outputs["ner"].flatten(0, 1), targets["ner"].flatten(), ignore_index=-100)
+        + F.binary_cross_entropy_with_logits(outputs["topics"], targets["topics"])
+    )
+
+
+def train(model, tokenizer, examples, epochs, batch_size, lr):
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr, weight_decay=0.01)
+    model.train()
+    for epoch in range(epochs):
+        random.shuffle(examples)
+        losses = []
+        for start in range(0, len(examples), batch_size):
+            batch = encode_batch(tokenizer, model, examples[start:start + batch_size])
+            loss = distillation_loss(model(**batch["inputs"]), batch)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            losses.append(loss.item())
+        print(f"  Epoch {epoch + 1}/{epochs}: kayıp {statistics.mean(losses):.4f}")
+    model.eval()
+
+
+def predict(model, tokenizer, texts: list, batch_size=16) -> list:
+    """Öğrenci çıktıları, kayıtlı analiz_sonucu ile karşılaştırılabilir biçimde"""
+    predictions = []
+    with torch.no_grad():
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            encoded = tokenizer(chunk, padding=True, truncation=True, max_length=512, return_tensors="pt",
+                                return_offsets_mapping=True, return_special_tokens_mask=True)
+            inputs = {k: encoded[k] for k in ("input_ids", "attention_mask", "token_type_ids") if k in encoded}
+            probs = head_probabilities(model(**inputs))
+            for i, text in enumerate(chunk):
+                entities = decode_entities(text, encoded["offset_mapping"][i], encoded["special_tokens_mask"][i],
+                                           probs["ner"][i], model.ner_labels)
+                predictions.append({
+                    "sentiment": model.sentiment_labels[int(probs["sentiment"][i].argmax())],
+                    "score": float(probs["sentiment_score"][i]),
+                    "entities": {(e["entity_group"], e["word"]) for e in entities if e["score"] > 0.70},
+                    "topics": decode_topics(probs["topics"][i], model.topic_labels),
+                })
+    return predictions
+
+
+def f1(predicted: set, expected: set) -> tuple:
+    true_positive = len(predicted & expected)
+    return true_positive, len(predicted), len(expected)
+
+
+def agreement_report(predictions: list, examples: list) -> dict:
+    """Başlık bazında öğretmen (kayıtlı analiz) ile uyum"""
+    ner_counts = [0, 0, 0]
+    topic_counts = [0, 0, 0]
+    for p, e in zip(predictions, examples):
+        for counts, (pred, exp) in (
+            (ner_counts, (p["entities"], {(x.get("varlik"), x.get("metin")) for x in e["entities"]})),
+            (topic_counts, (set(p["topics"]), set(e["topics"]))),
+        ):
+            tp, n_pred, n_exp = f1(pred, exp)
+            counts[0] += tp
+            counts[1] += n_pred
+            counts[2] += n_exp
+
+    def micro_f1(counts):
+        tp, n_pred, n_exp = counts
+        if n_pred + n_exp == 0:
+            return 1.0
+        return 2 * tp / (n_pred + n_exp)
+
+    n = len(examples)
+    return {
+        "samples": n,
+        "sentiment_agreement": sum(p["sentiment"] == e["sentiment"] for p, e in zip(predictions, examples)) / n,
+        "sentiment_score_mae": sum(abs(p["score"] - e["score"]) for p, e in zip(predictions, examples)) / n,
+        "ner_entity_f1": micro_f1(ner_counts),
+        "topic_f1": micro_f1(topic_counts),
+        "topic_exact_match": sum(set(p["topics"]) == set(e["topics"]) for p, e in zip(predictions, examples)) / n,
+    }
+
+
+def measure_speed(model, tokenizer, texts: list, repeats=3) -> dict:
+    """Öğrenci ile üç öğretmen modelin (full mod) metin başına süresini karşılaştırır"""
+    import nlp_pipeline
+
+    def timed(fn):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return 1000 * statistics.median(timings) / len(texts)
+
+    student_ms = timed(lambda: predict(model, tokenizer, texts))
+    if not nlp_pipeline.load_models():
+        return {"student_ms_per_text": student_ms}
+
+    def teachers():
+        for start in range(0, len(texts), nlp_pipeline.ANALYSIS_BATCH_SIZE):
+            chunk = texts[start:start + nlp_pipeline.ANALYSIS_BATCH_SIZE]
+            _, _, embeddings = nlp_pipeline.run_nlp_models(chunk)
+            nlp_pipeline.classify_topics_batch(chunk, embeddings=embeddings)
+
+    teacher_ms = timed(teachers)
+    return {"student_ms_per_text": student_ms, "teacher_ms_per_text": teacher_ms, "speedup": teacher_ms / student_ms}
+
+
+def print_report(report: dict):
+    print("\nBaşlık    | Metrik                 | Değer")
+    print("-" * 50)
+    print(f"Duygu     | Etiket uyumu           | {report['sentiment_agreement']:6.1%}")
+    print(f"Duygu     | Skor MAE               | {report['sentiment_score_mae']:.4f}")
+    print(f"NER       | Varlık F1              | {report['ner_entity_f1']:6.1%}")
+    print(f"Konu      | F1                     | {report['topic_f1']:6.1%}")
+    print(f"Konu      | Birebir eşleşme        | {report['topic_exact_match']:6.1%}")
+    if "teacher_ms_per_text" in report:
+        print(f"\n⚡ Öğretmenler: {report['teacher_ms_per_text']:.2f} ms/metin, "
+              f"öğrenci: {report['student_ms_per_text']:.2f} ms/metin → {report['speedup']:.1f}x")
+    elif "student_ms_per_text" in report:
+        print(f"\n⚡ Öğrenci: {report['student_ms_per_text']:.2f} ms/metin")
+
+
+if __name__ == "__main__":
+    import nlp_pipeline
+
+    parser = argparse.ArgumentParser(description="Duygu + NER + konu modellerini tek encoder'a damıtır")
+    parser.add_argument("--jsonl", help="{'metin', 'analiz_sonucu'} satırları (varsayılan: Supabase)")
+    parser.add_argument("--output", default=nlp_pipeline.NLP_DISTILLED_DIR)
+    parser.add_argument("--base-model", default=nlp_pipeline.sbert_model_name, help="Öğrenci encoder'ının başlatılacağı model")
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--evaluate-only", action="store_true", help="Eğitmeden mevcut modeli değerlendir")
+    parser.add_argument("--no-speed", action="store_true", help="Öğretmenlerle hız karşılaştırmasını atla")
+    args = parser.parse_args()
+
+    random.seed(42)
+    torch.manual_seed(42)
+
+    examples = teacher_examples(load_jsonl(args.jsonl) if args.jsonl else fetch_from_supabase())
+    if len(examples) < 50:
+        print(f"❌ Yetersiz veri: {len(examples)} kayıt (en az 50 gerekli).")
+        raise SystemExit(1)
+    random.shuffle(examples)
+    split = max(1, int(len(examples) * 0.15))
+    val_examples, train_examples = examples[:split], examples[split:]
+    print(f"✓ Train: {len(train_examples)}, Validation: {len(val_examples)}")
+
+    if args.evaluate_only:
+        model, tokenizer = load_distilled(args.output)
+    else:
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.base_model)
+        encoder = shrink_encoder(AutoModel.from_pretrained(args.base_model), args.layers)
+        entity_types = {e.get("varlik") for ex in examples for e in ex["entities"] if e.get("varlik")}
+        model = DistilledNLPModel(encoder, bio_labels(entity_types), nlp_pipeline.KONU_NAMES)
+
+        print(f"\n🚀 Damıtma: {args.layers} katman, {args.epochs} epoch")
+        train(model, tokenizer, train_examples, args.epochs, args.batch_size, args.lr)
+
+    val_texts = [e["text"] for e in val_examples]
+    report = agreement_report(predict(model, tokenizer, val_texts), val_examples)
+    if not args.no_speed:
+        report.update(measure_speed(model, tokenizer, val_texts))
+    print_report(report)
+
+    if not args.evaluate_only:
+        model.save(args.output, tokenizer, extra={"base_model": args.base_model, "layers": args.layers, "report": report})
+        print(f"\n🏆 Model kaydedildi: {args.output}")
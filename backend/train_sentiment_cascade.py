@@ -0,0 +1,170 @@
+# train_sentiment_cascade.py - Duygu cascade'inin hızlı modelini eğitir ve BERT ile uyumunu ölçer
+#
+# Etiketler (öğretmen) BERT'in ürettiği nihai duygu etiketleridir:
+#   - varsayılan: Supabase'deki kayıtların analiz_sonucu.sentiment.duygu alanı
+#   - --bert-live: metinler güncel BERT modelleriyle yeniden etiketlenir
+#   - --csv: 'metin' ve 'duygu' sütunlu bir CSV dosyası
+#
+# Kullanım:
+#   python train_sentiment_cascade.py                  # eğit + eşik tablosu + sentiment_cascade.pkl
+#   python train_sentiment_cascade.py --evaluate-only  # mevcut modeli yeni verilerle değerlendir
+#
+# Servis tarafında NLP_SENTIMENT_CASCADE=1 ve NLP_CASCADE_THRESHOLD ile açılır.
+
+import os
+
+# Öğretmen etiketleri her zaman tam BERT yolundan gelmeli
+os.environ["NLP_SENTIMENT_CASCADE"] = "0"
+os.environ["NLP_MODE"] = "full"
+
+import argparse
+import json
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from supabase import create_client
+from sentiment_cascade import CASCADE_LABELS, SentimentCascade
+
+MODEL_PATH = "sentiment_cascade.pkl"
+MIN_WORD_COUNT = 3  # nlp_pipeline.MIN_WORD_COUNT; daha kısa metinler BERT'e hiç gitmez
+THRESHOLDS = [0.75, 0.80, 0.85, 0.90, 0.95, 0.98]
+
+
+def fetch_from_supabase(limit=5000) -> pd.DataFrame:
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    data, _ = supabase.table('gunluk_girisler').select('metin, analiz_sonucu').range(0, limit).execute()
+    rows = []
+    for row in data[1]:
+        analiz = row.get("analiz_sonucu") or {}
+        if isinstance(analiz, str):
+            analiz = json.loads(analiz)
+        duygu = (analiz.get("sentiment") or {}).get("duygu")
+        if row.get("metin") and duygu:
+            rows.append({"metin": row["metin"], "duygu": duygu})
+    print(f"✓ Veritabanından {len(rows)} etiketli kayıt çekildi.")
+    return pd.DataFrame(rows, columns=["metin", "duygu"])
+
+
+def relabel_with_bert(df: pd.DataFrame) -> pd.DataFrame:
+    """Metinleri güncel BERT modelleriyle yeniden etiketler"""
+    import nlp_pipeline
+
+    analyses = nlp_pipeline.analyze_texts(df["metin"].tolist())
+    df = df.copy()
+    df["duygu"] = [a.get("sentiment", {}).get("duygu") for a in analyses]
+    return df.dropna(subset=["duygu"])
+
+
+def bert_routed(df: pd.DataFrame) -> pd.DataFrame:
+    """Yalnızca BERT'e gerçekten giden metinler (kısa metin ve soru kısayolları hariç)"""
+    stripped = df["metin"].str.strip()
+    mask = (stripped.str.split().str.len() >= MIN_WORD_COUNT) & ~stripped.str.endswith("?")
+    return df[mask].reset_index(drop=True)
+
+
+def build_model():
+    return make_pipeline(
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), min_df=2, sublinear_tf=True, max_features=200_000),
+        LogisticRegression(max_iter=2000, C=4.0, class_weight="balanced")
+    )
+
+
+def evaluate_thresholds(model, texts, labels, thresholds=THRESHOLDS) -> list:
+    """
+    Her eşik için hızlı yola düşen oranı ve o metinlerde BERT etiketiyle uyumu hesaplar.
+    Genel uyum: hızlı yol dışındaki metinler BERT'ten geldiği için birebir kabul edilir.
+    """
+    probabilities = model.predict_proba(list(texts))
+    classes = np.array(model.classes_)
+    predicted = classes[probabilities.argmax(axis=1)]
+    confidence = probabilities.max(axis=1)
+    labels = np.asarray(labels)
+    routable = np.isin(predicted, CASCADE_LABELS)
+
+    start = time.perf_counter()
+    model.predict_proba(list(texts))
+    ms_per_text = 1000 * (time.perf_counter() - start) / max(len(texts), 1)
+
+    rows = []
+    for threshold in thresholds:
+        fast = routable & (confidence >= threshold)
+        fast_rate = fast.mean() if len(fast) else 0.0
+        agreement = (predicted[fast] == labels[fast]).mean() if fast.any() else 1.0
+        rows.append({
+            "threshold": threshold,
+            "fast_path_rate": float(fast_rate),
+            "fast_path_agreement": float(agreement),
+            "overall_agreement": float(1 - fast_rate * (1 - agreement)),
+            "ms_per_text": ms_per_text,
+        })
+    return rows
+
+
+def print_threshold_table(rows):
+    print("\nThreshold | Hızlı yol % | Hızlı yol uyum | Genel uyum")
+    print("-" * 60)
+    for r in rows:
+        print(
+            f"  {r['threshold']:.2f}    |   {r['fast_path_rate']:6.1%}    |     {r['fast_path_agreement']:6.1%}     |"
+            f"   {r['overall_agreement']:6.1%}"
+        )
+    print(f"\n⚡ Hızlı model: {rows[0]['ms_per_text']:.3f} ms/metin")
+
+    safe = [r for r in rows if r["fast_path_agreement"] >= 0.97 and r["fast_path_rate"] > 0]
+    if safe:
+        best = max(safe, key=lambda r: r["fast_path_rate"])
+        print(f"🎯 Önerilen eşik: NLP_CASCADE_THRESHOLD={best['threshold']:.2f} "
+              f"(%{100 * best['fast_path_rate']:.0f} hızlı yol, %{100 * best['fast_path_agreement']:.1f} uyum)")
+    else:
+        print("⚠️ Hiçbir eşikte hızlı yol uyumu %97'ye ulaşmadı; cascade'i kapalı tutun.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Duygu cascade'i hızlı modelinin eğitimi ve değerlendirmesi")
+    parser.add_argument("--csv", help="'metin' ve 'duygu' sütunlu veri dosyası (varsayılan: Supabase)")
+    parser.add_argument("--bert-live", action="store_true", help="Etiketleri güncel BERT modelleriyle yeniden üret")
+    parser.add_argument("--evaluate-only", action="store_true", help=f"Eğitmeden mevcut {MODEL_PATH} modelini değerlendir")
+    parser.add_argument("--output", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else fetch_from_supabase()
+    if args.bert_live:
+        df = relabel_with_bert(df)
+    df = bert_routed(df)
+    if len(df) < 50:
+        print(f"❌ Yetersiz veri: {len(df)} kayıt (en az 50 gerekli).")
+        raise SystemExit(1)
+
+    print(f"\n📊 Etiket dağılımı:\n{df['duygu'].value_counts()}")
+
+    if args.evaluate_only:
+        with open(args.output, "rb") as f:
+            cascade = SentimentCascade(pickle.load(f)["model"])
+        print_threshold_table(evaluate_thresholds(cascade.model, df["metin"], df["duygu"]))
+        raise SystemExit(0)
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        df["metin"], df["duygu"], test_size=0.2, random_state=42, stratify=df["duygu"]
+    )
+    model = build_model()
+    model.fit(X_train, y_train)
+
+    print("\n   Detaylı Rapor (Validation, eşiksiz):")
+    print(classification_report(y_val, model.predict(X_val)))
+    rows = evaluate_thresholds(model, X_val, y_val)
+    print_threshold_table(rows)
+
+    # Son model tüm veriyle eğitilir
+    model = build_model()
+    model.fit(df["metin"], df["duygu"])
+    with open(args.output, "wb") as f:
+        pickle.dump({"model": model, "labels": list(model.classes_), "validation": rows}, f)
+    print(f"\n🏆 Model kaydedildi: {args.output}")
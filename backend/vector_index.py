@@ -0,0 +1,182 @@
+# vector_index.py - Günlük girişleri için kullanıcı bazında semantik arama indeksi
+#
+# Her girişin SBERT embedding'i, L2 normalize edilip float16 olarak (base64)
+# gunluk_girisler.embedding sütununda saklanır (768 boyut → 1.5 KB).
+# Kullanıcının indeksi ilk aramada bir kez veritabanından kurulur, yeni girişler
+# create_entry'de indekse eklenir; arama tek bir matris-vektör çarpımıdır.
+#
+# İndeks process başınadır: serve.py ile çalışırken başka bir worker'a düşen giriş
+# bu worker'ın indeksine eklenemez. İndeks ttl dolunca veritabanından yeniden kurulur;
+# yani başka worker'da yazılan giriş aramada en fazla ttl kadar görünmeyebilir.
+
+import base64
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def encode_embedding(vector) -> str:
+    """Embedding'i normalize edip float16 base64 metne çevirir"""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    return base64.b64encode(vector.astype(np.float16).tobytes()).decode("ascii")
+
+
+def decode_embedding(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float16).astype(np.float32)
+
+
+class UserVectorIndex:
+    """Tek kullanıcının girişleri: (N, D) float32 matris + giriş başına hafif alanlar"""
+
+    def __init__(self):
+        self._matrix = None  # boyut ilk vektörden belirlenir
+        self._size = 0
+        self.entries = []
+        self._positions = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, entry: dict, vector: np.ndarray):
+        """Girişi indekse ekler (aynı id varsa günceller); kapasite ikiye katlanarak büyür"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self.lock:
+            position = self._positions.get(entry["id"])
+            if self._matrix is None:
+                self._matrix = np.zeros((16, len(vector)), dtype=np.float32)
+            if position is None:
+                if self._size == len(self._matrix):
+                    grown = np.zeros((2 * len(self._matrix), self._matrix.shape[1]), dtype=np.float32)
+                    grown[:self._size] = self._matrix[:self._size]
+                    self._matrix = grown
+                position = self._size
+                self._size += 1
+                self.entries.append(entry)
+                self._positions[entry["id"]] = position
+            else:
+                self.entries[position] = entry
+            self._matrix[position] = vector
+
+    def search(self, query: np.ndarray, limit: int = 10, min_score: float = None) -> list:
+        """
+        Kosinüs benzerliğine göre en yakın girişler (vektörler normalize olduğundan iç çarpım).
+
+        Returns:
+            list: [(entry, score)], skora göre azalan
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        with self.lock:
+            if self._size == 0:
+                return []
+            scores = self._matrix[:self._size] @ query
+            entries = list(self.entries)
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (entries[i], float(scores[i]))
+            for i in top
+            if min_score is None or scores[i] >= min_score
+        ]
+
+
+class VectorIndexStore:
+    """
+    Kullanıcı indekslerinin LRU deposu. İndeks ilk kullanımda loader(user_id) ile
+    kurulur; loader [(entry, vector)] döner. Aynı kullanıcı için eşzamanlı
+    kurulumlar tek yüklemede birleşir.
+
+    Args:
+        max_users: Bellekte tutulacak en fazla kullanıcı indeksi
+        ttl: İndeksin yeniden kurulmadan kullanılacağı en uzun süre (saniye)
+    """
+
+    def __init__(self, max_users: int = 256, ttl: float = 300.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._indexes = OrderedDict()  # user_id -> (indeks, bitiş)
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._pending = {}
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def _fresh(self, user_id):
+        """Süresi dolmamış indeks; dolmuşsa düşürür (self._lock altında çağrılır)"""
+        item = self._indexes.get(user_id)
+        if item is None:
+            return None
+        if item[1] <= time.monotonic():
+            del self._indexes[user_id]
+            return None
+        return item[0]
+
+    def get(self, user_id, loader) -> UserVectorIndex:
+        with self._lock:
+            index = self._fresh(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            load_lock = self._loading.setdefault(user_id, threading.Lock())
+            self._pending.setdefault(user_id, [])
+
+        with load_lock:
+            with self._lock:
+                index = self._fresh(user_id)
+                if index is not None:
+                    return index
+                # Önceki deneme hata ile bittiyse liste silinmiştir; bu denemede eklenenler kaybolmasın
+                self._pending.setdefault(user_id, [])
+
+            start = time.perf_counter()
+            index = UserVectorIndex()
+            try:
+                for entry, vector in loader(user_id):
+                    index.add(entry, vector)
+            except Exception:
+                with self._lock:
+                    self._pending.pop(user_id, None)
+                    self._loading.pop(user_id, None)
+                raise
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+
+            with self._lock:
+                # Yükleme sırasında eklenen girişler (loader'ın okumasına yetişmemiş olabilir)
+                for entry, vector in self._pending.pop(user_id, []):
+                    index.add(entry, vector)
+                self._indexes[user_id] = (index, time.monotonic() + self.ttl)
+                self._loading.pop(user_id, None)
+                while len(self._indexes) > self.max_users:
+                    self._indexes.popitem(last=False)
+            return index
+
+    def add(self, user_id, entry: dict, vector):
+        """Yeni girişi, kullanıcının indeksi bellekteyse ekler (değilse ilk aramada yüklenir)"""
+        with self._lock:
+            index = self._fresh(user_id)
+            if index is None:
+                if user_id in self._pending:
+                    self._pending[user_id].append((entry, vector))
+                return
+        index.add(entry, vector)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = [len(index) for index, _ in self._indexes.values()]
+        return {
+            "users": len(sizes),
+            "entries": sum(sizes),
+            "loads": self.loads,
+            "avg_load_ms": round(1000 * self.load_seconds / self.loads, 2) if self.loads else 0.0,
+        }
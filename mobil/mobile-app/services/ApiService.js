@@ -90,7 +90,8 @@ export const kaydet = async (metin, setLoading, setMetin, navigation) => {
 
   try {
     const headers = await getAuthHeaders();
-    const response = await fetch(`${API_URL}/entries`, {
+    // score=true: mood tahmini kayıtla aynı yanıtta gelir (ayrı /predict-mood isteği yok)
+    const response = await fetch(`${API_URL}/entries?score=true`, {
       method: 'POST',
       headers: headers,
       body: JSON.stringify({ metin: metin }),
@@ -103,27 +104,29 @@ export const kaydet = async (metin, setLoading, setMetin, navigation) => {
     }
 
     if (json.status === 'success') {
-      const entryId = json.data.id;
-      
+      const done = () => {
+          setMetin(''); // Temizle
+          // Eğer navigation prop'u geldiyse Ana Sayfaya dön
+          if (navigation) navigation.navigate('Home');
+      };
+
       try {
-          const predictResponse = await fetch(`${API_URL}/predict-mood/${entryId}`, { headers });
-          const predictJson = await predictResponse.json();
-          
-          if (predictResponse.ok) {
-              const { mood_score, emoji, message } = predictJson.ai_prediction;
+          let prediction = json.ai_prediction;
+          if (prediction === undefined) {
+              // score parametresini tanımayan eski sunucu: tahmini ayrıca iste
+              const predictResponse = await fetch(`${API_URL}/predict-mood/${json.data.id}`, { headers });
+              const predictJson = await predictResponse.json();
+              prediction = predictResponse.ok ? predictJson.ai_prediction : null;
+          }
+
+          if (prediction) {
+              const { mood_score, emoji, message } = prediction;
               
               Alert.alert(
                   `AI Analizi: ${emoji}`,
                   `Mod Puanın: ${mood_score}/5\n\n${message}`,
                   [
-                      { 
-                          text: 'Süper!', 
-                          onPress: () => {
-                              setMetin(''); // Temizle
-                              // Eğer navigation prop'u geldiyse Ana Sayfaya dön
-                              if (navigation) navigation.navigate('Home'); 
-                          }
-                      }
+                      { text: 'Süper!', onPress: done }
                   ]
               );
           } else {
@@ -133,10 +136,7 @@ export const kaydet = async (metin, setLoading, setMetin, navigation) => {
       } catch (predictError) {
           // Tahmin servisi çalışmazsa bile kayıt başarılıdır, kullanıcıyı üzme
           Alert.alert('Başarılı', 'Günlüğün kaydedildi!', [
-              { text: 'Tamam', onPress: () => {
-                  setMetin('');
-                  if (navigation) navigation.navigate('Home');
-              }}
+              { text: 'Tamam', onPress: done }
           ]);
       }
       
@@ -151,15 +151,27 @@ export const kaydet = async (metin, setLoading, setMetin, navigation) => {
   }
 };
 
+// Son /entries yanıtı: ekran odaklanmalarında liste değişmediyse sunucu 304 döner, gövde tekrar inmez
+let entriesCache = { token: null, etag: null, data: null };
+
 export const fetchEntries = async () => {
     try {
         const headers = await getAuthHeaders();
+        const sameUser = entriesCache.token === headers.Authorization;
+        if (sameUser && entriesCache.etag) {
+            headers['If-None-Match'] = entriesCache.etag;
+        }
         const response = await fetch(`${API_URL}/entries?limit=50`, { headers });
+        if (response.status === 304 && sameUser && entriesCache.data) {
+            return entriesCache.data;
+        }
         if (!response.ok) {
             console.error("Veri çekme hatası:", await response.text());
             return [];
         }
-        return await response.json();
+        const data = await response.json();
+        entriesCache = { token: headers.Authorization, etag: response.headers.get('ETag'), data };
+        return data;
     } catch (error) {
         console.error("Fetch hatası (Bağlantı yok mu?):", error);
         return [];